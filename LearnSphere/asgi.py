@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LearnSphere.settings')
+# Tells settings to turn persistent database connections off (see CONN_MAX_AGE there)
+os.environ['LEARNSPHERE_ASGI'] = '1'
 
 application = get_asgi_application()
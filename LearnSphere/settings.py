@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -29,8 +30,29 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-default-key')
 # Gemini API Key
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
 
+# AI assistant LLM client (ai_assistant.llm). LLM_BACKEND is a dotted path;
+# ai_assistant.llm.FakeBackend answers locally without network access.
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'ai_assistant.llm.GeminiBackend')
+LLM_MODEL = os.getenv('LLM_MODEL', 'gemini-flash-latest')
+# Per attempt; retries use jittered backoff and stop at the overall deadline
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '20'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_DEADLINE_SECONDS = float(os.getenv('LLM_DEADLINE_SECONDS', '45'))
+# Answers cached in the 'llm_responses' cache (ai_assistant.response_cache); 0 disables
+LLM_RESPONSE_CACHE_SECONDS = int(os.getenv('LLM_RESPONSE_CACHE_SECONDS', str(6 * 60 * 60)))
+LLM_RESPONSE_CACHE_ENTRIES = int(os.getenv('LLM_RESPONSE_CACHE_ENTRIES', '2000'))
+# Estimated tokens of retrieved context and of earlier turns sent with each question
+LLM_CONTEXT_TOKEN_BUDGET = int(os.getenv('LLM_CONTEXT_TOKEN_BUDGET', '1500'))
+LLM_HISTORY_TOKEN_BUDGET = int(os.getenv('LLM_HISTORY_TOKEN_BUDGET', '2000'))
+# Older turns are folded into Conversation.summary once LLM_SUMMARY_EVERY
+# messages have piled up beyond the LLM_RECENT_MESSAGES sent verbatim
+LLM_RECENT_MESSAGES = int(os.getenv('LLM_RECENT_MESSAGES', '6'))
+LLM_SUMMARY_EVERY = int(os.getenv('LLM_SUMMARY_EVERY', '6'))
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DEBUG', 'False') == 'True'
+# Running `manage.py test`
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
 
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '*').split(',')
 
@@ -90,6 +112,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'LearnSphere.urls'
@@ -112,6 +135,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'LearnSphere.wsgi.application'
+ASGI_APPLICATION = 'LearnSphere.asgi.application'
 
 
 # Database
@@ -124,6 +148,34 @@ DATABASES = {
     }
 }
 
+# SQLite tuned for several gunicorn workers writing to one file.
+# 'production' (the default unless DEBUG) applies it; 'development' keeps stock SQLite.
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'development' if DEBUG else 'production')
+SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '20'))  # seconds a writer waits for the lock
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',                      # readers and the writer no longer block each other
+    'busy_timeout': SQLITE_BUSY_TIMEOUT * 1000,
+    'synchronous': 'NORMAL',                    # fsync at checkpoints only; durable enough with WAL
+    'mmap_size': 128 * 1024 * 1024,             # read pages through a 128 MB memory map
+    'cache_size': -32000,                       # 32 MB page cache per connection (negative = KiB)
+    'temp_store': 'MEMORY',
+}
+SQLITE_PRODUCTION_OPTIONS = {
+    'init_command': ''.join(f"PRAGMA {name}={value};" for name, value in SQLITE_PRAGMAS.items()),
+    'timeout': SQLITE_BUSY_TIMEOUT,
+    # Take the write lock at BEGIN: a deferred transaction that reads and then writes
+    # cannot wait for the lock and fails at once with "database is locked"
+    'transaction_mode': 'IMMEDIATE',
+}
+# Set by LearnSphere/asgi.py. Under ASGI sync views run in executor threads whose
+# connections are never closed at request end, so persistent connections must be off.
+SERVING_ASGI = os.getenv('LEARNSPHERE_ASGI') == '1'
+if SQLITE_PROFILE == 'production':
+    DATABASES['default']['OPTIONS'] = SQLITE_PRODUCTION_OPTIONS
+    # Keep connections (and their pragmas and page cache) across requests, except under ASGI
+    DATABASES['default']['CONN_MAX_AGE'] = 0 if SERVING_ASGI else int(os.getenv('CONN_MAX_AGE', '600'))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
 
 # Redis Cache Integration
 # Redis Cache Integration (Commented out for portability)
@@ -142,7 +194,14 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
-    }
+    },
+    # AI assistant answers; the least recently used are culled beyond MAX_ENTRIES
+    'llm_responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'llm-responses',
+        'TIMEOUT': LLM_RESPONSE_CACHE_SECONDS,
+        'OPTIONS': {'MAX_ENTRIES': LLM_RESPONSE_CACHE_ENTRIES},
+    },
 }
 
 # Password validation
@@ -203,6 +262,35 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Exports and uploaded rosters (core.storage); never served by the web server
+PRIVATE_MEDIA_ROOT = Path(os.getenv('PRIVATE_MEDIA_ROOT', BASE_DIR / 'private_media'))
+
+# Hours a failed student import can be resumed before its roster is deleted
+# (purge_student_imports)
+STUDENT_IMPORT_RESUME_HOURS = int(os.getenv('STUDENT_IMPORT_RESUME_HOURS', '24'))
+
+# Excel exports larger than this many rows are streamed as CSV instead
+EXPORT_CSV_ROW_THRESHOLD = int(os.getenv('EXPORT_CSV_ROW_THRESHOLD', '50000'))
+
+# Query budget instrumentation (core.middleware.QueryBudgetMiddleware)
+# Fraction of requests measured; 0 turns the middleware off, as it is for the test suite
+QUERY_BUDGET_SAMPLE_RATE = float(os.getenv('QUERY_BUDGET_SAMPLE_RATE', '0' if TESTING else '0.05'))
+# Seconds between writes of the buffered samples to ViewQueryStats
+QUERY_BUDGET_FLUSH_SECONDS = float(os.getenv('QUERY_BUDGET_FLUSH_SECONDS', '60'))
+# Default per-request limits; QUERY_BUDGETS overrides the query limit per URL name
+QUERY_BUDGET_MAX_QUERIES = int(os.getenv('QUERY_BUDGET_MAX_QUERIES', '50'))
+QUERY_BUDGET_MAX_DB_MS = float(os.getenv('QUERY_BUDGET_MAX_DB_MS', '500'))
+QUERY_BUDGET_MAX_DURATION_MS = float(os.getenv('QUERY_BUDGET_MAX_DURATION_MS', '2000'))
+QUERY_BUDGETS = {
+    'leaderboard': 15,
+    'api_leaderboard': 10,
+    'quarter_report': 20,
+}
+
+# Admin dashboard chart payload (administration.charts). Grade and attendance
+# writes invalidate it at once through a shared cache; with the per-process
+# LocMemCache this TTL bounds how stale another worker's copy can get.
+DASHBOARD_CHART_CACHE_SECONDS = int(os.getenv('DASHBOARD_CHART_CACHE_SECONDS', '60'))
 
 AUTH_USER_MODEL = 'accounts.User'
 
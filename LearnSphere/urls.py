@@ -8,9 +8,10 @@ from core import views as core_views
 from core.views import parent_dashboard, notifications_view
 from core.views_extra import student_dashboard, director_dashboard
 from core.schedule_views import schedule_list, schedule_create, schedule_edit, schedule_delete
+from core.job_views import export_job_list, export_job_status, export_job_download
 from journal.views import gradebook_view, attendance_view
 from journal.export_views import export_grades_excel, export_attendance_excel, export_students_excel, export_all_users_excel
-from journal.import_views import download_students_template, import_students
+from journal.import_views import download_students_template, import_students, resume_student_import, download_import_errors
 from homework.views import create_assignment, assignment_list, submit_homework, view_submissions, grade_submission
 from accounts.views import profile_view
 from django.contrib.sitemaps.views import sitemap
@@ -62,9 +63,15 @@ urlpatterns += i18n_patterns(
     path('export/attendance/', export_attendance_excel, name='export_attendance'),
     path('export/students/', export_students_excel, name='export_students'),
     path('export/users/', export_all_users_excel, name='export_all_users'),
+    # Background export jobs
+    path('exports/', export_job_list, name='export_jobs'),
+    path('exports/<int:job_id>/status/', export_job_status, name='export_job_status'),
+    path('exports/<int:job_id>/download/', export_job_download, name='export_job_download'),
     # Excel Import URLs
     path('import/students/', import_students, name='import_students'),
     path('import/students/template/', download_students_template, name='download_students_template'),
+    path('import/students/<int:import_id>/resume/', resume_student_import, name='resume_student_import'),
+    path('import/students/<int:import_id>/errors/', download_import_errors, name='download_import_errors'),
 )
 
 # Serve media files in development
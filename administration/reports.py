@@ -0,0 +1,85 @@
+"""
+Quarter report engine
+Builds the class x subject averages matrix from one grouped query
+and writes it to Excel with openpyxl's write-only mode.
+"""
+import tempfile
+
+from django.db.models import Avg
+from django.http import FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+
+from journal.models import Grade
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def quarter_averages(class_obj, start_date=None, end_date=None):
+    """
+    Average grade of every student x subject pair in a class
+
+    Returns:
+        Dictionary {(student_id, subject_id): average}
+    """
+    grades = Grade.objects.filter(student__student_class=class_obj)
+    if start_date and end_date:
+        grades = grades.filter(date__range=[start_date, end_date])
+
+    rows = grades.values('student_id', 'subject_id').annotate(avg_grade=Avg('value')).order_by()
+    return {(row['student_id'], row['subject_id']): row['avg_grade'] for row in rows}
+
+
+def build_quarter_report(class_obj, subjects, start_date=None, end_date=None):
+    """
+    Pivot the averages matrix into rows for the template/export
+
+    Runs two queries (students + averages) regardless of class size.
+    """
+    students = class_obj.students.all().order_by('last_name', 'first_name')
+    averages = quarter_averages(class_obj, start_date, end_date)
+
+    report_data = []
+    for student in students:
+        grades = {}
+        for subject in subjects:
+            avg_grade = averages.get((student.id, subject.id))
+            grades[subject.id] = round(avg_grade, 1) if avg_grade else '-'
+        report_data.append({'student': student, 'grades': grades})
+    return report_data
+
+
+def quarter_report_workbook(report_data, subjects, fileobj):
+    """Write the report to `fileobj` as .xlsx using a write-only worksheet"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title="Chorak hisoboti")
+
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+
+    header = []
+    for title in ["O'quvchi"] + [subject.name for subject in subjects]:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.fill = header_fill
+        cell.font = header_font
+        header.append(cell)
+    ws.append(header)
+
+    for item in report_data:
+        ws.append([item['student'].get_full_name()] + [item['grades'].get(subject.id, '-') for subject in subjects])
+
+    wb.save(fileobj)
+
+
+def quarter_report_response(class_obj, report_data, subjects):
+    """Build the workbook in a temp file and stream it back in chunks"""
+    fileobj = tempfile.TemporaryFile()
+    quarter_report_workbook(report_data, subjects, fileobj)
+    fileobj.seek(0)
+    return FileResponse(
+        fileobj,
+        as_attachment=True,
+        filename=f"Quarter_Report_{class_obj.name}.xlsx",
+        content_type=XLSX_CONTENT_TYPE
+    )
@@ -1,3 +1,147 @@
 from django.test import TestCase
+from django.core.cache import cache
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.db.models import F
+from django.urls import reverse
+from accounts.models import User
+from core.models import School, Class, Subject
+from journal.models import Grade
+from openpyxl import load_workbook
+from io import BytesIO
+import datetime
 
-# Create your tests here.
+from .reports import build_quarter_report
+
+
+class QuarterReportTests(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name="Test School", address="Address")
+        self.class_obj = Class.objects.create(name="9-A", school=self.school)
+        self.subjects = [Subject.objects.create(name=f"Fan {i}") for i in range(5)]
+        self.director = User.objects.create_user(username='director', password='password123', role='director')
+        self.day = datetime.date(2026, 3, 2)
+
+    def add_students(self, start, count):
+        for i in range(start, start + count):
+            student = User.objects.create_user(username=f'st{i}', password='x', role='student', student_class=self.class_obj,
+                                               first_name=f'Ism{i}', last_name=f'Familiya{i:03d}')
+            Grade.objects.bulk_create([
+                Grade(student=student, subject=subject, value=4 + (offset % 2), date=self.day + datetime.timedelta(days=offset))
+                for subject in self.subjects for offset in range(2)
+            ])
+
+    def test_query_count_does_not_grow_with_class_size(self):
+        """Benchmark guard: the averages matrix is one grouped query however big the class is"""
+        self.add_students(0, 3)
+        with CaptureQueriesContext(connection) as small:
+            build_quarter_report(self.class_obj, self.subjects)
+
+        self.add_students(3, 40)
+        with CaptureQueriesContext(connection) as large:
+            report = build_quarter_report(self.class_obj, self.subjects)
+
+        self.assertEqual(len(small), 2)
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(len(report), 43)
+        self.assertEqual(report[0]['grades'][self.subjects[0].id], 4.5)
+
+    def test_date_range_and_excel_export(self):
+        self.add_students(0, 2)
+        self.client.login(username='director', password='password123')
+        response = self.client.get(reverse('quarter_report'), {
+            'class': self.class_obj.id,
+            'start_date': self.day.isoformat(),
+            'end_date': self.day.isoformat(),
+            'export': 'excel',
+        })
+        self.assertEqual(response.status_code, 200)
+
+        ws = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(ws.iter_rows(values_only=True))
+        self.assertEqual(rows[0], ("O'quvchi",) + tuple(s.name for s in self.subjects))
+        self.assertEqual(rows[1][1:], (4,) * 5)
+
+
+class DashboardChartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        school = School.objects.create(name="Test School", address="Address")
+        self.class_obj = Class.objects.create(name="9-A", school=school)
+        self.math = Subject.objects.create(name="Math")
+        self.teacher = User.objects.create_user(username='teacher', password='password123', role='teacher')
+        self.students = [
+            User.objects.create_user(username=f'student{i}', password='password123', role='student',
+                                     student_class=self.class_obj)
+            for i in range(3)
+        ]
+        director = User.objects.create_user(username='director', password='password123', role='director')
+        self.client.force_login(director)
+        self.url = reverse('api_dashboard_charts')
+
+    def grade(self, student, value):
+        # Single-row saves bump the data version once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.create(student=student, subject=self.math, teacher=self.teacher, value=value,
+                                 date=timezone.now().date())
+
+    def data_queries(self, ctx):
+        # Reading the shared data version is expected; nothing else from the journal or rollups
+        return [q['sql'] for q in ctx.captured_queries
+                if ('journal_' in q['sql'] or 'analytics_' in q['sql']) and 'analytics_dataversion' not in q['sql']]
+
+    def test_one_payload_with_every_series(self):
+        for student, value in zip(self.students, [5, 4, 2]):
+            self.grade(student, value)
+
+        response = self.client.get(self.url)
+        data = response.json()
+        self.assertEqual(data['performance']['averages'], [3.67])
+        self.assertEqual([s['average'] for s in data['top_students']], [5.0, 4.0, 2.0])
+        self.assertEqual([s['average'] for s in data['struggling_students']], [2.0])
+        self.assertEqual(len(data['attendance']['weekly_trend']), 7)
+        # The old single-series endpoints serve slices of the same payload
+        self.assertEqual(self.client.get(reverse('api_performance_stats')).json(), data['performance'])
+
+    def test_etag_revalidation_and_invalidation(self):
+        self.grade(self.students[0], 5)
+        first = self.client.get(self.url)
+        etag = first['ETag']
+
+        # Unchanged data: 304 without any query beyond the session and user lookups
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(self.data_queries(ctx))
+
+        # A new grade changes the version, so the next refresh gets fresh data
+        self.grade(self.students[1], 3)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['top_students']), 2)
+
+    def test_non_admin_gets_no_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_login(self.teacher)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_version_is_shared_between_processes(self):
+        from analytics.models import DataVersion
+
+        etag = self.client.get(self.url)['ETag']
+        # Another worker or a management command rebuilt the rollups
+        DataVersion.objects.filter(name='rollups').update(version=F('version') + 1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_cached_payload_is_reused(self):
+        self.grade(self.students[0], 5)
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        self.assertFalse(self.data_queries(ctx))
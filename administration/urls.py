@@ -5,6 +5,7 @@ urlpatterns = [
     path('dashboard/', views.admin_dashboard, name='admin_dashboard'),
     
     # API endpoints for stats
+    path('api/stats/dashboard/', views.api_dashboard_charts, name='api_dashboard_charts'),
     path('api/stats/attendance/', views.api_attendance_stats, name='api_attendance_stats'),
     path('api/stats/performance/', views.api_performance_stats, name='api_performance_stats'),
     path('api/stats/top-students/', views.api_top_students, name='api_top_students'),
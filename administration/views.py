@@ -12,13 +12,17 @@ from gamification.models import Reward, Redemption, PointTransaction
 from django.db.models import Sum, Count, Avg
 from django.utils import timezone
 import json
-import pandas as pd
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, condition
+from django.utils.cache import patch_cache_control
 
 from .models import Room, RoomBooking, TeacherAssignment
+from .reports import build_quarter_report, quarter_report_response
+from .charts import chart_data, chart_etag
+from core.job_views import queue_export_response
 from .forms import UserCreateForm, UserEditForm, ClassForm, SubjectForm, TeacherAssignmentForm
 from core.models import Class, Subject
 from journal.models import Grade, Attendance
+from analytics import rollups
 
 
 @login_required
@@ -124,15 +128,16 @@ def admin_dashboard(request):
     total_classes = Class.objects.count()
     total_subjects = Subject.objects.count()
     
-    # Today's attendance rate
+    # Today's attendance rate (from the analytics rollups)
     today = timezone.now().date()
-    total_attendance_today = Attendance.objects.filter(date=today).count()
-    present_today = Attendance.objects.filter(date=today, status='present').count()
+    today_counts = rollups.attendance_counts(today)
+    total_attendance_today = sum(today_counts.values())
+    present_today = today_counts.get('present', 0)
     attendance_rate = round((present_today / total_attendance_today * 100), 1) if total_attendance_today > 0 else 0
     
     # Average performance (last 30 days)
     thirty_days_ago = today - timedelta(days=30)
-    avg_performance = Grade.objects.filter(date__gte=thirty_days_ago).aggregate(Avg('value'))['value__avg']
+    avg_performance = rollups.average_grade(since=thirty_days_ago)
     avg_performance = round(avg_performance, 2) if avg_performance else 0
     
     # Recent activity - last 10 grades
@@ -158,43 +163,32 @@ def admin_dashboard(request):
     return render(request, 'administration/admin_dashboard.html', context)
 
 
+def _dashboard_charts_etag(request):
+    # No ETag for non-admins, so they always reach the 403 below instead of a 304
+    return chart_etag() if is_admin_user(request.user) else None
+
+
+@login_required
+@condition(etag_func=_dashboard_charts_etag)
+def api_dashboard_charts(request):
+    """All dashboard chart series in one cached response; unchanged data answers 304"""
+    if not is_admin_user(request.user):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    response = JsonResponse(chart_data())
+    # Browsers revalidate with If-None-Match on every refresh instead of reusing a stale copy
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# The single-series endpoints below serve slices of the same cached payload
+
 @login_required
 def api_attendance_stats(request):
     """API endpoint for attendance statistics"""
     if not is_admin_user(request.user):
         return JsonResponse({'error': 'Unauthorized'}, status=403)
-    
-    # Get last 7 days attendance
-    today = timezone.now().date()
-    stats = []
-    
-    for i in range(6, -1, -1):
-        date = today - timedelta(days=i)
-        total = Attendance.objects.filter(date=date).count()
-        present = Attendance.objects.filter(date=date, status='present').count()
-        rate = round((present / total * 100), 1) if total > 0 else 0
-        
-        stats.append({
-            'date': date.strftime('%a'),  # Mon, Tue, etc.
-            'rate': rate,
-            'present': present,
-            'total': total
-        })
-    
-    # Today's breakdown
-    today_total = Attendance.objects.filter(date=today).count()
-    today_present = Attendance.objects.filter(date=today, status='present').count()
-    today_absent = today_total - today_present
-    
-    return JsonResponse({
-        'weekly_trend': stats,
-        'today': {
-            'present': today_present,
-            'absent': today_absent,
-            'total': today_total,
-            'rate': round((today_present / today_total * 100), 1) if today_total > 0 else 0
-        }
-    })
+    return JsonResponse(chart_data()['attendance'])
 
 
 @login_required
@@ -202,31 +196,7 @@ def api_performance_stats(request):
     """API endpoint for performance statistics by subject"""
     if not is_admin_user(request.user):
         return JsonResponse({'error': 'Unauthorized'}, status=403)
-    
-    # Get average grade per subject (last 30 days)
-    thirty_days_ago = timezone.now().date() - timedelta(days=30)
-    
-    subject_stats = Grade.objects.filter(
-        date__gte=thirty_days_ago
-    ).values('subject__name').annotate(
-        avg_grade=Avg('value'),
-        count=Count('id')
-    ).order_by('-avg_grade')
-    
-    subjects = []
-    averages = []
-    counts = []
-    
-    for stat in subject_stats:
-        subjects.append(_(stat['subject__name']))
-        averages.append(round(stat['avg_grade'], 2))
-        counts.append(stat['count'])
-    
-    return JsonResponse({
-        'subjects': subjects,
-        'averages': averages,
-        'counts': counts
-    })
+    return JsonResponse(chart_data()['performance'])
 
 
 @login_required
@@ -234,30 +204,7 @@ def api_top_students(request):
     """API endpoint for top performing students"""
     if not is_admin_user(request.user):
         return JsonResponse({'error': 'Unauthorized'}, status=403)
-    
-    # Get top 10 students by average grade (last 30 days)
-    thirty_days_ago = timezone.now().date() - timedelta(days=30)
-    
-    top_students = Grade.objects.filter(
-        date__gte=thirty_days_ago
-    ).values(
-        'student__id',
-        'student__first_name',
-        'student__last_name'
-    ).annotate(
-        avg_grade=Avg('value'),
-        count=Count('id')
-    ).order_by('-avg_grade')[:10]
-    
-    students = []
-    for student in top_students:
-        students.append({
-            'name': f"{student['student__first_name']} {student['student__last_name']}",
-            'average': round(student['avg_grade'], 2),
-            'grades_count': student['count']
-        })
-    
-    return JsonResponse({'top_students': students})
+    return JsonResponse({'top_students': chart_data()['top_students']})
 
 
 @login_required
@@ -265,32 +212,7 @@ def api_struggling_students(request):
     """API endpoint for struggling students (avg < 3.0)"""
     if not is_admin_user(request.user):
         return JsonResponse({'error': 'Unauthorized'}, status=403)
-    
-    # Get students with average < 3.0 (last 30 days)
-    thirty_days_ago = timezone.now().date() - timedelta(days=30)
-    
-    struggling = Grade.objects.filter(
-        date__gte=thirty_days_ago
-    ).values(
-        'student__id',
-        'student__first_name',
-        'student__last_name',
-        'student__student_class__name'
-    ).annotate(
-        avg_grade=Avg('value'),
-        count=Count('id')
-    ).filter(avg_grade__lt=3.0).order_by('avg_grade')[:20]
-    
-    students = []
-    for student in struggling:
-        students.append({
-            'name': f"{student['student__first_name']} {student['student__last_name']}",
-            'class': student['student__student_class__name'] or _('N/A'),
-            'average': round(student['avg_grade'], 2),
-            'grades_count': student['count']
-        })
-    
-    return JsonResponse({'struggling_students': students})
+    return JsonResponse({'struggling_students': chart_data()['struggling_students']})
 
 
 # ========== EXISTING VIEWS ==========
@@ -368,7 +290,7 @@ def quarter_report(request):
         messages.error(request, "Sizda bu sahifaga kirish huquqi yo'q!")
         return redirect('home')
     classes = Class.objects.all()
-    subjects = Subject.objects.all()
+    subjects = list(Subject.objects.all())
     
     selected_class_id = request.GET.get('class')
     start_date = request.GET.get('start_date')
@@ -380,34 +302,20 @@ def quarter_report(request):
     
     if selected_class_id:
         selected_class = get_object_or_404(Class, id=selected_class_id)
-        students = selected_class.students.all().order_by('last_name', 'first_name')
         
-        for student in students:
-            student_data = {'student': student, 'grades': {}}
-            for subject in subjects:
-                grades_qs = Grade.objects.filter(student=student, subject=subject)
-                if start_date and end_date:
-                    grades_qs = grades_qs.filter(date__range=[start_date, end_date])
-                
-                avg_grade = grades_qs.aggregate(Avg('value'))['value__avg']
-                student_data['grades'][subject.id] = round(avg_grade, 1) if avg_grade else '-'
-            
-            report_data.append(student_data)
+        if export == 'excel' and request.GET.get('background'):
+            return queue_export_response(request, 'quarter_report', {
+                'class_id': selected_class.id,
+                'start_date': start_date,
+                'end_date': end_date,
+            })
+        
+        # One grouped query for the whole class x subject matrix
+        report_data = build_quarter_report(selected_class, subjects, start_date, end_date)
 
         # Export logic
         if export == 'excel':
-            data_for_export = []
-            for item in report_data:
-                row = {'O\'quvchi': item['student'].get_full_name()}
-                for subject in subjects:
-                    row[subject.name] = item['grades'].get(subject.id, '-')
-                data_for_export.append(row)
-            
-            df = pd.DataFrame(data_for_export)
-            response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            response['Content-Disposition'] = f'attachment; filename="Quarter_Report_{selected_class.name}.xlsx"'
-            df.to_excel(response, index=False)
-            return response
+            return quarter_report_response(selected_class, report_data, subjects)
 
     context = {
         'classes': classes,
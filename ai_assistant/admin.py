@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Conversation, Message, AgentContext, AgentAction
+from .models import Conversation, Message, AgentContext, AgentAction, TokenUsageDaily
 
 
 @admin.register(Conversation)
@@ -39,3 +39,11 @@ class AgentActionAdmin(admin.ModelAdmin):
     def description_preview(self, obj):
         return obj.description[:100] + '...' if len(obj.description) > 100 else obj.description
     description_preview.short_description = 'Description'
+
+
+@admin.register(TokenUsageDaily)
+class TokenUsageDailyAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'responses', 'cached_responses', 'tokens_used']
+    list_filter = ['date']
+    search_fields = ['user__username']
+    date_hierarchy = 'date'
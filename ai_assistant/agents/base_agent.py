@@ -2,10 +2,17 @@
 Base Agent Class
 All AI agents inherit from this class
 """
+import logging
 from abc import ABC, abstractmethod
+from ai_assistant.llm import get_llm_client
 from ai_assistant.rag.retriever import ContextRetriever
+from ai_assistant.tokens import count_tokens, message_tokens
+from ai_assistant.response_cache import response_key, get_response, store_response, aget_response, astore_response
 from ai_assistant.rag.prompt_builder import PromptBuilder
-from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+LLM_UNAVAILABLE_MESSAGE = "Kechirasiz, hozircha AI xizmatida muammo bor. Iltimos keyinroq urinib ko'ring."
 
 
 class BaseAgent(ABC):
@@ -23,8 +30,9 @@ class BaseAgent(ABC):
         self.user = user
         self.conversation = conversation
         self.language = language
-        self.retriever = ContextRetriever(user)
+        self.retriever = ContextRetriever(user, conversation)
         self.prompt_builder = PromptBuilder(self.agent_type, language=language)
+        self.stream_usage = {'tokens_used': 0, 'cached': False}
     
     @property
     @abstractmethod
@@ -58,54 +66,95 @@ class BaseAgent(ABC):
         """
         return {}
     
-    def call_llm(self, messages):
+    def prepare_messages(self, user_message):
+        """
+        Retrieve context and build the LLM messages, with conversation history
+        
+        Returns:
+            Tuple of (messages, context)
+        """
+        context = self.retrieve_context(user_message)
+        messages = self.prompt_builder.build_prompt(user_message, context)
+        if self.conversation:
+            # Messages already folded into the summary are not read again
+            history = self.conversation.messages.filter(id__gt=self.conversation.summarized_through or 0)
+            messages = self.prompt_builder.add_conversation_history(messages, history, self.conversation.summary)
+        return messages, context
+    
+    def perform_actions(self, user_message, context):
+        """
+        Perform autonomous actions once the response is ready
+        Override in subclasses
+        
+        Returns:
+            List of action dictionaries
+        """
+        return []
+    
+    def call_llm(self, messages, context=None):
         """
-        Call LLM API using Google Gemini
+        Call the LLM through the process-wide client (Google Gemini by default)
+        Repeated questions are answered from the response cache.
         
         Args:
             messages: List of message dictionaries [{'role': 'user'/'assistant', 'content': '...'}]
+            context: Context the messages were built from (part of the cache key)
         
         Returns:
             Dictionary with response text and usage stats
         """
+        key = response_key(self.user, messages, context)
+        cached = get_response(key)
+        if cached:
+            return {**cached, 'tokens_used': 0, 'cached': True}
+        
         try:
-            import google.generativeai as genai
-            from django.conf import settings
-            
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            model = genai.GenerativeModel('gemini-flash-latest')
-            
-            # Format history for Gemini
-            # Gemini expects [{'role': 'user'/'model', 'parts': ['...']}]
-            gemini_history = []
-            for msg in messages[:-1]: # Exclude last message which is the prompt
-                role = 'user' if msg['role'] == 'user' else 'model'
-                gemini_history.append({'role': role, 'parts': [msg['content']]})
-            
-            # Start chat session
-            chat = model.start_chat(history=gemini_history)
-            
-            # Send last message
-            current_message = messages[-1]['content']
-            response = chat.send_message(current_message)
-            
+            result = get_llm_client().complete(messages)
+            # Gemini reports usage; estimate when a backend doesn't
+            tokens_used = result.tokens_used or message_tokens(messages) + count_tokens(result.text)
+            store_response(key, result.text, tokens_used)
             return {
-                'response': response.text,
-                'tokens_used': 0 # Gemini doesn't always return token usage easily in sync mode, setting 0 for now
+                'response': result.text,
+                'tokens_used': tokens_used
             }
             
         except Exception as e:
-            error_msg = f"Gemini API Error: {str(e)}"
-            print(error_msg)
-            with open('debug_view.log', 'a') as f:
-                f.write(f"{datetime.now()}: {error_msg}\n")
-            
+            logger.warning("LLM unavailable for %s agent: %s", self.agent_type, e)
             return {
-                'response': "Kechirasiz, hozircha AI xizmatida muammo bor. Iltimos keyinroq urinib ko'ring.",
+                'response': LLM_UNAVAILABLE_MESSAGE,
                 'tokens_used': 0,
                 'error': str(e)
             }
     
+    async def stream_llm(self, messages, context=None):
+        """
+        Stream the LLM response
+        Async generator of text chunks in the order Gemini produces them; a
+        cached answer comes as one chunk. On failure it logs the error and
+        yields the same apology call_llm returns. Afterwards `stream_usage`
+        holds the estimated tokens used and whether the answer was cached.
+        """
+        self.stream_usage = {'tokens_used': 0, 'cached': False}
+        key = response_key(self.user, messages, context)
+        cached = await aget_response(key)
+        if cached:
+            self.stream_usage['cached'] = True
+            yield cached['response']
+            return
+        
+        chunks = []
+        try:
+            async for text in get_llm_client().stream(messages):
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            logger.warning("LLM unavailable for %s agent: %s", self.agent_type, e)
+            yield LLM_UNAVAILABLE_MESSAGE
+            return
+        response = ''.join(chunks)
+        self.stream_usage['tokens_used'] = message_tokens(messages) + count_tokens(response)
+        await astore_response(key, response, self.stream_usage['tokens_used'])
+    
     def log_action(self, action_type, description, action_data=None, success=True, error_message=''):
         """
         Log autonomous action performed by agent
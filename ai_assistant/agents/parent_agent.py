@@ -21,19 +21,11 @@ class ParentAgent(BaseAgent):
         - "Compare my child's math and science performance"
         - "Show me attendance summary"
         """
-        # Retrieve relevant context
-        context = self.retrieve_context(user_message)
-        
-        # Build prompt with context
-        messages = self.prompt_builder.build_prompt(user_message, context)
-        
-        # Add conversation history if available
-        if self.conversation:
-            history = self.conversation.messages.all()
-            messages = self.prompt_builder.add_conversation_history(messages, history)
+        # Retrieve context and build prompt with conversation history
+        messages, context = self.prepare_messages(user_message)
         
         # Call LLM
-        llm_response = self.call_llm(messages)
+        llm_response = self.call_llm(messages, context)
         
         return {
             'response': llm_response['response'],
@@ -23,22 +23,14 @@ class StudentAgent(BaseAgent):
         
         IMPORTANT: Never give direct answers, use Socratic method
         """
-        # Retrieve relevant context
-        context = self.retrieve_context(user_message)
-        
-        # Build prompt with context
-        messages = self.prompt_builder.build_prompt(user_message, context)
-        
-        # Add conversation history if available
-        if self.conversation:
-            history = self.conversation.messages.all()
-            messages = self.prompt_builder.add_conversation_history(messages, history)
+        # Retrieve context and build prompt with conversation history
+        messages, context = self.prepare_messages(user_message)
         
         # Call LLM
-        llm_response = self.call_llm(messages)
+        llm_response = self.call_llm(messages, context)
         
         # Check if we should recommend resources
-        actions = self._check_resource_recommendations(user_message, context)
+        actions = self.perform_actions(user_message, context)
         
         return {
             'response': llm_response['response'],
@@ -75,7 +67,7 @@ class StudentAgent(BaseAgent):
         
         return context
     
-    def _check_resource_recommendations(self, user_message, context):
+    def perform_actions(self, user_message, context):
         """Check if we should recommend learning resources"""
         actions = []
         
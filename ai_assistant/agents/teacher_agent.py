@@ -21,22 +21,14 @@ class TeacherAgent(BaseAgent):
         - "Generate parent notification for low performers"
         - "Analyze 9-A class performance this month"
         """
-        # Retrieve relevant context
-        context = self.retrieve_context(user_message)
-        
-        # Build prompt with context
-        messages = self.prompt_builder.build_prompt(user_message, context)
-        
-        # Add conversation history if available
-        if self.conversation:
-            history = self.conversation.messages.all()
-            messages = self.prompt_builder.add_conversation_history(messages, history)
+        # Retrieve context and build prompt with conversation history
+        messages, context = self.prepare_messages(user_message)
         
         # Call LLM
-        llm_response = self.call_llm(messages)
+        llm_response = self.call_llm(messages, context)
         
         # Check if autonomous actions are needed
-        actions_performed = self._check_and_perform_actions(user_message, context)
+        actions_performed = self.perform_actions(user_message, context)
         
         return {
             'response': llm_response['response'],
@@ -73,7 +65,7 @@ class TeacherAgent(BaseAgent):
         
         return context
     
-    def _check_and_perform_actions(self, user_message, context):
+    def perform_actions(self, user_message, context):
         """
         Check if message requires autonomous actions
         
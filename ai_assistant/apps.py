@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class AiAssistantConfig(AppConfig):
     name = 'ai_assistant'
+
+    def ready(self):
+        import ai_assistant.signals
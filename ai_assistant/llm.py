@@ -0,0 +1,260 @@
+"""
+LLM client
+One client per process (get_llm_client), so the Gemini SDK is configured
+once and its connections are reused across messages. Every attempt runs
+under LLM_TIMEOUT_SECONDS. Transient failures are retried up to
+LLM_MAX_RETRIES times with full-jitter exponential backoff, within the
+LLM_DEADLINE_SECONDS budget for the whole call. Latency, retries and errors
+are collected in LLMMetrics. The backend is a dotted path in LLM_BACKEND;
+FakeBackend answers locally for tests and benchmarks.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque, namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+LLMResult = namedtuple('LLMResult', 'text tokens_used')
+
+
+class LLMError(Exception):
+    """The LLM call failed after all retries"""
+
+
+class LLMTimeout(LLMError):
+    """An attempt ran past its timeout"""
+
+
+# ========== BACKENDS ==========
+
+class GeminiBackend:
+    """Google Gemini through google-generativeai; the SDK client and its connections live as long as the backend"""
+
+    def __init__(self):
+        import google.generativeai as genai
+        from google.api_core import exceptions
+
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self.model = genai.GenerativeModel(settings.LLM_MODEL)
+        self.transient_errors = (
+            exceptions.DeadlineExceeded, exceptions.ServiceUnavailable, exceptions.ResourceExhausted,
+            exceptions.InternalServerError, exceptions.GatewayTimeout,
+        )
+
+    def _start_chat(self, messages):
+        # Gemini expects [{'role': 'user'/'model', 'parts': ['...']}]; the last message is the prompt
+        history = [
+            {'role': 'user' if msg['role'] == 'user' else 'model', 'parts': [msg['content']]}
+            for msg in messages[:-1]
+        ]
+        return self.model.start_chat(history=history), messages[-1]['content']
+
+    def complete(self, messages, timeout):
+        chat, prompt = self._start_chat(messages)
+        response = chat.send_message(prompt, request_options={'timeout': timeout})
+        usage = getattr(response, 'usage_metadata', None)
+        return LLMResult(response.text, getattr(usage, 'total_token_count', 0) or 0)
+
+    async def stream(self, messages, timeout):
+        chat, prompt = self._start_chat(messages)
+        response = await chat.send_message_async(prompt, stream=True, request_options={'timeout': timeout})
+        async for chunk in response:
+            if chunk.parts:
+                yield chunk.text
+
+
+class FakeBackend:
+    """
+    Local stand-in with no network: answers with the start of the prompt after
+    `latency` seconds, and fails with ConnectionError at `failure_rate`.
+    """
+    transient_errors = (ConnectionError,)
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+
+    def reply(self, messages):
+        return f"Javob: {messages[-1]['content'][:200]}"
+
+    def _fail(self):
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            raise ConnectionError("fake backend failure")
+
+    def complete(self, messages, timeout):
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("fake backend timeout")
+        time.sleep(self.latency)
+        self._fail()
+        text = self.reply(messages)
+        return LLMResult(text, len(text.split()))
+
+    async def stream(self, messages, timeout):
+        await asyncio.sleep(self.latency)
+        self._fail()
+        for word in self.reply(messages).split(' '):
+            yield word + ' '
+
+
+# ========== METRICS ==========
+
+class LLMMetrics:
+    """Thread-safe counters plus a window of recent call latencies"""
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.latencies_ms = deque(maxlen=window)
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def record(self, latency_ms, retries, timeouts, failed):
+        with self.lock:
+            self.calls += 1
+            self.retries += retries
+            self.timeouts += timeouts
+            self.errors += int(failed)
+            self.latencies_ms.append(latency_ms)
+
+    def snapshot(self):
+        with self.lock:
+            latencies = sorted(self.latencies_ms)
+            calls, retries, timeouts, errors = self.calls, self.retries, self.timeouts, self.errors
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 1) if latencies else None
+
+        return {
+            'calls': calls,
+            'errors': errors,
+            'retries': retries,
+            'timeouts': timeouts,
+            'error_rate': round(errors / calls, 3) if calls else 0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+        }
+
+
+# ========== CLIENT ==========
+
+class LLMClient:
+    def __init__(self, backend, timeout=20, max_retries=2, deadline=45, backoff=0.5):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.backoff = backoff
+        self.metrics = LLMMetrics()
+        self.retryable = (LLMTimeout, TimeoutError, ConnectionError, *getattr(backend, 'transient_errors', ()))
+
+    def _delay(self, attempt):
+        """Full jitter: anywhere up to backoff * 2**attempt"""
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    def _timeout(self, deadline_at):
+        """Timeout for the next attempt, cut down to the time left; None once the deadline has passed"""
+        left = deadline_at - time.monotonic()
+        return min(self.timeout, left) if left > 0 else None
+
+    def _finish(self, started, retries, timeouts, error=None):
+        self.metrics.record((time.perf_counter() - started) * 1000, retries, timeouts, error is not None)
+        if error is not None:
+            logger.warning("LLM call failed after %d retries: %s", retries, error)
+            raise LLMError(str(error)) from error
+
+    def complete(self, messages):
+        """LLMResult for `messages`; raises LLMError once retries or the deadline run out"""
+        started = time.perf_counter()
+        deadline_at = time.monotonic() + self.deadline
+        retries = timeouts = 0
+        error = LLMError("deadline exceeded")
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self._delay(attempt - 1))
+            timeout = self._timeout(deadline_at)
+            if timeout is None:
+                break
+            retries += bool(attempt)
+            try:
+                result = self.backend.complete(messages, timeout)
+            except self.retryable as e:
+                timeouts += isinstance(e, (TimeoutError, LLMTimeout))
+                error = e
+                continue
+            except Exception as e:
+                self._finish(started, retries, timeouts, e)
+            self._finish(started, retries, timeouts)
+            return result
+        self._finish(started, retries, timeouts, error)
+
+    async def stream(self, messages):
+        """
+        Async generator of text chunks. Each chunk has to arrive within the
+        attempt's timeout. Only failures before the first chunk are retried,
+        so no text is sent twice.
+        """
+        started = time.perf_counter()
+        deadline_at = time.monotonic() + self.deadline
+        retries = timeouts = 0
+        error = LLMError("deadline exceeded")
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self._delay(attempt - 1))
+            timeout = self._timeout(deadline_at)
+            if timeout is None:
+                break
+            retries += bool(attempt)
+            chunks = self.backend.stream(messages, timeout)
+            sent = False
+            try:
+                while True:
+                    try:
+                        text = await asyncio.wait_for(anext(chunks), timeout)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise LLMTimeout(f"no response within {timeout:.0f}s")
+                    sent = True
+                    yield text
+            except self.retryable as e:
+                timeouts += isinstance(e, (TimeoutError, LLMTimeout))
+                error = e
+                if not sent:
+                    continue
+                self._finish(started, retries, timeouts, e)
+            except Exception as e:
+                self._finish(started, retries, timeouts, e)
+            finally:
+                await chunks.aclose()
+            self._finish(started, retries, timeouts)
+            return
+        self._finish(started, retries, timeouts, error)
+
+
+@lru_cache(maxsize=None)
+def get_llm_client():
+    """The process-wide LLMClient for the LLM_* settings"""
+    return LLMClient(
+        import_string(settings.LLM_BACKEND)(),
+        timeout=settings.LLM_TIMEOUT_SECONDS,
+        max_retries=settings.LLM_MAX_RETRIES,
+        deadline=settings.LLM_DEADLINE_SECONDS,
+    )
+
+
+@receiver(setting_changed)
+def reset_llm_client(setting, **kwargs):
+    if setting.startswith('LLM_') or setting == 'GEMINI_API_KEY':
+        get_llm_client.cache_clear()
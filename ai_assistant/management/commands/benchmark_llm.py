@@ -0,0 +1,53 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from ai_assistant.llm import FakeBackend, LLMClient, LLMError
+
+PROMPT = [
+    {'role': 'user', 'content': "Kvadrat tenglamalarni tushuntirib bering"},
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent requests through the AI assistant LLM client and report latency, retries and errors. "
+        "Uses the local fake backend unless --backend is given"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8, help="Parallel callers (threads)")
+        parser.add_argument('--latency-ms', type=float, default=50, help="Fake backend response time")
+        parser.add_argument('--failure-rate', type=float, default=0.1, help="Fake backend transient failure rate")
+        parser.add_argument('--timeout', type=float, default=settings.LLM_TIMEOUT_SECONDS, help="Per-attempt timeout, s")
+        parser.add_argument('--backend', help="Dotted path of a real backend, e.g. ai_assistant.llm.GeminiBackend")
+        parser.add_argument('--json', dest='json_path', help="Also write the results to this file")
+
+    def handle(self, *args, **options):
+        if options['backend']:
+            backend = import_string(options['backend'])()
+        else:
+            backend = FakeBackend(latency=options['latency_ms'] / 1000, failure_rate=options['failure_rate'], seed=0)
+        client = LLMClient(backend, timeout=options['timeout'], max_retries=settings.LLM_MAX_RETRIES,
+                           deadline=settings.LLM_DEADLINE_SECONDS)
+
+        def call(_):
+            try:
+                client.complete(PROMPT)
+            except LLMError:
+                pass
+
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            list(pool.map(call, range(options['calls'])))
+
+        results = client.metrics.snapshot()
+        self.stdout.write(f"{type(backend).__name__}: {options['calls']} ta so'rov, {options['concurrency']} ta parallel")
+        for key, value in results.items():
+            self.stdout.write(f"  {key:<12}{value}")
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(results, f, indent=2)
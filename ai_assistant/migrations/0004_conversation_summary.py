@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0003_token_usage_daily'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='summarized_through',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Id of the last message folded into the summary', null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='summary',
+            field=models.TextField(blank=True, help_text='Rolling summary of the older messages, kept by ai_assistant.summaries'),
+        ),
+    ]
@@ -16,6 +16,10 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    summary = models.TextField(blank=True, help_text="Rolling summary of the older messages, kept by ai_assistant.summaries")
+    summarized_through = models.PositiveBigIntegerField(
+        null=True, blank=True, help_text="Id of the last message folded into the summary"
+    )
     
     class Meta:
         ordering = ['-updated_at']
@@ -50,6 +54,10 @@ class AgentContext(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='context_cache')
     context_key = models.CharField(max_length=100, help_text="e.g., 'recent_grades', 'class_schedule'")
     context_data = models.JSONField(help_text="Cached data in JSON format")
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='+',
+        help_text="Student whose data this was built from; empty for school-wide data"
+    )
     cached_at = models.DateTimeField(auto_now=True)
     expires_at = models.DateTimeField(null=True, blank=True, help_text="When this cache should be invalidated")
     
@@ -82,3 +90,19 @@ class AgentAction(models.Model):
     
     def __str__(self):
         return f"{self.get_action_type_display()} - {self.performed_at.strftime('%Y-%m-%d %H:%M')}"
+
+
+class TokenUsageDaily(models.Model):
+    """LLM usage per user and day, kept up to date by ai_assistant.usage.record_usage"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='llm_usage')
+    date = models.DateField()
+    responses = models.PositiveIntegerField(default=0)
+    cached_responses = models.PositiveIntegerField(default=0, help_text="Answered from the response cache")
+    tokens_used = models.PositiveBigIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['user', 'date']
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.date}: {self.tokens_used} tokens"
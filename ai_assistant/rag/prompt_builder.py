@@ -5,6 +5,13 @@ Constructs context-aware prompts with retrieved data
 import json
 from datetime import datetime
 
+from django.conf import settings
+
+from ai_assistant.tokens import count_tokens, pack, query_terms, MESSAGE_OVERHEAD
+
+# Most recent messages considered for the history budget
+HISTORY_CANDIDATES = 50
+
 
 class PromptBuilder:
     """Build prompts for LLM with context data"""
@@ -95,7 +102,7 @@ Current date: {current_date}
         
         # Add context if available
         if context_data:
-            context_message = self._format_context(context_data)
+            context_message = self._format_context(context_data, user_message)
             if context_message:
                 messages.append({
                     "role": "system",
@@ -110,72 +117,77 @@ Current date: {current_date}
         
         return messages
     
-    def _format_context(self, context_data):
-        """Format context data for LLM consumption"""
-        formatted_parts = []
+    def _format_context(self, context_data, user_message=''):
+        """Format context data for LLM consumption, packed into LLM_CONTEXT_TOKEN_BUDGET"""
+        parts = pack(self._context_sections(context_data), settings.LLM_CONTEXT_TOKEN_BUDGET,
+                     query_terms(user_message))
+        return "\n".join(parts) if parts else None
+    
+    def _context_sections(self, context_data):
+        """Context as [(header, [line, ...])], most recent or most important line first"""
+        sections = []
         
-        # Format grades
+        # Format grades, newest first
         if 'grades' in context_data and context_data['grades']:
-            formatted_parts.append("RECENT GRADES:")
-            for grade in context_data['grades'][:10]:  # Limit to 10 most recent
-                formatted_parts.append(
-                    f"- {grade['student__first_name']} {grade['student__last_name']}: "
-                    f"{grade['subject__name']} = {grade['value']} ({grade['date']})"
-                    f"{' - ' + grade['comment'] if grade.get('comment') else ''}"
-                )
+            grades = sorted(context_data['grades'], key=lambda grade: str(grade['date']), reverse=True)
+            sections.append(("RECENT GRADES:", [
+                f"- {grade['student__first_name']} {grade['student__last_name']}: "
+                f"{grade['subject__name']} = {grade['value']} ({grade['date']})"
+                f"{' - ' + grade['comment'] if grade.get('comment') else ''}"
+                for grade in grades
+            ]))
         
         # Format performance summary
         if 'performance' in context_data:
             perf = context_data['performance']
-            formatted_parts.append(f"\nPERFORMANCE SUMMARY for {perf['student_name']}:")
-            formatted_parts.append(f"Class: {perf['class_name']}")
-            formatted_parts.append(f"Attendance: {perf['attendance_rate']}% ({perf['present_days']}/{perf['total_days']} days)")
+            sections.append((f"\nPERFORMANCE SUMMARY for {perf['student_name']}:", [
+                f"Class: {perf['class_name']}",
+                f"Attendance: {perf['attendance_rate']}% ({perf['present_days']}/{perf['total_days']} days)",
+            ]))
             
             if perf['subject_averages']:
-                formatted_parts.append("Subject Averages:")
-                for subj in perf['subject_averages']:
-                    formatted_parts.append(
-                        f"  - {subj['subject__name']}: {subj['avg_grade']:.2f} "
-                        f"({subj['count']} grades)"
-                    )
-        
-        # Format struggling students
+                sections.append(("Subject Averages:", [
+                    f"  - {subj['subject__name']}: {subj['avg_grade']:.2f} ({subj['count']} grades)"
+                    for subj in perf['subject_averages']
+                ]))
+        
+        # Format struggling students, lowest average first
         if 'struggling_students' in context_data and context_data['struggling_students']:
-            formatted_parts.append("\nSTRUGGLING STUDENTS:")
-            for student in context_data['struggling_students'][:5]:  # Top 5
-                formatted_parts.append(
-                    f"- {student['student__first_name']} {student['student__last_name']} "
-                    f"({student['student__student_class__name']}): "
-                    f"Avg {student['avg_grade']:.2f}"
-                )
+            sections.append(("\nSTRUGGLING STUDENTS:", [
+                f"- {student['student__first_name']} {student['student__last_name']} "
+                f"({student['student__student_class__name']}): "
+                f"Avg {student['avg_grade']:.2f}"
+                for student in context_data['struggling_students']
+            ]))
         
         # Format skill map
         if 'skill_map' in context_data and context_data['skill_map']:
             skills = context_data['skill_map']
-            formatted_parts.append("\nSKILL MAP:")
-            formatted_parts.append(f"- Critical Thinking: {skills['critical_thinking']}/100")
-            formatted_parts.append(f"- Creativity: {skills['creativity']}/100")
-            formatted_parts.append(f"- Communication: {skills['communication']}/100")
-            formatted_parts.append(f"- Teamwork: {skills['teamwork']}/100")
-            formatted_parts.append(f"- Adaptive Learning: {skills['adaptive_learning']}/100")
+            sections.append(("\nSKILL MAP:", [
+                f"- Critical Thinking: {skills['critical_thinking']}/100",
+                f"- Creativity: {skills['creativity']}/100",
+                f"- Communication: {skills['communication']}/100",
+                f"- Teamwork: {skills['teamwork']}/100",
+                f"- Adaptive Learning: {skills['adaptive_learning']}/100",
+            ]))
         
         # Format resources
         if 'resources' in context_data and context_data['resources']:
-            formatted_parts.append("\nAVAILABLE RESOURCES:")
-            for res in context_data['resources'][:5]:
-                formatted_parts.append(
-                    f"- {res['title']} ({res['resource_type']}): {res['description'][:100]}"
-                )
+            sections.append(("\nAVAILABLE RESOURCES:", [
+                f"- {res['title']} ({res['resource_type']}): {res['description'][:100]}"
+                for res in context_data['resources']
+            ]))
         
-        return "\n".join(formatted_parts) if formatted_parts else None
+        return sections
     
-    def add_conversation_history(self, messages, history):
+    def add_conversation_history(self, messages, history, summary=''):
         """
         Add previous conversation messages to prompt
         
         Args:
             messages: Current messages list
             history: List of previous Message objects
+            summary: Summary of the messages before `history` (optional)
         
         Returns:
             Updated messages list
@@ -184,11 +196,28 @@ Current date: {current_date}
         user_message = messages.pop()  # Remove current user message
         
         
-        # Get last 10 messages (newest first)
-        last_messages = history.order_by('-timestamp')[:10]
+        # Newest first; as many as fit in LLM_HISTORY_TOKEN_BUDGET
+        last_messages = list(history.order_by('-id')[:HISTORY_CANDIDATES])
+        
+        # The views save the current message before the agent runs; don't send it twice
+        if last_messages and last_messages[0].role == 'user' and last_messages[0].content == user_message['content']:
+            last_messages.pop(0)
+        
+        kept, used = [], 0
+        for msg in last_messages:
+            used += count_tokens(msg.content) + MESSAGE_OVERHEAD
+            if used > settings.LLM_HISTORY_TOKEN_BUDGET:
+                break
+            kept.append(msg)
+        
+        if summary:
+            messages.append({
+                "role": "system",
+                "content": f"CONVERSATION SUMMARY (earlier messages):\n{summary}"
+            })
         
         # Add in chronological order (oldest first)
-        for msg in reversed(last_messages):
+        for msg in reversed(kept):
             messages.append({
                 "role": msg.role,
                 "content": msg.content
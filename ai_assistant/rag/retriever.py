@@ -1,22 +1,123 @@
 """
 Context Retriever for AI Agents
 Retrieves relevant data from LearnSphere database for context-aware AI responses
+
+Within a conversation, results are cached in AgentContext rows with a TTL
+per kind of data, so follow-up questions reuse them. Grade, attendance and
+skill-map writes drop the entries built from the affected students
+(invalidate_student_context). Entries covering a whole class or the school
+are not deleted: their keys carry a version (a DataVersion row, shared by
+all processes) that those writes bump, so only the affected classes'
+entries go stale. Expired and surplus entries are evicted whenever a new
+one is stored.
 """
-from django.db.models import Avg, Count, Q
-from django.utils import timezone
+import hashlib
+import json
 from datetime import timedelta
+
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
 from core.models import Subject
 from journal.models import Grade, Attendance
-from analytics.models import SkillMap
+from analytics.models import DataVersion, SkillMap
 from resources.models import Resource
+from ai_assistant.models import AgentContext
+
+# How long each kind of context stays fresh
+CONTEXT_TTLS = {
+    'grades': timedelta(minutes=10),
+    'performance': timedelta(minutes=10),
+    'struggling': timedelta(minutes=10),
+    'skill_map': timedelta(hours=1),
+    'resources': timedelta(hours=1),
+}
+# Kinds built from Grade/Attendance rows
+JOURNAL_KINDS = ('grades', 'performance', 'struggling')
+# Entries kept per conversation; the oldest are evicted first
+MAX_CONTEXTS_PER_CONVERSATION = 50
+
+
+# ========== INVALIDATION ==========
+
+def _version_name(class_id=None):
+    return f"ai_context:class:{class_id}" if class_id else 'ai_context:school'
+
+
+def context_version(class_id=None):
+    """Version of the journal data of a class, or of the whole school without one"""
+    return DataVersion.objects.current(_version_name(class_id))
+
+
+def context_key(kind, params, version=None):
+    """AgentContext key: the kind, then a hash of the parameters, so any subject name fits"""
+    digest = hashlib.sha256(json.dumps([list(params), version], cls=DjangoJSONEncoder).encode()).hexdigest()
+    return f"{kind}:{digest[:40]}"
+
+
+def invalidate_student_context(student_ids, kinds=JOURNAL_KINDS):
+    """
+    Drop cached context of the given kinds that these students' data went into
+    (one DELETE), and for journal kinds move the versions of their classes and
+    of the school on.
+    """
+    student_ids = list(student_ids)
+    by_kind = Q()
+    for kind in kinds:
+        by_kind |= Q(context_key__startswith=f"{kind}:")
+    AgentContext.objects.filter(by_kind, student_id__in=student_ids).delete()
+
+    if set(kinds) & set(JOURNAL_KINDS):
+        class_ids = get_user_model().objects.filter(id__in=student_ids, student_class__isnull=False).values_list(
+            'student_class_id', flat=True).distinct()
+        DataVersion.objects.bump(*(_version_name(class_id) for class_id in [None, *class_ids]))
 
 
 class ContextRetriever:
     """Retrieve context from database for AI agents"""
     
-    def __init__(self, user):
+    def __init__(self, user, conversation=None):
         self.user = user
+        self.conversation = conversation
+    
+    def _cached(self, kind, params, loader, student_id=None, class_id=None):
+        """
+        Return loader() through the conversation's AgentContext cache.
+        Without a conversation nothing is cached. Values are JSON round-tripped
+        on both paths so a hit looks exactly like a miss. Journal entries not
+        built from one student are keyed by the version of `class_id`'s data,
+        or of the school's.
+        """
+        if self.conversation is None:
+            return loader()
+        
+        version = context_version(class_id) if student_id is None and kind in JOURNAL_KINDS else None
+        key = context_key(kind, params, version)
+        now = timezone.now()
+        cached = AgentContext.objects.filter(
+            conversation=self.conversation, context_key=key, expires_at__gt=now
+        ).values_list('context_data', flat=True).first()
+        if cached is not None:
+            return cached['value']
+        
+        value = json.loads(json.dumps(loader(), cls=DjangoJSONEncoder))
+        AgentContext.objects.bulk_create(
+            [AgentContext(conversation=self.conversation, context_key=key, context_data={'value': value},
+                          student_id=student_id, expires_at=now + CONTEXT_TTLS[kind])],
+            update_conflicts=True,
+            unique_fields=['conversation', 'context_key'],
+            update_fields=['context_data', 'student', 'expires_at', 'cached_at'],
+        )
+        self._evict(now)
+        return value
+    
+    def _evict(self, now):
+        entries = AgentContext.objects.filter(conversation=self.conversation)
+        surplus = list(entries.order_by('-cached_at', '-id').values_list('id', flat=True)[MAX_CONTEXTS_PER_CONVERSATION:])
+        entries.filter(Q(expires_at__lte=now) | Q(id__in=surplus)).delete()
     
     def get_student_grades(self, student_id=None, subject_id=None, days=30):
         """
@@ -30,6 +131,10 @@ class ContextRetriever:
         Returns:
             List of grade dictionaries with student, subject, value, date, comment
         """
+        return self._cached('grades', (student_id, subject_id, days),
+                            lambda: self._load_student_grades(student_id, subject_id, days), student_id=student_id)
+    
+    def _load_student_grades(self, student_id, subject_id, days):
         since_date = timezone.now() - timedelta(days=days)
         grades = Grade.objects.filter(date__gte=since_date)
         
@@ -61,6 +166,10 @@ class ContextRetriever:
         Returns:
             Dictionary with average grades per subject, attendance rate, etc.
         """
+        return self._cached('performance', (student_id,),
+                            lambda: self._load_student_performance_summary(student_id), student_id=student_id)
+    
+    def _load_student_performance_summary(self, student_id):
         User = settings.AUTH_USER_MODEL
         from django.apps import apps
         UserModel = apps.get_model(User)
@@ -111,6 +220,10 @@ class ContextRetriever:
         Returns:
             List of students with low performance
         """
+        return self._cached('struggling', (class_id, subject_id, threshold),
+                            lambda: self._load_struggling_students(class_id, subject_id, threshold), class_id=class_id)
+    
+    def _load_struggling_students(self, class_id, subject_id, threshold):
         since_date = timezone.now() - timedelta(days=30)
         
         # Build query
@@ -137,6 +250,10 @@ class ContextRetriever:
     
     def get_student_skill_map(self, student_id):
         """Get AI-generated skill map for student"""
+        return self._cached('skill_map', (student_id,),
+                            lambda: self._load_student_skill_map(student_id), student_id=student_id)
+    
+    def _load_student_skill_map(self, student_id):
         try:
             skill_map = SkillMap.objects.get(student_id=student_id)
             return {
@@ -145,14 +262,18 @@ class ContextRetriever:
                 'communication': skill_map.communication,
                 'teamwork': skill_map.teamwork,
                 'adaptive_learning': skill_map.adaptive_learning,
-                'generated_at': skill_map.generated_at
+                'generated_at': skill_map.updated_at
             }
         except SkillMap.DoesNotExist:
             return None
     
     def get_recommended_resources(self, subject_name=None, limit=5):
         """Get recommended learning resources"""
-        resources = Resource.objects.filter(is_approved=True)
+        return self._cached('resources', (subject_name, limit),
+                            lambda: self._load_recommended_resources(subject_name, limit))
+    
+    def _load_recommended_resources(self, subject_name, limit):
+        resources = Resource.objects.order_by('-created_at')
         
         if subject_name:
             resources = resources.filter(
@@ -162,7 +283,7 @@ class ContextRetriever:
         
         return list(resources.values(
             'id', 'title', 'description', 'resource_type', 
-            'file', 'url', 'uploaded_at'
+            'file', 'link', 'created_at'
         )[:limit])
     
     def get_class_schedule(self, class_id):
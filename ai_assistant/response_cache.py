@@ -0,0 +1,107 @@
+"""
+LLM response cache
+Answers are cached in the 'llm_responses' cache (TTL, least recently used
+entries culled beyond MAX_ENTRIES). The key is built from the normalized
+system prompt, a fingerprint of the retrieved context, the earlier turns
+and the normalized question. A key is only shared between users when
+nothing in the prompt is private, i.e. there are no earlier turns and no
+context beyond SHARED_CONTEXT_KINDS. Otherwise it is scoped to the user.
+"""
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+
+CACHE_ALIAS = 'llm_responses'
+# Context kinds that hold no personal data
+SHARED_CONTEXT_KINDS = {'resources'}
+
+APOSTROPHES = re.compile(r"[`´‘’ʻʼ]")
+# Sentence punctuation only, so "2x + 5 = 15" and "2.5" keep their meaning
+TRAILING_PUNCTUATION = re.compile(r"[?!.,;:]+(?=\s|$)")
+
+
+def normalize(text):
+    """Case, Unicode form, apostrophe variants, sentence punctuation and spacing folded away"""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = APOSTROPHES.sub("'", text)
+    text = TRAILING_PUNCTUATION.sub('', text)
+    return ' '.join(text.split())
+
+
+def fingerprint(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+def response_key(user, messages, context=None):
+    """Cache key for the answer to `messages`, built with `context` retrieved for `user`"""
+    system = [normalize(msg['content']) for msg in messages if msg['role'] == 'system']
+    turns = [(msg['role'], normalize(msg['content'])) for msg in messages if msg['role'] != 'system']
+    earlier, question = turns[:-1], turns[-1][1]
+    context = {kind: value for kind, value in (context or {}).items() if value}
+
+    private = bool(earlier) or any(kind not in SHARED_CONTEXT_KINDS for kind in context)
+    scope = f"user{user.pk}" if private else 'shared'
+    return f"llm:{settings.LLM_MODEL}:{scope}:{fingerprint([system, fingerprint(context), earlier, question])}"
+
+
+class CacheStats:
+    """Hit and miss counters for this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        with self.lock:
+            hits, misses = self.hits, self.misses
+        return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0}
+
+
+stats = CacheStats()
+
+
+def _enabled():
+    return settings.LLM_RESPONSE_CACHE_SECONDS > 0
+
+
+def get_response(key):
+    """Cached {'response', 'tokens_used'} for `key`, or None"""
+    if not _enabled():
+        return None
+    cached = caches[CACHE_ALIAS].get(key)
+    stats.record(cached is not None)
+    return cached
+
+
+def store_response(key, response, tokens_used):
+    if _enabled():
+        caches[CACHE_ALIAS].set(key, {'response': response, 'tokens_used': tokens_used},
+                                timeout=settings.LLM_RESPONSE_CACHE_SECONDS)
+
+
+async def aget_response(key):
+    if not _enabled():
+        return None
+    cached = await caches[CACHE_ALIAS].aget(key)
+    stats.record(cached is not None)
+    return cached
+
+
+async def astore_response(key, response, tokens_used):
+    if _enabled():
+        await caches[CACHE_ALIAS].aset(key, {'response': response, 'tokens_used': tokens_used},
+                                       timeout=settings.LLM_RESPONSE_CACHE_SECONDS)
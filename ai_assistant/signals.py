@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from analytics.models import SkillMap
+from journal.models import Grade, Attendance
+from .rag.retriever import invalidate_student_context
+
+# Single-row writes drop the cached agent context built from the student's
+# data. The bulk gradebook and roll-call saves invalidate for their own rows.
+
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def invalidate_journal_context(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_student_context([instance.student_id])
+
+
+@receiver(post_save, sender=SkillMap)
+@receiver(post_delete, sender=SkillMap)
+def invalidate_skill_map_context(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_student_context([instance.student_id], kinds=('skill_map',))
@@ -0,0 +1,98 @@
+"""
+Rolling conversation summaries
+Prompts carry Conversation.summary plus the messages after
+summarized_through, so their size stays flat however long a session runs.
+Once LLM_SUMMARY_EVERY messages have piled up beyond the
+LLM_RECENT_MESSAGES sent verbatim, the older ones are folded into the
+summary with one LLM call. The views hand that call to a background
+thread (schedule_summary), so it never delays a response. A failed call
+leaves everything as it was and is retried on a later turn.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .llm import get_llm_client
+from .models import Conversation
+from .tokens import count_tokens, message_tokens
+from .usage import record_usage
+
+logger = logging.getLogger(__name__)
+
+# Messages folded per update, so a backlog after failed calls is caught up in steps
+MAX_FOLDED_MESSAGES = 40
+
+# One thread per process, so folds queue up instead of competing for the LLM
+_folder = ThreadPoolExecutor(max_workers=1, thread_name_prefix='summaries')
+
+SUMMARY_INSTRUCTIONS = """You maintain the running summary of a conversation between a LearnSphere user and an AI assistant.
+Merge the new messages into the previous summary. Keep names, grades, subjects, decisions, the user's goals and open questions; drop greetings and repetition.
+Write at most 150 words, in the language the conversation is in. Reply with the summary only.
+"""
+
+
+def summary_messages(summary, messages):
+    """LLM messages asking to fold (role, content) pairs into `summary`"""
+    transcript = "\n".join(f"{role}: {content}" for role, content in messages)
+    return [
+        {'role': 'system', 'content': SUMMARY_INSTRUCTIONS},
+        {'role': 'user', 'content': f"PREVIOUS SUMMARY:\n{summary or '-'}\n\nNEW MESSAGES:\n{transcript}"},
+    ]
+
+
+def update_summary(conversation):
+    """
+    Fold the older unsummarized messages into the summary when enough have
+    piled up. Returns True if the summary moved forward.
+    """
+    through = conversation.summarized_through
+    pending = conversation.messages.filter(id__gt=through or 0)
+    if pending.count() < settings.LLM_RECENT_MESSAGES + settings.LLM_SUMMARY_EVERY:
+        return False
+
+    # Everything but the recent messages, oldest first
+    recent = list(pending.order_by('-id').values_list('id', flat=True)[:settings.LLM_RECENT_MESSAGES])
+    folded = list(
+        pending.filter(id__lt=recent[-1]).order_by('id').values_list('id', 'role', 'content')[:MAX_FOLDED_MESSAGES]
+    )
+    prompt = summary_messages(conversation.summary, [(role, content) for _, role, content in folded])
+    try:
+        result = get_llm_client().complete(prompt)
+    except Exception as e:
+        logger.warning("Could not summarize conversation %s: %s", conversation.pk, e)
+        return False
+
+    summary = result.text.strip()
+    # Only the first of two concurrent updates lands
+    updated = Conversation.objects.filter(pk=conversation.pk, summarized_through=through).update(
+        summary=summary, summarized_through=folded[-1][0]
+    )
+    record_usage(conversation.user_id, result.tokens_used or message_tokens(prompt) + count_tokens(summary),
+                 response=False)
+    if updated:
+        conversation.summary, conversation.summarized_through = summary, folded[-1][0]
+    return bool(updated)
+
+
+def _fold(conversation_id):
+    try:
+        conversation = Conversation.objects.filter(pk=conversation_id).first()
+        if conversation is not None:
+            update_summary(conversation)
+    except Exception:
+        logger.exception("Summary update failed for conversation %s", conversation_id)
+    finally:
+        # Connections are per thread; don't leave this one open between folds
+        connections.close_all()
+
+
+def fold_in_background(conversation_id):
+    _folder.submit(_fold, conversation_id)
+
+
+def schedule_summary(conversation):
+    """Update the summary in the background once the current transaction commits"""
+    transaction.on_commit(partial(fold_in_background, conversation.pk))
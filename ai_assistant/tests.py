@@ -1,3 +1,338 @@
-from django.test import TestCase
+import datetime
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from analytics.models import SkillMap
+from core.models import School, Class, Subject
+from journal.attendance_service import save_attendance
+from journal.grade_service import save_grades
+from journal.models import Grade
+from .agents import StudentAgent
+from . import response_cache
+from .llm import FakeBackend, LLMClient, LLMError, get_llm_client
+from .models import Conversation, Message, AgentContext, TokenUsageDaily
+from .rag import retriever as retriever_module
+from .rag.prompt_builder import PromptBuilder
+from .rag.retriever import ContextRetriever, context_key, context_version
+from .summaries import update_summary
+from .tokens import count_tokens, message_tokens
+
+
+class ContextCacheTests(TestCase):
+    def setUp(self):
+        school = School.objects.create(name="Test School", address="Address")
+        class_obj = Class.objects.create(name="9-A", school=school)
+        self.math = Subject.objects.create(name="Math")
+        self.teacher = User.objects.create_user(username='teacher', password='password123', role='teacher')
+        self.student = User.objects.create_user(username='student', password='password123', role='student',
+                                                student_class=class_obj)
+        self.other = User.objects.create_user(username='other', password='password123', role='student',
+                                              student_class=class_obj)
+        self.conversation = Conversation.objects.create(user=self.teacher, agent_type='teacher')
+        self.retriever = ContextRetriever(self.teacher, self.conversation)
+        self.today = timezone.now().date()
+        save_grades(self.teacher, self.math, self.today, [{'student': self.student, 'value': 4, 'comment': ''}])
+
+    def queries(self, call):
+        with CaptureQueriesContext(connection) as ctx:
+            value = call()
+        return value, len(ctx.captured_queries)
+
+    def test_hit_skips_the_journal_and_matches_the_miss(self):
+        fresh, _ = self.queries(lambda: ContextRetriever(self.teacher).get_student_performance_summary(self.student.id))
+        miss, _ = self.queries(lambda: self.retriever.get_student_performance_summary(self.student.id))
+        hit, hit_queries = self.queries(lambda: self.retriever.get_student_performance_summary(self.student.id))
+        self.assertEqual(miss, hit)
+        self.assertEqual(hit['subject_averages'], fresh['subject_averages'])
+        self.assertEqual(hit_queries, 1)
+
+        # Expired entries are reloaded
+        AgentContext.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        _, reload_queries = self.queries(lambda: self.retriever.get_student_performance_summary(self.student.id))
+        self.assertGreater(reload_queries, 1)
+
+    def test_journal_writes_invalidate_affected_students_only(self):
+        other_class = Class.objects.create(name="9-B", school=self.student.student_class.school)
+        self.retriever.get_student_grades(student_id=self.student.id)
+        self.retriever.get_student_grades(student_id=self.other.id)
+        self.retriever.get_recommended_resources()
+        self.assertEqual(self.retriever.get_struggling_students(class_id=self.student.student_class_id), [])
+        self.assertEqual(self.retriever.get_struggling_students(class_id=other_class.id), [])
+        self.assertEqual(self.retriever.get_struggling_students(), [])
+
+        save_grades(self.teacher, self.math, self.today, [{'student': self.student, 'value': 2, 'comment': ''}])
+        student_keys = set(AgentContext.objects.filter(student__isnull=False).values_list('context_key', flat=True))
+        # Only the student's own entries are deleted
+        self.assertEqual(student_keys, {context_key('grades', (self.other.id, None, 30))})
+        self.assertEqual(AgentContext.objects.filter(student__isnull=True).count(), 4)
+        self.assertEqual(self.retriever.get_student_grades(student_id=self.student.id)[0]['value'], 2)
+
+        # The student's class and the school moved to a new version, the other class did not
+        struggling = self.retriever.get_struggling_students(class_id=self.student.student_class_id)
+        self.assertEqual([row['student__id'] for row in struggling], [self.student.id])
+        self.assertEqual([row['student__id'] for row in self.retriever.get_struggling_students()], [self.student.id])
+        cached, hit_queries = self.queries(lambda: self.retriever.get_struggling_students(class_id=other_class.id))
+        # One query for the class's version, one for the entry
+        self.assertEqual((cached, hit_queries), ([], 2))
+
+        save_attendance(self.today, [(self.other, 'absent')])
+        Grade.objects.create(student=self.student, subject=self.math, teacher=self.teacher, value=5,
+                             date=self.today - datetime.timedelta(days=1))
+        self.assertFalse(AgentContext.objects.filter(student__isnull=False).exists())
+
+    def test_versions_are_shared_and_keys_fit(self):
+        from analytics.models import DataVersion
+
+        self.assertEqual(self.retriever.get_struggling_students(), [])
+        # A grade written by another process only bumps the version row
+        Grade.objects.filter(student=self.student).update(value=2)
+        DataVersion.objects.bump('ai_context:school')
+        self.assertEqual([row['student__id'] for row in self.retriever.get_struggling_students()], [self.student.id])
+
+        self.retriever.get_recommended_resources(subject_name="Matematika " * 20)
+        max_length = AgentContext._meta.get_field('context_key').max_length
+        self.assertTrue(all(len(key) <= max_length for key in AgentContext.objects.values_list('context_key', flat=True)))
+
+    def test_skill_map_updates_invalidate_skill_map(self):
+        skill_map = SkillMap.objects.create(student=self.student, creativity=40)
+        self.assertEqual(self.retriever.get_student_skill_map(self.student.id)['creativity'], 40)
+        skill_map.creativity = 70
+        skill_map.save()
+        self.assertEqual(self.retriever.get_student_skill_map(self.student.id)['creativity'], 70)
+
+    def test_oldest_entries_are_evicted(self):
+        limit = retriever_module.MAX_CONTEXTS_PER_CONVERSATION
+        for days in range(1, limit + 3):
+            self.retriever.get_student_grades(days=days)
+        self.assertEqual(AgentContext.objects.filter(conversation=self.conversation).count(), limit)
+        self.assertFalse(AgentContext.objects.filter(
+            context_key=context_key('grades', (None, None, 1), context_version())).exists())
+
+
+class StreamMessageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password123', role='student')
+        self.conversation = Conversation.objects.create(user=self.user, agent_type='student')
+        self.url = reverse('ai_assistant:stream_message', args=[self.conversation.id])
+        patcher = mock.patch('ai_assistant.views.fold_in_background')
+        self.fold = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def stream(self, message):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(self.url, {'message': message}, content_type='application/json')
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        return response, [
+            (event.split('\n')[0][len('event: '):], json.loads(event.split('\n')[1][len('data: '):]))
+            for event in body.strip().split('\n\n')
+        ]
+
+    @override_settings(LLM_BACKEND='ai_assistant.llm.FakeBackend')
+    async def test_tokens_are_streamed_and_response_saved(self):
+        await caches[response_cache.CACHE_ALIAS].aclear()
+        response, events = await self.stream('Tenglamani tushunmadim')
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual([data['text'] for event, data in events if event == 'token'],
+                         ['Javob: ', 'Tenglamani ', 'tushunmadim '])
+        event, done = events[-1]
+        self.assertEqual(event, 'done')
+        saved = await Message.objects.aget(id=done['message_id'])
+        self.assertEqual((saved.role, saved.content), ('assistant', "Javob: Tenglamani tushunmadim "))
+        self.assertEqual(await Message.objects.filter(conversation=self.conversation, role='user').acount(), 1)
+        self.fold.assert_called_once_with(self.conversation.id)
+
+        # Usage lands on the message and in the user's daily total; a cached repeat costs nothing
+        self.assertGreater(saved.tokens_used, 0)
+        repeat = await Conversation.objects.acreate(user=self.user, agent_type='student')
+        self.url = reverse('ai_assistant:stream_message', args=[repeat.id])
+        await self.stream('tenglamani tushunmadim?')
+        usage = await TokenUsageDaily.objects.aget(user=self.user)
+        self.assertEqual((usage.responses, usage.cached_responses, usage.tokens_used), (2, 1, saved.tokens_used))
+
+    async def test_other_users_conversation_is_not_found(self):
+        other = await User.objects.acreate(username='other', role='student')
+        self.conversation.user = other
+        await self.conversation.asave()
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(self.url, {'message': 'Salom'}, content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+
+class FlakyBackend(FakeBackend):
+    """Fails with a transient error the first `failures` times"""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.attempts = 0
+
+    def _fail(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("flaky")
+
+
+class LLMClientTests(TestCase):
+    messages = [{'role': 'user', 'content': 'Salom'}]
+
+    def test_transient_failures_are_retried_within_the_budget(self):
+        client = LLMClient(FlakyBackend(failures=2), max_retries=2, backoff=0)
+        self.assertEqual(client.complete(self.messages).text, 'Javob: Salom')
+
+        client = LLMClient(FlakyBackend(failures=3), max_retries=2, backoff=0)
+        with self.assertRaises(LLMError):
+            client.complete(self.messages)
+        self.assertEqual(client.backend.attempts, 3)
+        self.assertEqual(client.metrics.snapshot()['errors'], 1)
+
+    def test_slow_attempts_time_out_and_the_deadline_stops_retries(self):
+        client = LLMClient(FakeBackend(latency=0.2), timeout=0.05, max_retries=5, deadline=0.12, backoff=0)
+        with self.assertRaises(LLMError):
+            client.complete(self.messages)
+        metrics = client.metrics.snapshot()
+        # Cut short by the deadline, not by the six attempts max_retries allows
+        self.assertIn(metrics['timeouts'], (2, 3))
+        self.assertLess(metrics['p50_ms'], 200)
+
+    async def test_stream_retries_only_before_the_first_chunk(self):
+        client = LLMClient(FlakyBackend(failures=1), backoff=0)
+        chunks = [text async for text in client.stream(self.messages)]
+        self.assertEqual(''.join(chunks).strip(), 'Javob: Salom')
+        self.assertEqual(client.metrics.snapshot()['retries'], 1)
+
+    def test_one_client_per_process_until_settings_change(self):
+        with override_settings(LLM_BACKEND='ai_assistant.llm.FakeBackend'):
+            client = get_llm_client()
+            self.assertIs(get_llm_client(), client)
+            self.assertEqual(StudentAgent(User(role='student')).call_llm(self.messages)['response'], 'Javob: Salom')
+            with override_settings(LLM_MAX_RETRIES=0):
+                self.assertIsNot(get_llm_client(), client)
+
+
+@override_settings(LLM_BACKEND='ai_assistant.llm.FakeBackend')
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        caches[response_cache.CACHE_ALIAS].clear()
+        self.students = [User.objects.create_user(username=f'student{i}', password='password123', role='student')
+                         for i in range(2)]
+
+    def messages(self, question, history=()):
+        return [{'role': 'system', 'content': 'You are an AI Tutor'}, *history, {'role': 'user', 'content': question}]
+
+    def test_key_normalization_and_scope(self):
+        first, second = self.students
+        key = response_cache.response_key(first, self.messages("Explain photosynthesis?"))
+        self.assertEqual(key, response_cache.response_key(second, self.messages("  explain   PHOTOSYNTHESIS ")))
+        self.assertNotEqual(response_cache.response_key(first, self.messages("2x + 5 = 15")),
+                            response_cache.response_key(first, self.messages("2x - 5 = 15")))
+
+        # Anything private in the prompt keeps the answer to its user
+        performance = {'performance': {'student_name': 'Ali', 'attendance_rate': 90}}
+        self.assertNotEqual(response_cache.response_key(first, self.messages("Qanday o'qiyapman?"), performance),
+                            response_cache.response_key(second, self.messages("Qanday o'qiyapman?"), performance))
+        history = [{'role': 'user', 'content': 'Salom'}, {'role': 'assistant', 'content': 'Salom!'}]
+        self.assertIn(f':user{first.pk}:', response_cache.response_key(first, self.messages("Davom eting", history)))
+
+    def test_repeated_question_skips_the_llm(self):
+        first, second = self.students
+        answer = StudentAgent(first).call_llm(self.messages("Explain photosynthesis"), {'resources': []})
+        repeat = StudentAgent(second).call_llm(self.messages("explain photosynthesis?"), {'resources': []})
+        self.assertEqual(repeat['response'], answer['response'])
+        self.assertTrue(repeat['cached'])
+        self.assertEqual(repeat['tokens_used'], 0)
+        self.assertEqual(get_llm_client().metrics.snapshot()['calls'], 1)
+        self.assertGreater(response_cache.stats.snapshot()['hits'], 0)
+
+    async def test_streamed_answers_are_cached(self):
+        agent = StudentAgent(self.students[0])
+        streamed = ''.join([text async for text in agent.stream_llm(self.messages("Fotosintez nima?"))])
+        cached = [text async for text in agent.stream_llm(self.messages("fotosintez nima"))]
+        self.assertEqual(cached, [streamed])
+
+
+@override_settings(LLM_CONTEXT_TOKEN_BUDGET=120, LLM_HISTORY_TOKEN_BUDGET=200)
+class PromptPackingTests(TestCase):
+    def grade(self, subject, day):
+        return {'student__first_name': 'Ali', 'student__last_name': 'Valiyev', 'subject__name': subject,
+                'value': 4, 'date': datetime.date(2026, 3, day), 'comment': ''}
+
+    def test_context_fills_the_budget_by_relevance_then_recency(self):
+        grades = [self.grade('Math', day) for day in range(1, 29)] + [self.grade('Physics', 1)]
+        context = PromptBuilder('teacher').build_prompt("How is Ali doing in physics?", {'grades': grades})[1]['content']
+        self.assertLessEqual(count_tokens(context), 120 + 10)
+        lines = context.split('\n')
+        # The oldest grade gets in for being about physics; the rest of the room goes to the newest math grades
+        self.assertIn('Physics', lines[-1])
+        self.assertIn('2026-03-28', lines[2])
+        self.assertNotIn('2026-03-01', ' '.join(line for line in lines if 'Math' in line))
+
+    def test_history_keeps_the_newest_turns_that_fit(self):
+        user = User.objects.create_user(username='parent', password='password123', role='parent')
+        conversation = Conversation.objects.create(user=user, agent_type='parent')
+        for i in range(30):
+            Message.objects.create(conversation=conversation, role='user' if i % 2 == 0 else 'assistant',
+                                   content=f"xabar {i} " + "so'z " * 20)
+        Message.objects.create(conversation=conversation, role='user', content='Yangi savol')
+
+        builder = PromptBuilder('parent')
+        messages = builder.add_conversation_history(builder.build_prompt('Yangi savol'), conversation.messages.all())
+        history = messages[1:-1]
+        self.assertLessEqual(message_tokens(history), 200)
+        self.assertTrue(history[-1]['content'].startswith('xabar 29 '))
+        self.assertEqual(messages[-1]['content'], 'Yangi savol')
+        self.assertNotEqual(history[-1]['content'], 'Yangi savol')
+
+
+@override_settings(LLM_BACKEND='ai_assistant.llm.FakeBackend', LLM_RECENT_MESSAGES=2, LLM_SUMMARY_EVERY=2)
+class ConversationSummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='password123', role='student')
+        self.conversation = Conversation.objects.create(user=self.user, agent_type='student')
+
+    def say(self, *contents):
+        return [Message.objects.create(conversation=self.conversation, role='user' if i % 2 == 0 else 'assistant',
+                                       content=content)
+                for i, content in enumerate(contents)]
+
+    def test_older_messages_are_folded_every_few_turns(self):
+        first = self.say('Kasrlar nima?', 'Kasr butunning qismi.', 'Misol bering')
+        self.assertFalse(update_summary(self.conversation))
+
+        self.say('1/2 va 1/4')
+        self.assertTrue(update_summary(self.conversation))
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.summarized_through, first[1].id)
+        self.assertIn('Kasr butunning qismi', self.conversation.summary)
+        usage = TokenUsageDaily.objects.get(user=self.user)
+        self.assertEqual(usage.responses, 0)
+        self.assertGreater(usage.tokens_used, 0)
+
+        # The prompt carries the summary and only the messages after it
+        messages, _ = StudentAgent(self.user, self.conversation).prepare_messages('Yana bittasi')
+        contents = [msg['content'] for msg in messages]
+        self.assertTrue(any(content.startswith('CONVERSATION SUMMARY') for content in contents))
+        self.assertEqual(contents[-3:], ['Misol bering', '1/2 va 1/4', 'Yana bittasi'])
+        self.assertNotIn('Kasrlar nima?', contents)
+
+    def test_send_message_folds_after_responding(self):
+        self.say('Kasrlar nima?', 'Kasr butunning qismi.', 'Misol bering', '1/2 va 1/4')
+        self.client.force_login(self.user)
+        url = reverse('ai_assistant:send_message', args=[self.conversation.id])
+        with mock.patch('ai_assistant.summaries.fold_in_background') as fold:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, {'message': 'Yana bittasi'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        # The request itself made no summary call
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.summary, '')
+        fold.assert_called_once_with(self.conversation.id)
@@ -10,5 +10,6 @@ urlpatterns = [
     path('chat/', views.chat_interface, name='chat_interface'),
     path('api/conversation/start/', views.start_conversation, name='start_conversation'),
     path('api/conversation/<int:conversation_id>/send/', views.send_message, name='send_message'),
+    path('api/conversation/<int:conversation_id>/stream/', views.stream_message, name='stream_message'),
     path('api/conversation/<int:conversation_id>/history/', views.get_conversation_history, name='conversation_history'),
 ]
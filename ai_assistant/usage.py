@@ -0,0 +1,24 @@
+"""
+LLM usage accounting
+Each answered message adds its tokens to the user's TokenUsageDaily row
+with an F() update, so concurrent chats never lose an increment.
+"""
+from asgiref.sync import sync_to_async
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TokenUsageDaily
+
+
+def record_usage(user_id, tokens_used, cached=False, response=True):
+    """Add to today's totals; `response=False` for background calls such as summaries"""
+    today = timezone.localdate()
+    TokenUsageDaily.objects.get_or_create(user_id=user_id, date=today)
+    TokenUsageDaily.objects.filter(user_id=user_id, date=today).update(
+        responses=F('responses') + int(response),
+        cached_responses=F('cached_responses') + int(cached),
+        tokens_used=F('tokens_used') + tokens_used,
+    )
+
+
+arecord_usage = sync_to_async(record_usage)
@@ -3,14 +3,19 @@ AI Assistant Views
 API endpoints for chat interface
 """
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone, translation
+from asgiref.sync import sync_to_async
+import asyncio
 import json
 
 from .models import Conversation, Message
 from .agents import TeacherAgent, ParentAgent, StudentAgent
+from .tokens import count_tokens, message_tokens
+from .summaries import fold_in_background, schedule_summary
+from .usage import record_usage, arecord_usage
 
 
 @login_required
@@ -96,10 +101,14 @@ def send_message(request, conversation_id):
             content=result['response'],
             tokens_used=result.get('tokens_used', 0)
         )
+        record_usage(request.user.id, ai_message.tokens_used, cached=result.get('cached', False))
         
         # Update conversation timestamp
         conversation.updated_at = timezone.now()
-        conversation.save()
+        conversation.save(update_fields=['updated_at'])
+        
+        # Every few turns, fold older messages into the conversation summary, after the response
+        schedule_summary(conversation)
         
         return JsonResponse({
             'message_id': ai_message.id,
@@ -112,6 +121,93 @@ def send_message(request, conversation_id):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@login_required
+@require_http_methods(["POST"])
+async def stream_message(request, conversation_id):
+    """
+    Send message to AI agent and stream the response as server-sent events
+    `token` events carry text as the LLM produces it; the closing `done` event
+    carries the saved message. Runs as an async view under ASGI, so a slow LLM
+    call holds a coroutine rather than a worker.
+    """
+    user = await request.auser()
+    conversation = await Conversation.objects.filter(id=conversation_id, user=user).afirst()
+    if conversation is None:
+        raise Http404
+    try:
+        user_message = json.loads(request.body).get('message', '').strip()
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    
+    if not user_message:
+        return JsonResponse({'error': 'Message cannot be empty'}, status=400)
+    
+    # Save user message
+    await Message.objects.acreate(
+        conversation=conversation,
+        role='user',
+        content=user_message
+    )
+    
+    language = translation.get_language()
+    agent = _get_agent(conversation.agent_type, user, conversation, language=language)
+    messages, context = await sync_to_async(agent.prepare_messages)(user_message)
+    
+    response = StreamingHttpResponse(
+        _stream_events(agent, conversation, user_message, messages, context),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_events(agent, conversation, user_message, messages, context):
+    chunks = []
+    try:
+        async for text in agent.stream_llm(messages, context):
+            chunks.append(text)
+            yield _sse('token', {'text': text})
+    except asyncio.CancelledError:
+        # Client disconnected: keep what was generated so the history is complete
+        if chunks:
+            partial = ''.join(chunks)
+            await asyncio.shield(_save_response(conversation, partial, message_tokens(messages) + count_tokens(partial)))
+        raise
+    
+    usage = agent.stream_usage
+    ai_message = await _save_response(conversation, ''.join(chunks), usage['tokens_used'])
+    await arecord_usage(conversation.user_id, usage['tokens_used'], cached=usage['cached'])
+    actions = await sync_to_async(agent.perform_actions)(user_message, context)
+    yield _sse('done', {
+        'message_id': ai_message.id,
+        'actions': actions,
+        'timestamp': ai_message.timestamp.isoformat()
+    })
+    
+    # Every few turns, fold older messages into the summary, without holding the stream open
+    fold_in_background(conversation.id)
+
+
+async def _save_response(conversation, content, tokens_used):
+    ai_message = await Message.objects.acreate(
+        conversation=conversation,
+        role='assistant',
+        content=content,
+        tokens_used=tokens_used
+    )
+    
+    # Update conversation timestamp
+    conversation.updated_at = timezone.now()
+    await conversation.asave(update_fields=['updated_at'])
+    return ai_message
+
+
 @login_required
 def get_conversation_history(request, conversation_id):
     """Get conversation message history"""
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import rebuild_rollups, rollup_drift
+
+
+class Command(BaseCommand):
+    help = "Rebuild the dashboard rollup tables from Grade and Attendance and report any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Only report keys whose rollups differ from the journal, do not write anything",
+        )
+
+    def handle(self, *args, **options):
+        drift = rollup_drift()
+        for model, mismatched in drift.items():
+            self.stdout.write(f"{model._meta.verbose_name}: {mismatched} ta kalit mos emas")
+
+        if options['check']:
+            if any(drift.values()):
+                self.stdout.write(self.style.WARNING("Rollup jadvallari jurnal bilan mos emas"))
+            else:
+                self.stdout.write(self.style.SUCCESS("Barcha rollup jadvallari to'g'ri"))
+            return
+
+        counts = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            ", ".join(f"{model._meta.verbose_name}: {rows} ta qator" for model, rows in counts.items())
+        ))
@@ -0,0 +1,77 @@
+# Generated by Django 6.0.2 on 2026-10-18 03:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rollups(apps, schema_editor):
+    """Aggregate the existing journal once; later writes keep the rollups current"""
+    Grade = apps.get_model('journal', 'Grade')
+    Attendance = apps.get_model('journal', 'Attendance')
+    GradeDailyRollup = apps.get_model('analytics', 'GradeDailyRollup')
+    StudentGradeTotal = apps.get_model('analytics', 'StudentGradeTotal')
+    AttendanceDailyRollup = apps.get_model('analytics', 'AttendanceDailyRollup')
+
+    GradeDailyRollup.objects.bulk_create([
+        GradeDailyRollup(date=row['date'], class_obj_id=row['student__student_class_id'], subject_id=row['subject_id'],
+                         teacher_id=row['teacher_id'], value_sum=row['value_sum'], grade_count=row['grade_count'])
+        for row in Grade.objects.values('date', 'student__student_class_id', 'subject_id', 'teacher_id').annotate(
+            value_sum=Sum('value'), grade_count=Count('id')).order_by()
+    ], batch_size=2000)
+    StudentGradeTotal.objects.bulk_create([
+        StudentGradeTotal(student_id=row['student_id'], value_sum=row['value_sum'], grade_count=row['grade_count'])
+        for row in Grade.objects.values('student_id').annotate(value_sum=Sum('value'), grade_count=Count('id')).order_by()
+    ], batch_size=2000)
+    AttendanceDailyRollup.objects.bulk_create([
+        AttendanceDailyRollup(date=row['date'], class_obj_id=row['student__student_class_id'], status=row['status'],
+                              mark_count=row['mark_count'])
+        for row in Attendance.objects.values('date', 'student__student_class_id', 'status').annotate(
+            mark_count=Count('id')).order_by()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('core', '0007_hot_path_indexes'),
+        ('journal', '0007_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('status', models.CharField(max_length=10)),
+                ('mark_count', models.IntegerField(default=0)),
+                ('class_obj', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.class')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GradeDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('value_sum', models.IntegerField(default=0)),
+                ('grade_count', models.IntegerField(default=0)),
+                ('class_obj', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.class')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.subject')),
+                ('teacher', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StudentGradeTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value_sum', models.IntegerField(default=0)),
+                ('grade_count', models.IntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
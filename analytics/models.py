@@ -1,4 +1,7 @@
+import time
+
 from django.db import models
+from django.db.models import F
 from django.conf import settings
 from core.models import Subject
 
@@ -43,3 +46,71 @@ class SkillMap(models.Model):
 
     def __str__(self):
         return f"{self.student} - Skill Map"
+
+
+# ========== DASHBOARD ROLLUPS ==========
+# Pre-aggregated Grade/Attendance rows for the director and admin dashboards.
+# Every grade and attendance write adds its delta (analytics.rollups); a key
+# may end up split over several rows, so readers always SUM them.
+# `manage.py rebuild_rollups` recomputes everything from the journal.
+
+class GradeDailyRollup(models.Model):
+    """Sum and count of grades per day, class, subject and teacher"""
+    date = models.DateField(db_index=True)
+    class_obj = models.ForeignKey('core.Class', on_delete=models.CASCADE, null=True, related_name='+')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='+')
+    teacher = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, related_name='+')
+    value_sum = models.IntegerField(default=0)
+    grade_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.class_obj} {self.subject}: {self.grade_count}"
+
+
+class StudentGradeTotal(models.Model):
+    """All-time sum and count of a student's grades (GPA = value_sum / grade_count)"""
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    value_sum = models.IntegerField(default=0)
+    grade_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.student}: {self.value_sum}/{self.grade_count}"
+
+
+class AttendanceDailyRollup(models.Model):
+    """Attendance marks per day, class and status"""
+    date = models.DateField(db_index=True)
+    class_obj = models.ForeignKey('core.Class', on_delete=models.CASCADE, null=True, related_name='+')
+    status = models.CharField(max_length=10)
+    mark_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.class_obj} {self.status}: {self.mark_count}"
+
+
+class DataVersionManager(models.Manager):
+    def current(self, name):
+        """Version of `name`; starts from the clock so a lost row never reuses an old value"""
+        version = self.filter(name=name).values_list('version', flat=True).first()
+        if version is None:
+            version = self.get_or_create(name=name, defaults={'version': time.time_ns()})[0].version
+        return version
+
+    def bump(self, *names):
+        if self.filter(name__in=names).update(version=F('version') + 1) < len(names):
+            self.bulk_create([self.model(name=name, version=time.time_ns()) for name in names], ignore_conflicts=True)
+
+
+class DataVersion(models.Model):
+    """
+    Named counter bumped on every change to some data (analytics rollups,
+    AI assistant context). Kept in the database so all web workers and
+    commands see the same value.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField()
+
+    objects = DataVersionManager()
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
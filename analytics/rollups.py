@@ -0,0 +1,242 @@
+"""
+Dashboard rollups
+Keeps GradeDailyRollup, StudentGradeTotal and AttendanceDailyRollup in
+step with the journal. Writers describe what they added and removed as
+facts; the deltas are applied with one UPDATE ... F() per distinct change,
+so concurrent writers never lose an increment. Dashboards read the rollups
+through the helpers at the bottom instead of aggregating the journal.
+Every change bumps `rollup_version()`, which caches of anything derived
+from grades or attendance put in their keys. The version lives in the
+database (DataVersion), so a write from any process or command is seen by all.
+"""
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast
+
+from journal.models import Grade, Attendance
+from .models import DataVersion, GradeDailyRollup, StudentGradeTotal, AttendanceDailyRollup
+
+GradeFact = namedtuple('GradeFact', 'date class_id subject_id teacher_id student_id value')
+AttendanceFact = namedtuple('AttendanceFact', 'date class_id status')
+
+GRADE_KEY = ('date', 'class_obj_id', 'subject_id', 'teacher_id')
+ATTENDANCE_KEY = ('date', 'class_obj_id', 'status')
+
+
+def _as_date(value):
+    # Views sometimes save the raw 'YYYY-MM-DD' string from the form, or timezone.now()
+    return Grade._meta.get_field('date').to_python(value)
+
+
+def grade_fact(grade, class_id):
+    """GradeFact for a Grade instance; `class_id` is the student's class"""
+    return GradeFact(_as_date(grade.date), class_id, grade.subject_id, grade.teacher_id, grade.student_id, int(grade.value))
+
+
+def attendance_fact(attendance, class_id):
+    return AttendanceFact(_as_date(attendance.date), class_id, attendance.status)
+
+
+# ========== VERSION ==========
+
+VERSION_NAME = 'rollups'
+
+
+def rollup_version():
+    return DataVersion.objects.current(VERSION_NAME)
+
+
+def bump_rollup_version():
+    DataVersion.objects.bump(VERSION_NAME)
+
+
+# ========== APPLYING DELTAS ==========
+
+def _apply(model, key_fields, deltas, count_field):
+    """
+    Add {key: {field: delta}} to the rows of `model` identified by `key_fields`.
+    Keys without a row are created when they gain rows in the journal; a
+    decrement with no row left to apply it to (the row went with a deleted
+    class or teacher) is dropped. Rows counted down to zero are deleted.
+    """
+    deltas = {key: change for key, change in deltas.items() if any(change.values())}
+    if not deltas:
+        return
+
+    if len(key_fields) == 1:
+        lookup = Q(**{f'{key_fields[0]}__in': [key[0] for key in deltas]})
+    else:
+        lookup = Q()
+        for key in deltas:
+            lookup |= Q(**dict(zip(key_fields, key)))
+    rows = dict(
+        (tuple(values[:-1]), values[-1])
+        for values in model.objects.filter(lookup).values_list(*key_fields, 'id')
+    )
+
+    by_change, to_create = {}, []
+    for key, change in deltas.items():
+        row_id = rows.get(key)
+        if row_id is not None:
+            by_change.setdefault(tuple(sorted(change.items())), []).append(row_id)
+        elif change[count_field] > 0:
+            to_create.append(model(**dict(zip(key_fields, key)), **change))
+
+    for change, row_ids in by_change.items():
+        model.objects.filter(id__in=row_ids).update(**{field: F(field) + delta for field, delta in change})
+    model.objects.bulk_create(to_create)
+    touched = [row_id for row_ids in by_change.values() for row_id in row_ids]
+    if touched:
+        model.objects.filter(id__in=touched, **{f'{count_field}__lte': 0}).delete()
+
+
+def apply_grade_changes(added=(), removed=()):
+    """Update the grade rollups for GradeFacts that were added to and removed from the journal"""
+    daily, students = {}, {}
+    for sign, facts in ((1, added), (-1, removed)):
+        for fact in facts:
+            for totals, key in ((daily, (_as_date(fact.date), fact.class_id, fact.subject_id, fact.teacher_id)),
+                                (students, (fact.student_id,))):
+                change = totals.setdefault(key, {'value_sum': 0, 'grade_count': 0})
+                change['value_sum'] += sign * fact.value
+                change['grade_count'] += sign
+
+    with transaction.atomic():
+        _apply(GradeDailyRollup, GRADE_KEY, daily, 'grade_count')
+        _apply(StudentGradeTotal, ('student_id',), students, 'grade_count')
+        transaction.on_commit(bump_rollup_version)
+
+
+def apply_attendance_changes(added=(), removed=()):
+    """Update the attendance rollup for AttendanceFacts that were added and removed"""
+    daily = {}
+    for sign, facts in ((1, added), (-1, removed)):
+        for fact in facts:
+            key = (_as_date(fact.date), fact.class_id, fact.status)
+            daily.setdefault(key, {'mark_count': 0})['mark_count'] += sign
+
+    with transaction.atomic():
+        _apply(AttendanceDailyRollup, ATTENDANCE_KEY, daily, 'mark_count')
+        transaction.on_commit(bump_rollup_version)
+
+
+# ========== REBUILD ==========
+
+def expected_rollups():
+    """{model: {key: totals}} computed straight from the journal"""
+    grades = Grade.objects.values_list('date', 'student__student_class_id', 'subject_id', 'teacher_id').annotate(
+        value_sum=Sum('value'), grade_count=Count('id')
+    ).order_by()
+    students = Grade.objects.values_list('student_id').annotate(
+        value_sum=Sum('value'), grade_count=Count('id')
+    ).order_by()
+    attendance = Attendance.objects.values_list('date', 'student__student_class_id', 'status').annotate(
+        mark_count=Count('id')
+    ).order_by()
+    return {
+        GradeDailyRollup: {tuple(row[:4]): row[4:] for row in grades},
+        StudentGradeTotal: {tuple(row[:1]): row[1:] for row in students},
+        AttendanceDailyRollup: {tuple(row[:3]): row[3:] for row in attendance},
+    }
+
+
+ROLLUP_FIELDS = {
+    GradeDailyRollup: (GRADE_KEY, ('value_sum', 'grade_count')),
+    StudentGradeTotal: (('student_id',), ('value_sum', 'grade_count')),
+    AttendanceDailyRollup: (ATTENDANCE_KEY, ('mark_count',)),
+}
+
+
+def stored_rollups():
+    """{model: {key: totals}} as currently stored, split rows summed"""
+    stored = {}
+    for model, (key_fields, value_fields) in ROLLUP_FIELDS.items():
+        rows = model.objects.values_list(*key_fields).annotate(
+            **{f'total_{field}': Sum(field) for field in value_fields}
+        ).order_by()
+        stored[model] = {tuple(row[:len(key_fields)]): tuple(row[len(key_fields):]) for row in rows}
+    return stored
+
+
+def rollup_drift():
+    """{model: number of keys whose stored totals differ from the journal}"""
+    expected, stored = expected_rollups(), stored_rollups()
+    drift = {}
+    for model in ROLLUP_FIELDS:
+        keys = set(expected[model]) | set(stored[model])
+        drift[model] = sum(1 for key in keys if expected[model].get(key) != stored[model].get(key))
+    return drift
+
+
+def rebuild_rollups(batch_size=2000):
+    """Replace all rollup rows with totals recomputed from the journal. Returns {model: rows}"""
+    counts = {}
+    with transaction.atomic():
+        for model, totals in expected_rollups().items():
+            key_fields, value_fields = ROLLUP_FIELDS[model]
+            model.objects.all().delete()
+            model.objects.bulk_create(
+                [model(**dict(zip(key_fields, key)), **dict(zip(value_fields, values))) for key, values in totals.items()],
+                batch_size=batch_size,
+            )
+            counts[model] = len(totals)
+        transaction.on_commit(bump_rollup_version)
+    return counts
+
+
+# ========== DASHBOARD READS ==========
+
+def _average(value_sum, count):
+    return Cast(Sum(value_sum), FloatField()) / Sum(count)
+
+
+def subject_averages(since=None):
+    """[{'subject__name', 'avg_grade', 'count'}] best subject first"""
+    rows = GradeDailyRollup.objects.all()
+    if since:
+        rows = rows.filter(date__gte=since)
+    return list(rows.values('subject__name').annotate(
+        avg_grade=_average('value_sum', 'grade_count'), count=Sum('grade_count')
+    ).order_by('-avg_grade'))
+
+
+def average_grade(since=None):
+    rows = GradeDailyRollup.objects.all()
+    if since:
+        rows = rows.filter(date__gte=since)
+    return rows.aggregate(avg=_average('value_sum', 'grade_count'))['avg']
+
+
+def attendance_counts(day=None):
+    """{status: marks} for one day, or over all time"""
+    rows = AttendanceDailyRollup.objects.all()
+    if day:
+        rows = rows.filter(date=day)
+    return dict(rows.values_list('status').annotate(total=Sum('mark_count')).order_by())
+
+
+def attendance_counts_by_day(days):
+    """{date: {status: marks}} for the given days, from one query"""
+    counts = {day: {} for day in days}
+    rows = AttendanceDailyRollup.objects.filter(date__in=days).values_list('date', 'status').annotate(
+        total=Sum('mark_count')
+    ).order_by()
+    for day, status, total in rows:
+        counts[day][status] = total
+    return counts
+
+
+def top_teachers(limit=5):
+    """Teachers who gave the most grades"""
+    return list(GradeDailyRollup.objects.filter(teacher__isnull=False).values(
+        'teacher__first_name', 'teacher__last_name'
+    ).annotate(total_grades=Sum('grade_count')).order_by('-total_grades')[:limit])
+
+
+def top_students(limit=5):
+    """Students with the highest all-time average"""
+    return list(StudentGradeTotal.objects.values(
+        'student__first_name', 'student__last_name', 'student__student_class__name'
+    ).annotate(gpa=_average('value_sum', 'grade_count')).order_by('-gpa')[:limit])
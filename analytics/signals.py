@@ -0,0 +1,102 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from accounts.models import User
+from journal.models import Grade, Attendance
+from .rollups import GradeFact, AttendanceFact, grade_fact, attendance_fact, apply_grade_changes, apply_attendance_changes
+
+# Single-row journal writes (forms, admin, HTMX). The bulk gradebook and
+# roll-call saves bypass these signals and apply their own deltas.
+# Rollups are keyed by the student's class, so moving a student to another
+# class moves their facts too.
+
+
+@receiver(pre_save, sender=Grade)
+def remember_previous_grade(sender, instance, **kwargs):
+    previous = None
+    if instance.pk:
+        previous = Grade.objects.filter(pk=instance.pk).values_list(
+            'date', 'student__student_class_id', 'subject_id', 'teacher_id', 'student_id', 'value'
+        ).first()
+    instance._rollup_previous = GradeFact(*previous) if previous else None
+
+
+@receiver(post_save, sender=Grade)
+def roll_up_grade(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    apply_grade_changes(added=[grade_fact(instance, instance.student.student_class_id)],
+                        removed=[previous] if previous else [])
+
+
+@receiver(pre_delete, sender=Grade)
+def remember_deleted_grade(sender, instance, **kwargs):
+    # Read the class now: on a cascading delete the student is gone by post_delete
+    instance._rollup_previous = grade_fact(instance, instance.student.student_class_id)
+
+
+@receiver(post_delete, sender=Grade)
+def roll_up_deleted_grade(sender, instance, **kwargs):
+    apply_grade_changes(removed=[instance._rollup_previous])
+
+
+@receiver(pre_save, sender=Attendance)
+def remember_previous_attendance(sender, instance, **kwargs):
+    previous = None
+    if instance.pk:
+        previous = Attendance.objects.filter(pk=instance.pk).values_list(
+            'date', 'student__student_class_id', 'status'
+        ).first()
+    instance._rollup_previous = AttendanceFact(*previous) if previous else None
+
+
+@receiver(post_save, sender=Attendance)
+def roll_up_attendance(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    apply_attendance_changes(added=[attendance_fact(instance, instance.student.student_class_id)],
+                             removed=[previous] if previous else [])
+
+
+@receiver(pre_delete, sender=Attendance)
+def remember_deleted_attendance(sender, instance, **kwargs):
+    instance._rollup_previous = attendance_fact(instance, instance.student.student_class_id)
+
+
+@receiver(post_delete, sender=Attendance)
+def roll_up_deleted_attendance(sender, instance, **kwargs):
+    apply_attendance_changes(removed=[instance._rollup_previous])
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_class(sender, instance, update_fields=None, **kwargs):
+    # Logins save last_login only; don't read the old row for those
+    if instance.pk is None or (update_fields is not None and 'student_class' not in update_fields):
+        return
+    instance._rollup_previous_class = User.objects.filter(pk=instance.pk).values_list(
+        'student_class_id', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=User)
+def move_student_rollups(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created or not hasattr(instance, '_rollup_previous_class'):
+        return
+    previous_class = instance.__dict__.pop('_rollup_previous_class')
+    if previous_class == instance.student_class_id:
+        return
+
+    grades = list(Grade.objects.filter(student=instance).values_list('date', 'subject_id', 'teacher_id', 'value'))
+    apply_grade_changes(
+        added=[GradeFact(date, instance.student_class_id, subject_id, teacher_id, instance.pk, value)
+               for date, subject_id, teacher_id, value in grades],
+        removed=[GradeFact(date, previous_class, subject_id, teacher_id, instance.pk, value)
+                 for date, subject_id, teacher_id, value in grades],
+    )
+    marks = list(Attendance.objects.filter(student=instance).values_list('date', 'status'))
+    apply_attendance_changes(
+        added=[AttendanceFact(date, instance.student_class_id, status) for date, status in marks],
+        removed=[AttendanceFact(date, previous_class, status) for date, status in marks],
+    )
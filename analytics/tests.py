@@ -1,3 +1,106 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from accounts.models import User
+from core.models import School, Class, Subject
+from journal.attendance_service import save_attendance
+from journal.grade_service import save_grades
+from journal.models import Grade, Attendance
+from .models import GradeDailyRollup, StudentGradeTotal, AttendanceDailyRollup
+from .rollups import rollup_drift, subject_averages, attendance_counts, top_students
+
+
+class DashboardRollupTests(TestCase):
+    def setUp(self):
+        school = School.objects.create(name="Test School", address="Address")
+        self.class_obj = Class.objects.create(name="9-A", school=school)
+        self.math = Subject.objects.create(name="Math")
+        self.teacher = User.objects.create_user(username='teacher', password='password123', role='teacher')
+        self.students = [
+            User.objects.create_user(username=f'student{i}', password='password123', role='student',
+                                     student_class=self.class_obj)
+            for i in range(3)
+        ]
+        self.day = datetime.date(2026, 3, 2)
+
+    def assertInStep(self):
+        self.assertEqual(set(rollup_drift().values()), {0})
+
+    def test_every_write_path_keeps_rollups_in_step(self):
+        save_grades(self.teacher, self.math, self.day, [
+            {'student': student, 'value': value, 'comment': ''} for student, value in zip(self.students, [5, 4, 2])
+        ])
+        # Regrading moves the sums rather than adding to them
+        save_grades(self.teacher, self.math, self.day, [{'student': self.students[2], 'value': 3, 'comment': ''}])
+        save_attendance(self.day, [(s, 'present') for s in self.students])
+        save_attendance(self.day, [(self.students[0], 'absent')])
+        self.assertInStep()
+
+        # Single-row saves and deletes go through the signals; the form posts a string date
+        grade = Grade.objects.create(student=self.students[0], subject=self.math, teacher=self.teacher,
+                                     value='4', date='2026-03-03')
+        grade.value = 5
+        grade.save()
+        Attendance.objects.update_or_create(student=self.students[1], date=self.day, defaults={'status': 'late'})
+        Grade.objects.filter(student=self.students[1]).first().delete()
+        self.assertInStep()
+
+        self.assertEqual(subject_averages()[0]['avg_grade'], (5 + 3 + 5) / 3)
+        self.assertEqual(attendance_counts(self.day), {'present': 1, 'absent': 1, 'late': 1})
+        self.assertEqual(top_students(1)[0]['student__first_name'], self.students[0].first_name)
+
+        # Deleting a student takes their grades and marks out of the class rollups
+        self.students[0].delete()
+        self.assertInStep()
+
+    def test_moving_a_student_moves_their_rollups(self):
+        other_class = Class.objects.create(name="9-B", school=self.class_obj.school)
+        save_grades(self.teacher, self.math, self.day, [{'student': self.students[0], 'value': 5, 'comment': ''}])
+        save_attendance(self.day, [(self.students[0], 'present')])
+
+        student = self.students[0]
+        student.student_class = other_class
+        student.save()
+        self.assertInStep()
+        self.assertTrue(GradeDailyRollup.objects.filter(class_obj=other_class, grade_count=1).exists())
+
+        # Saves that leave the class alone read and move nothing
+        with self.assertNumQueries(1):
+            student.save(update_fields=['last_login'])
+
+    def test_rebuild_command_repairs_drift(self):
+        Grade.objects.bulk_create([
+            Grade(student=s, subject=self.math, teacher=self.teacher, value=4, date=self.day) for s in self.students
+        ])
+        out = StringIO()
+        call_command('rebuild_rollups', '--check', stdout=out)
+        self.assertIn('mos emas', out.getvalue())
+        self.assertFalse(GradeDailyRollup.objects.exists())
+
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertInStep()
+        self.assertEqual(StudentGradeTotal.objects.count(), 3)
+
+    def test_director_dashboard_reads_rollups(self):
+        director = User.objects.create_user(username='director', password='password123', role='director')
+        self.client.force_login(director)
+
+        def dashboard_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('director_dashboard'))
+            self.assertEqual(response.status_code, 200)
+            return [q['sql'] for q in ctx.captured_queries]
 
-# Create your tests here.
+        save_grades(self.teacher, self.math, self.day, [{'student': s, 'value': 5, 'comment': ''} for s in self.students])
+        save_attendance(self.day, [(s, 'present') for s in self.students])
+        queries = dashboard_queries()
+        # Only the recent-grades list still touches the journal tables
+        self.assertEqual(len([sql for sql in queries if 'journal_grade' in sql]), 1)
+        self.assertFalse([sql for sql in queries if 'journal_attendance' in sql])
+        self.assertEqual(AttendanceDailyRollup.objects.get().mark_count, 3)
@@ -19,6 +19,10 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['conversation', 'timestamp'], name='message_conversation_time_idx'),
+            models.Index(fields=['conversation', 'sender'], condition=models.Q(is_read=False), name='message_unread_idx'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender} at {self.timestamp}"
@@ -1,7 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
+from django.db.models import Q, OuterRef, Subquery
 from accounts.models import User
 from core.models import Class
 from .models import Conversation, Message, OnlineMeeting
@@ -9,7 +9,11 @@ from django.utils import timezone
 
 @login_required
 def chat_list(request):
-    conversations = request.user.conversations.all().order_by('-updated_at')
+    # Participants and the last message come with the list, not one query per conversation
+    last_message = Message.objects.filter(conversation=OuterRef('pk')).order_by('-timestamp', '-id').values('content')[:1]
+    conversations = request.user.conversations.all().order_by('-updated_at').prefetch_related('participants').annotate(
+        last_message=Subquery(last_message)
+    )
     
     # For starting new chats: show relevant users based on role
     available_users = []
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from modeltranslation.admin import TranslationAdmin
-from .models import School, Subject, Class
+from .models import School, Subject, Class, ExportJob, ViewQueryStats
 
 @admin.register(School)
 class SchoolAdmin(TranslationAdmin):
@@ -13,3 +13,21 @@ class SubjectAdmin(TranslationAdmin):
 @admin.register(Class)
 class ClassAdmin(TranslationAdmin):
     list_display = ('name',)
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'requested_by', 'status', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('requested_by__username',)
+
+@admin.register(ViewQueryStats)
+class ViewQueryStatsAdmin(admin.ModelAdmin):
+    """Worst offenders first; filled by the sampling QueryBudgetMiddleware"""
+    list_display = ('view_name', 'samples', 'over_budget', 'avg_queries', 'max_queries',
+                    'avg_db_ms', 'max_db_ms', 'avg_duration_ms', 'max_duration_ms', 'last_seen')
+    ordering = ('-max_queries',)
+    search_fields = ('view_name', 'last_path')
+    readonly_fields = [field.name for field in ViewQueryStats._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
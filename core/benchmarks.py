@@ -0,0 +1,144 @@
+"""
+View benchmarks
+Runs the hot views against a dataset from `generate_school_data`, once at
+a small size and then at one or more larger school sizes, and records
+median latency and SQL query count for each. A view whose query count
+grows with the dataset has an N+1 loop; `manage.py benchmark_views` fails
+on it.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+from django.urls import reverse
+
+# generate_school_data options for the two runs; only the size differs
+SMALL_DATASET = {'classes': 2, 'students': 20, 'teachers': 4, 'days': 10, 'grades_per_subject': 3,
+                 'conversations': 4, 'quizzes': 2, 'notifications': 40}
+LARGE_DATASET = {'classes': 6, 'students': 240, 'teachers': 12, 'days': 30, 'grades_per_subject': 8,
+                 'conversations': 40, 'quizzes': 12, 'notifications': 2000}
+# Per-student volume (days, grades) stays fixed; everything else grows with the school
+PER_STUDENT_KEYS = ('days', 'grades_per_subject')
+
+
+def scaled_dataset(students):
+    """LARGE_DATASET resized to a school of `students`, keeping its proportions"""
+    scale = students / LARGE_DATASET['students']
+    dataset = {
+        key: value if key in PER_STUDENT_KEYS else max(1, round(value * scale))
+        for key, value in LARGE_DATASET.items()
+    }
+    dataset['students'] = students
+    dataset['classes'] = min(dataset['classes'], students)
+    return dataset
+
+
+def benchmark_fixtures():
+    """Users and objects the benchmarked requests are made for, taken from the newest generated data"""
+    from accounts.models import User
+    from communication.models import Conversation
+    from core.models import Schedule
+    from resources.models import Quiz
+
+    lesson = Schedule.objects.select_related('teacher', 'class_obj', 'subject').order_by('-id').first()
+    student = User.objects.filter(role='student', student_class=lesson.class_obj).order_by('-id').first()
+    quiz = Quiz.objects.filter(target_class=lesson.class_obj).order_by('-id').first() or Quiz.objects.order_by('-id').first()
+    chat_user = Conversation.objects.order_by('-id').first().participants.order_by('-id').first()
+    return {
+        'teacher': lesson.teacher,
+        'class': lesson.class_obj,
+        'subject': lesson.subject,
+        'student': student,
+        'quiz_student': User.objects.filter(role='student', student_class=quiz.target_class).order_by('-id').first(),
+        'quiz': quiz,
+        'parent': student.parents.order_by('-id').first(),
+        'director': User.objects.filter(role='director').first(),
+        'admin': User.objects.filter(role='admin').first(),
+        'chat_user': chat_user,
+    }
+
+
+# (label, url name, who requests it, url args, query string)
+BENCHMARKS = [
+    ('gradebook', 'gradebook', 'teacher', lambda f: [], lambda f: {'class_id': f['class'].id, 'subject_id': f['subject'].id}),
+    ('attendance', 'attendance', 'teacher', lambda f: [], lambda f: {'class_id': f['class'].id}),
+    ('leaderboard', 'leaderboard', 'student', lambda f: [], lambda f: {}),
+    ('director_dashboard', 'director_dashboard', 'director', lambda f: [], lambda f: {}),
+    ('admin_dashboard', 'admin_dashboard', 'admin', lambda f: [], lambda f: {}),
+    ('parent_dashboard', 'parent_dashboard', 'parent', lambda f: [], lambda f: {}),
+    ('schedule_list', 'schedule_list', 'teacher', lambda f: [], lambda f: {}),
+    ('chat_list', 'chat_list', 'chat_user', lambda f: [], lambda f: {}),
+    ('quiz_take', 'quiz_take', 'quiz_student', lambda f: [f['quiz'].id], lambda f: {}),
+    ('export_grades', 'export_grades', 'director', lambda f: [], lambda f: {'class_id': f['class'].id, 'subject_id': f['subject'].id}),
+    ('export_attendance', 'export_attendance', 'director', lambda f: [], lambda f: {'class_id': f['class'].id}),
+    ('export_students', 'export_students', 'director', lambda f: [], lambda f: {'class_id': f['class'].id}),
+    ('export_all_users', 'export_all_users', 'director', lambda f: [], lambda f: {}),
+]
+
+
+def _consume(response):
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    response.close()
+
+
+def measure_views(repeat=3, only=None):
+    """{label: {'status', 'queries', 'ms'}} for the current database"""
+    fixtures = benchmark_fixtures()
+    results = {}
+    for label, url_name, role, args, params in BENCHMARKS:
+        if only and label not in only:
+            continue
+        client = Client()
+        client.force_login(fixtures[role])
+        url = reverse(url_name, args=args(fixtures))
+        query = params(fixtures)
+
+        _consume(client.get(url, query))  # warm-up: sessions, caches, lazy imports
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = client.get(url, query)
+                _consume(response)
+                timings.append((time.perf_counter() - started) * 1000)
+        results[label] = {
+            'status': response.status_code,
+            'queries': len(ctx),
+            'ms': round(statistics.median(timings), 1),
+        }
+    return results
+
+
+@contextmanager
+def generated_database(dataset, seed=42):
+    """A throwaway test database filled with `dataset`, dropped again on exit"""
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        options = [f"--{key.replace('_', '-')}={value}" for key, value in dataset.items()]
+        call_command('generate_school_data', *options, f'--seed={seed}', stdout=StringIO())
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+def run_on_dataset(dataset, repeat=3, only=None, seed=42):
+    """Benchmark the views on a throwaway database built from `dataset`"""
+    with generated_database(dataset, seed):
+        # Sampling instrumentation would add its own queries to random requests
+        with override_settings(QUERY_BUDGET_SAMPLE_RATE=0):
+            return measure_views(repeat, only)
+
+
+def compare(small, large):
+    """Rows of (label, small, large, regression) where regression means the query count grew"""
+    return [
+        (label, small[label], large[label], large[label]['queries'] > small[label]['queries'])
+        for label in small
+    ]
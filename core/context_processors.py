@@ -1,7 +1,6 @@
-from .models import Notification
+from .counters import request_counts
 
 def notifications(request):
     if request.user.is_authenticated:
-        unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
-        return {'unread_notifications_count': unread_count}
+        return {'unread_notifications_count': request_counts(request)['unread_notifications_count']}
     return {}
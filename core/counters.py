@@ -0,0 +1,68 @@
+"""
+Navbar counters
+Unread messages, unread notifications and upcoming meetings for the
+current user, fetched as scalar subqueries of a single SELECT and
+memoized on the request so every context processor shares it.
+"""
+from django.db.models import Func, IntegerField, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import User
+from communication.models import Message, OnlineMeeting
+from .models import Notification
+
+EMPTY_COUNTS = {
+    'unread_messages_count': 0,
+    'unread_notifications_count': 0,
+    'upcoming_meetings_count': 0,
+}
+
+
+def _count(queryset):
+    """Scalar COUNT(*) subquery for `queryset`"""
+    counted = queryset.order_by().annotate(n=Func('pk', function='COUNT', output_field=IntegerField())).values('n')
+    return Coalesce(Subquery(counted), Value(0))
+
+
+def visible_meetings_filter(user):
+    """Q for the meetings `user` can see (same rules as the meetings page), or None"""
+    if user.role == 'teacher':
+        return Q(organizer=user) | Q(audience='teachers')
+    if user.role == 'student':
+        if user.student_class_id:
+            return Q(class_obj_id=user.student_class_id, audience='class')
+        return None
+    if user.role == 'parent':
+        children_classes = User.objects.filter(parents=user).values('student_class')
+        return Q(audience='parents') | Q(audience='class', class_obj__in=children_classes)
+    if user.role in ['director', 'admin']:
+        return Q()
+    return None
+
+
+def navbar_counts(user):
+    """All three counters from one query"""
+    unread_messages = Message.objects.filter(conversation__participants=user, is_read=False).exclude(sender=user)
+    unread_notifications = Notification.objects.filter(user=user, is_read=False)
+
+    meetings_filter = visible_meetings_filter(user)
+    if meetings_filter is None:
+        upcoming_meetings = Value(0)
+    else:
+        upcoming_meetings = _count(OnlineMeeting.objects.filter(meetings_filter, start_time__gte=timezone.now()))
+
+    return User.objects.filter(pk=user.pk).annotate(
+        unread_messages_count=_count(unread_messages),
+        unread_notifications_count=_count(unread_notifications),
+        upcoming_meetings_count=upcoming_meetings,
+    ).values(*EMPTY_COUNTS).get()
+
+
+def request_counts(request):
+    """navbar_counts() for the request's user, computed at most once per request"""
+    if not request.user.is_authenticated:
+        return EMPTY_COUNTS
+    if not hasattr(request, '_navbar_counts'):
+        request._navbar_counts = navbar_counts(request.user)
+    return request._navbar_counts
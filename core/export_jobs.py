@@ -0,0 +1,131 @@
+"""
+Background export jobs
+A small DB-backed queue: views enqueue ExportJob rows and
+`manage.py run_export_worker` builds the files off the request path.
+"""
+import tempfile
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ExportJob, Notification
+
+# Which roles may request each kind of export (same rules as the synchronous views)
+EXPORT_JOB_ROLES = {
+    'grades': ['admin', 'director', 'vice_director', 'teacher'],
+    'attendance': ['admin', 'director', 'vice_director', 'teacher'],
+    'students': ['admin', 'director', 'vice_director', 'teacher'],
+    'all_users': ['admin', 'director', 'vice_director'],
+    'quarter_report': ['admin', 'director', 'teacher'],
+}
+
+
+def can_request_export(user, kind):
+    return user.is_superuser or user.role in EXPORT_JOB_ROLES.get(kind, [])
+
+
+def enqueue_export(user, kind, params=None):
+    """Create a pending job; the worker picks it up on its next poll"""
+    return ExportJob.objects.create(requested_by=user, kind=kind, params=params or {})
+
+
+# ========== BUILDERS ==========
+# Each builder writes the finished workbook into `fileobj` and returns the file name.
+
+def _build_table_export(export, fileobj):
+    from journal.export_views import write_export_xlsx
+    write_export_xlsx(export, fileobj)
+    return f"{export['filename']}.xlsx"
+
+
+def _build_grades(params, fileobj):
+    from core.models import Class, Subject
+    from journal.export_views import grades_export
+    export = grades_export(Class.objects.get(id=params['class_id']), Subject.objects.get(id=params['subject_id']))
+    return _build_table_export(export, fileobj)
+
+
+def _build_attendance(params, fileobj):
+    from core.models import Class
+    from journal.export_views import attendance_export
+    return _build_table_export(attendance_export(Class.objects.get(id=params['class_id'])), fileobj)
+
+
+def _build_students(params, fileobj):
+    from core.models import Class
+    from journal.export_views import students_export
+    selected_class = Class.objects.get(id=params['class_id']) if params.get('class_id') else None
+    return _build_table_export(students_export(selected_class), fileobj)
+
+
+def _build_all_users(params, fileobj):
+    from journal.export_views import all_users_export
+    return _build_table_export(all_users_export(), fileobj)
+
+
+def _build_quarter_report(params, fileobj):
+    from core.models import Class, Subject
+    from administration.reports import build_quarter_report, quarter_report_workbook
+    selected_class = Class.objects.get(id=params['class_id'])
+    subjects = list(Subject.objects.all())
+    report_data = build_quarter_report(selected_class, subjects, params.get('start_date'), params.get('end_date'))
+    quarter_report_workbook(report_data, subjects, fileobj)
+    return f"Quarter_Report_{selected_class.name}.xlsx"
+
+
+EXPORT_BUILDERS = {
+    'grades': _build_grades,
+    'attendance': _build_attendance,
+    'students': _build_students,
+    'all_users': _build_all_users,
+    'quarter_report': _build_quarter_report,
+}
+
+
+# ========== WORKER ==========
+
+def claim_next_job():
+    """
+    Atomically move the oldest pending job to 'running'.
+    The conditional UPDATE makes it safe to run several workers.
+    """
+    while True:
+        job_id = ExportJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        with transaction.atomic():
+            claimed = ExportJob.objects.filter(id=job_id, status='pending').update(
+                status='running', started_at=timezone.now()
+            )
+        if claimed:
+            return ExportJob.objects.select_related('requested_by').get(id=job_id)
+
+
+def requeue_stale_jobs(older_than=timedelta(minutes=30)):
+    """Put back jobs left 'running' by a worker that died mid-build"""
+    return ExportJob.objects.filter(
+        status='running', started_at__lt=timezone.now() - older_than
+    ).update(status='pending', started_at=None)
+
+
+def run_job(job):
+    """Build the file for one claimed job, store it in private storage and notify the requester"""
+    try:
+        with tempfile.TemporaryFile() as fileobj:
+            filename = EXPORT_BUILDERS[job.kind](job.params, fileobj)
+            fileobj.seek(0)
+            job.file.save(filename, File(fileobj), save=False)
+            job.filename = filename
+        job.status = 'done'
+        message = f"Eksport tayyor: {job.get_kind_display()}. Yuklab olish uchun eksportlar sahifasiga o'ting."
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+        message = f"Eksport bajarilmadi: {job.get_kind_display()}. Xatolik: {e}"
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file', 'filename', 'error', 'finished_at'])
+    Notification.objects.create(user=job.requested_by, message=message)
+    return job
@@ -0,0 +1,61 @@
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import JsonResponse, FileResponse, Http404
+from django.urls import reverse
+
+from .models import ExportJob
+from .export_jobs import can_request_export, enqueue_export
+
+
+def queue_export_response(request, kind, params):
+    """Enqueue an export job and send the user to the page that polls it"""
+    if not can_request_export(request.user, kind):
+        messages.error(request, "Ruxsat yo'q!")
+        return redirect('home')
+
+    job = enqueue_export(request.user, kind, params)
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': reverse('export_job_status', args=[job.id]),
+        })
+
+    messages.info(request, "Eksport navbatga qo'yildi. Tayyor bo'lganda bildirishnoma olasiz.")
+    return redirect('export_jobs')
+
+
+def _job_data(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'kind_display': job.get_kind_display(),
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'error': job.error,
+        'created_at': job.created_at.strftime('%d.%m.%Y %H:%M'),
+        'download_url': reverse('export_job_download', args=[job.id]) if job.status == 'done' else None,
+    }
+
+
+@login_required
+def export_job_list(request):
+    """User's recent export jobs; pending ones are polled from the page"""
+    jobs = ExportJob.objects.filter(requested_by=request.user)[:20]
+    return render(request, 'core/export_jobs.html', {'jobs': jobs})
+
+
+@login_required
+def export_job_status(request, job_id):
+    """JSON status for polling"""
+    job = get_object_or_404(ExportJob, id=job_id, requested_by=request.user)
+    return JsonResponse(_job_data(job))
+
+
+@login_required
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, requested_by=request.user, status='done')
+    if not job.file:
+        raise Http404
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.filename or job.file.name.rsplit('/', 1)[-1])
@@ -0,0 +1,120 @@
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Stock Django SQLite settings: 5 s busy timeout, deferred BEGIN, rollback journal
+DEFAULT_OPTIONS = {'timeout': 5}
+
+SCHEMA = """
+CREATE TABLE roll_call (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX roll_call_student ON roll_call (student_id);
+"""
+
+
+def connect(path, options):
+    """sqlite3 connection set up the way Django's backend sets one up from DATABASES OPTIONS"""
+    conn = sqlite3.connect(path, timeout=options.get('timeout', 5), isolation_level=None)
+    for command in options.get('init_command', '').split(';'):
+        if command.strip():
+            conn.execute(command)
+    return conn
+
+
+def run_writer(path, options, transactions, seed):
+    """
+    One gunicorn worker entering marks: each transaction reads the student's
+    existing rows and then inserts one, like the roll-call and grade upserts.
+    Returns (committed, locked, latencies in ms).
+    """
+    rng = random.Random(seed)
+    conn = connect(path, options)
+    begin = f"BEGIN {options.get('transaction_mode') or ''}".strip()
+    committed, locked, latencies = 0, 0, []
+    for _ in range(transactions):
+        student_id = rng.randrange(1000)
+        started = time.perf_counter()
+        try:
+            conn.execute(begin)
+            conn.execute("SELECT COUNT(*) FROM roll_call WHERE student_id = ?", (student_id,)).fetchone()
+            conn.execute("INSERT INTO roll_call (student_id, date, status) VALUES (?, date('now'), 'present')",
+                         (student_id,))
+            conn.execute("COMMIT")
+            committed += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            locked += 1
+    conn.close()
+    return committed, locked, latencies
+
+
+def benchmark_profile(options, writers, transactions):
+    """Run `writers` processes against a fresh database file with `options`"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite3')
+        conn = connect(path, options)
+        conn.executescript(SCHEMA)
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+
+        started = time.perf_counter()
+        with multiprocessing.Pool(writers) as pool:
+            results = pool.starmap(run_writer, [(path, options, transactions, seed) for seed in range(writers)])
+        elapsed = time.perf_counter() - started
+
+    committed = sum(r[0] for r in results)
+    latencies = sorted(ms for r in results for ms in r[2])
+    return {
+        'journal_mode': journal_mode,
+        'committed': committed,
+        'locked': sum(r[1] for r in results),
+        'tx_per_s': round(committed / elapsed, 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+        'median_ms': round(statistics.median(latencies), 2) if latencies else None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure SQLite write throughput with several concurrent writer processes, "
+        "with stock settings and with the production profile (WAL, busy timeout, IMMEDIATE transactions)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help="Concurrent writer processes")
+        parser.add_argument('--transactions', type=int, default=200, help="Transactions per writer")
+        parser.add_argument('--json', dest='json_path', help="Also write the results to this file")
+
+    def handle(self, *args, **options):
+        profiles = {'default': DEFAULT_OPTIONS, 'production': settings.SQLITE_PRODUCTION_OPTIONS}
+        attempted = options['writers'] * options['transactions']
+        results = {}
+        for name, db_options in profiles.items():
+            results[name] = benchmark_profile(db_options, options['writers'], options['transactions'])
+
+        self.stdout.write(f"{options['writers']} ta yozuvchi, jami {attempted} ta tranzaksiya")
+        self.stdout.write(f"{'profil':<12}{'journal':>9}{'commit':>9}{'locked':>9}{'tx/s':>10}{'median ms':>11}{'p95 ms':>9}")
+        for name, r in results.items():
+            line = (f"{name:<12}{r['journal_mode']:>9}{r['committed']:>9}{r['locked']:>9}{r['tx_per_s']:>10}"
+                    f"{str(r['median_ms']):>11}{str(r['p95_ms']):>9}")
+            self.stdout.write(self.style.ERROR(line) if r['locked'] else line)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(results, f, indent=2)
@@ -0,0 +1,63 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.benchmarks import BENCHMARKS, SMALL_DATASET, LARGE_DATASET, scaled_dataset, run_on_dataset, compare
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the hot views on a small and one or more larger generated datasets (each in a "
+        "throwaway test database) and fail if any view's query count grows with the data"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help="Timed requests per view (median is reported)")
+        parser.add_argument('--only', nargs='+', choices=[label for label, *_ in BENCHMARKS],
+                            help="Benchmark only these views")
+        parser.add_argument('--students', type=int, nargs='+', default=[LARGE_DATASET['students'], 1000],
+                            help="School sizes (students) to compare against the small dataset")
+        parser.add_argument('--json', dest='json_path', help="Also write the results to this file")
+
+    def handle(self, *args, **options):
+        sizes = sorted(set(options['students']))
+        if sizes[0] <= SMALL_DATASET['students']:
+            raise CommandError(f"--students kichik to'plamdan ({SMALL_DATASET['students']}) katta bo'lishi kerak")
+
+        setup_test_environment()
+        try:
+            small = run_on_dataset(SMALL_DATASET, options['repeat'], options['only'])
+            large = {
+                students: run_on_dataset(scaled_dataset(students), options['repeat'], options['only'])
+                for students in sizes
+            }
+        finally:
+            teardown_test_environment()
+
+        columns = [SMALL_DATASET['students'], *sizes]
+        self.stdout.write(
+            f"{'view':<22}{'status':>8}"
+            + ''.join(f"{f'queries {n}':>14}" for n in columns)
+            + ''.join(f"{f'ms {n}':>10}" for n in columns)
+        )
+        regressions = {
+            label for students in sizes for label, _, _, regression in compare(small, large[students]) if regression
+        }
+        for label, s in small.items():
+            runs = [s, *(large[students][label] for students in sizes)]
+            line = (
+                f"{label:<22}{runs[-1]['status']:>8}"
+                + ''.join(f"{run['queries']:>14}" for run in runs)
+                + ''.join(f"{run['ms']:>10}" for run in runs)
+            )
+            self.stdout.write(self.style.ERROR(line) if label in regressions else line)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'small': small, 'large': {str(n): large[n] for n in sizes}}, f, indent=2)
+
+        if regressions:
+            grown = ', '.join(label for label in small if label in regressions)
+            raise CommandError(f"So'rovlar soni ma'lumot hajmi bilan o'smoqda: {grown}")
+        self.stdout.write(self.style.SUCCESS("Barcha view'lar o'zgarmas sondagi so'rov bilan ishlaydi"))
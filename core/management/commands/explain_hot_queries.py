@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.benchmarks import LARGE_DATASET, generated_database
+from core.query_plans import measure_plans
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot journal, notification and messaging filters on a large generated dataset "
+        "(in a throwaway test database) with and without their indexes, and fail if any still scans its table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per query (median is reported)")
+        parser.add_argument('--students', type=int, default=LARGE_DATASET['students'])
+        parser.add_argument('--days', type=int, default=120)
+        parser.add_argument('--plans', action='store_true', help="Print the full plans too")
+        parser.add_argument('--json', dest='json_path', help="Also write the results to this file")
+
+    def handle(self, *args, **options):
+        # A term of attendance, so a 30-day window is a small slice of the table as it is in production
+        dataset = {**LARGE_DATASET, 'students': options['students'], 'days': options['days']}
+        setup_test_environment()
+        try:
+            with generated_database(dataset):
+                results = measure_plans(options['repeat'])
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(f"{'query':<22}{'indeksiz':<60}{'indeksli':<34}{'ms oldin':>9}{'ms keyin':>9}")
+        for label, runs in results.items():
+            before, after = runs['unindexed'], runs['indexed']
+            line = f"{label:<22}{before['access']:<60}{after['access']:<34}{before['ms']:>9}{after['ms']:>9}"
+            self.stdout.write(self.style.ERROR(line) if after['full_scan'] else line)
+            if options['plans']:
+                self.stdout.write(f"  oldin:\n    {before['plan'].replace(chr(10), chr(10) + '    ')}")
+                self.stdout.write(f"  keyin:\n    {after['plan'].replace(chr(10), chr(10) + '    ')}")
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+        scans = [label for label, runs in results.items() if runs['indexed']['full_scan']]
+        if scans:
+            raise CommandError(f"Indeks bo'lsa ham jadval to'liq o'qilmoqda: {', '.join(scans)}")
+        self.stdout.write(self.style.SUCCESS("Barcha so'rovlar indeks orqali bajarilmoqda"))
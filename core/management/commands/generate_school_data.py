@@ -0,0 +1,286 @@
+import random
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from analytics.rollups import rebuild_rollups
+from administration.models import TeacherAssignment
+from communication.models import Conversation, Message
+from core.models import School, Class, Subject, Schedule, Notification
+from gamification.models import PointTransaction
+from gamification.signals import GRADE_POINTS
+from journal.models import Grade, Attendance
+from resources.models import Quiz, Question, Answer, QuizResult
+
+SUBJECT_NAMES = [
+    "Ona tili", "Matematika", "Fizika", "Kimyo", "Biologiya",
+    "Tarix", "Ingliz tili", "Geografiya", "Informatika", "Adabiyot",
+]
+FIRST_NAMES = ["Aziz", "Olim", "Jasur", "Dilshod", "Anvar", "Rustam", "Sardor", "Elyor",
+               "Madina", "Nigora", "Dilnoza", "Shahlo", "Malika", "Sevara", "Lola", "Zilola"]
+LAST_NAMES = ["Rahimov", "Tursunov", "Karimov", "Aliyev", "Saidov", "Xolmatov", "Umarov", "Sodiqov", "Azimov", "Ibrohimov"]
+DAYS = [day for day, _ in Schedule.DAY_CHOICES]
+LESSONS_PER_DAY = 6
+
+# Weighted so the data has the usual skew towards 4s and 5s and mostly present students
+GRADE_WEIGHTS = {5: 35, 4: 35, 3: 20, 2: 10}
+ATTENDANCE_WEIGHTS = {'present': 90, 'late': 4, 'absent': 4, 'excused': 2}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a seeded, production-sized school (users, timetable, a year of grades and "
+        "attendance, points, chats and quizzes) with bulk inserts, for load and benchmark work"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classes', type=int, default=50)
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--teachers', type=int, default=120)
+        parser.add_argument('--days', type=int, default=180, help="School days of grades and attendance")
+        parser.add_argument('--grades-per-subject', type=int, default=20,
+                            help="Grades per student per subject over the period")
+        parser.add_argument('--conversations', type=int, default=500)
+        parser.add_argument('--messages-per-conversation', type=int, default=10)
+        parser.add_argument('--quizzes', type=int, default=100)
+        parser.add_argument('--notifications', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='gen', help="Username prefix; must not be in use yet")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        if options['students'] < options['classes'] or options['teachers'] < 1:
+            raise CommandError("Kamida har bir sinfga bitta o'quvchi va bitta o'qituvchi kerak")
+        if User.objects.filter(username__startswith=f"{self.prefix}_").exists():
+            raise CommandError(f"'{self.prefix}_' bilan boshlanuvchi foydalanuvchilar allaqachon bor. Boshqa --prefix tanlang.")
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            self.step("Maktab, sinflar, fanlar", self.create_school, options)
+            self.step("Foydalanuvchilar", self.create_users, options)
+            self.step("Dars jadvali", self.create_timetable)
+            self.step("Baholar", self.create_grades, options)
+            self.step("Davomat", self.create_attendance, options)
+            self.step("Ballar", self.create_points)
+            self.step("Suhbatlar", self.create_chats, options)
+            self.step("Testlar", self.create_quizzes, options)
+            self.step("Bildirishnomalar", self.create_notifications, options)
+            # Bulk inserts skip the per-write rollup deltas, so compute the rollups once at the end
+            self.step("Dashboard rollup'lari", lambda: sum(rebuild_rollups(self.batch_size).values()))
+
+        self.stdout.write(self.style.SUCCESS(f"Tayyor: {time.perf_counter() - started:.1f} s"))
+
+    def step(self, label, func, *args):
+        started = time.perf_counter()
+        count = func(*args)
+        self.stdout.write(f"{label}: {count} ta yozuv ({time.perf_counter() - started:.1f} s)")
+
+    def bulk(self, model, objs):
+        return model.objects.bulk_create(objs, batch_size=self.batch_size)
+
+    def name(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    # ========== STRUCTURE ==========
+
+    def create_school(self, options):
+        self.school = School.objects.create(name=f"{self.prefix.upper()} maktabi", address="Toshkent")
+        self.subjects = [Subject.objects.get_or_create(name=name)[0] for name in SUBJECT_NAMES]
+        self.classes = self.bulk(Class, [
+            Class(name=f"{grade}-{chr(65 + section)}", school=self.school)
+            for grade, section in ((i % 11 + 1, i // 11) for i in range(options['classes']))
+        ])
+        return len(self.subjects) + len(self.classes) + 1
+
+    def create_users(self, options):
+        # Hashing once and sharing the hash keeps generation fast; every account logs in with 'password123'
+        password = make_password('password123')
+
+        def user(username, role, **fields):
+            first_name, last_name = self.name()
+            return User(username=f"{self.prefix}_{username}", password=password, role=role,
+                        first_name=first_name, last_name=last_name,
+                        email=f"{self.prefix}_{username}@learnsphere.uz", **fields)
+
+        self.teachers = self.bulk(User, [user(f"teacher{i}", 'teacher') for i in range(options['teachers'])])
+        self.students = self.bulk(User, [
+            user(f"student{i}", 'student', student_class=self.classes[i % len(self.classes)])
+            for i in range(options['students'])
+        ])
+        self.parents = self.bulk(User, [user(f"parent{i}", 'parent') for i in range(len(self.students))])
+        self.bulk(User.children.through, [
+            User.children.through(from_user_id=parent.id, to_user_id=student.id)
+            for parent, student in zip(self.parents, self.students)
+        ])
+        staff = self.bulk(User, [user('director', 'director'), user('admin', 'admin')])
+
+        self.students_by_class = {}
+        for student in self.students:
+            self.students_by_class.setdefault(student.student_class_id, []).append(student)
+        return len(self.teachers) + len(self.students) * 2 + len(staff)
+
+    def create_timetable(self):
+        # Each (class, subject) pair gets one teacher; rooms follow the class so they never clash
+        self.teacher_for = {}
+        assignments = []
+        for c, class_obj in enumerate(self.classes):
+            for s, subject in enumerate(self.subjects):
+                teacher = self.teachers[(c * len(self.subjects) + s) % len(self.teachers)]
+                self.teacher_for[(class_obj.id, subject.id)] = teacher
+                assignments.append(TeacherAssignment(teacher=teacher, subject=subject, assigned_class=class_obj))
+        self.bulk(TeacherAssignment, assignments)
+
+        # bulk_create skips Schedule.clean(), so track booked (teacher, day, period) slots here: each
+        # lesson takes the next subject in rotation whose teacher is free, or stays a free period
+        lessons = []
+        booked = set()
+        for c, class_obj in enumerate(self.classes):
+            for d, day in enumerate(DAYS):
+                for period in range(LESSONS_PER_DAY):
+                    offset = c + d * LESSONS_PER_DAY + period
+                    subject = next((
+                        candidate for candidate in (
+                            self.subjects[(offset + i) % len(self.subjects)] for i in range(len(self.subjects))
+                        )
+                        if (self.teacher_for[(class_obj.id, candidate.id)].id, day, period) not in booked
+                    ), None)
+                    if subject is None:
+                        continue
+                    booked.add((self.teacher_for[(class_obj.id, subject.id)].id, day, period))
+                    start = datetime.combine(date.today(), dtime(8, 0)) + timedelta(minutes=50 * period)
+                    lessons.append(Schedule(
+                        class_obj=class_obj, subject=subject, teacher=self.teacher_for[(class_obj.id, subject.id)],
+                        room=str(100 + c), day_of_week=day,
+                        start_time=start.time(), end_time=(start + timedelta(minutes=45)).time(),
+                    ))
+        self.bulk(Schedule, lessons)
+        return len(assignments) + len(lessons)
+
+    # ========== JOURNAL ==========
+
+    def school_days(self, count):
+        today = timezone.localdate()
+        day = date(today.year if today.month >= 9 else today.year - 1, 9, 1)
+        days = []
+        while len(days) < count:
+            if day.weekday() < 6:  # Monday to Saturday
+                days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    def create_grades(self, options):
+        self.days = self.school_days(options['days'])
+        per_subject = min(options['grades_per_subject'], len(self.days))
+        values, weights = list(GRADE_WEIGHTS), list(GRADE_WEIGHTS.values())
+
+        self.rewards = []
+        total = 0
+        batch = []
+        for student in self.students:
+            for subject in self.subjects:
+                teacher = self.teacher_for[(student.student_class_id, subject.id)]
+                dates = self.rng.sample(self.days, per_subject)
+                for day, value in zip(dates, self.rng.choices(values, weights, k=per_subject)):
+                    batch.append(Grade(student=student, subject=subject, teacher=teacher, value=value, date=day))
+                    if value in GRADE_POINTS:
+                        self.rewards.append((student.id, GRADE_POINTS[value], subject.name, value))
+            if len(batch) >= self.batch_size:
+                total += len(self.bulk(Grade, batch))
+                batch = []
+        total += len(self.bulk(Grade, batch))
+        return total
+
+    def create_attendance(self, options):
+        statuses, weights = list(ATTENDANCE_WEIGHTS), list(ATTENDANCE_WEIGHTS.values())
+        total = 0
+        for day in self.days:
+            marks = self.rng.choices(statuses, weights, k=len(self.students))
+            total += len(self.bulk(Attendance, [
+                Attendance(student=student, date=day, status=status)
+                for student, status in zip(self.students, marks)
+            ]))
+        return total
+
+    def create_points(self):
+        # Same rewards the grade signal would have given; the queryset keeps PointBalance in step
+        transactions = [
+            PointTransaction(user_id=user_id, amount=amount, transaction_type='grade',
+                             description=f"{subject_name} fanidan {value} baho uchun")
+            for user_id, amount, subject_name, value in self.rewards
+        ]
+        return len(PointTransaction.objects.bulk_create(transactions, batch_size=self.batch_size))
+
+    # ========== COMMUNICATION, QUIZZES & NOTIFICATIONS ==========
+
+    def create_chats(self, options):
+        if not options['conversations']:
+            return 0
+        pairs = []
+        for _ in range(options['conversations']):
+            student_index = self.rng.randrange(len(self.students))
+            student = self.students[student_index]
+            subject = self.rng.choice(self.subjects)
+            pairs.append((self.teacher_for[(student.student_class_id, subject.id)], self.parents[student_index]))
+
+        conversations = self.bulk(Conversation, [Conversation() for _ in pairs])
+        self.bulk(Conversation.participants.through, [
+            Conversation.participants.through(conversation_id=conversation.id, user_id=user.id)
+            for conversation, pair in zip(conversations, pairs)
+            for user in pair
+        ])
+        messages = [
+            Message(conversation=conversation, sender=pair[i % 2], content=f"Xabar {i + 1}",
+                    is_read=self.rng.random() < 0.7)
+            for conversation, pair in zip(conversations, pairs)
+            for i in range(options['messages_per_conversation'])
+        ]
+        self.bulk(Message, messages)
+        return len(conversations) + len(messages)
+
+    def create_quizzes(self, options):
+        if not options['quizzes']:
+            return 0
+        quizzes = []
+        for i in range(options['quizzes']):
+            class_obj = self.rng.choice(self.classes)
+            subject = self.rng.choice(self.subjects)
+            quizzes.append(Quiz(title=f"{subject.name} testi #{i + 1}", subject=subject, target_class=class_obj,
+                                created_by=self.teacher_for[(class_obj.id, subject.id)]))
+        quizzes = self.bulk(Quiz, quizzes)
+
+        questions = self.bulk(Question, [
+            Question(quiz=quiz, text=f"Savol {n}", order=n)
+            for quiz in quizzes for n in range(1, 11)
+        ])
+        answers = self.bulk(Answer, [
+            Answer(question=question, text=f"Variant {key}", is_correct=(key == 'A'))
+            for question in questions for key in 'ABCD'
+        ])
+
+        # About half of each target class has taken the quiz
+        results = []
+        for quiz in quizzes:
+            for student in self.students_by_class.get(quiz.target_class_id, []):
+                if self.rng.random() < 0.5:
+                    correct = self.rng.randint(0, 10)
+                    results.append(QuizResult(student=student, quiz=quiz, score=correct,
+                                              total_questions=10, correct_answers=correct))
+        self.bulk(QuizResult, results)
+        return len(quizzes) + len(questions) + len(answers) + len(results)
+
+    def create_notifications(self, options):
+        # Mostly read, like a live inbox; spread over students and parents
+        recipients = self.students + self.parents
+        return len(self.bulk(Notification, [
+            Notification(user=self.rng.choice(recipients), message=f"Bildirishnoma {i + 1}",
+                         is_read=self.rng.random() < 0.8)
+            for i in range(options['notifications'])
+        ]))
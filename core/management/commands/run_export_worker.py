@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.export_jobs import claim_next_job, requeue_stale_jobs, run_job
+from journal.student_import import claim_next_import, purge_expired_imports, requeue_stale_imports, run_import
+
+# Seconds between sweeps for student rosters past their resume window
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = "Process queued ExportJob and StudentImport rows (DB-backed queue, no broker needed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit instead of polling forever")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"{requeued} ta osilib qolgan eksport qayta navbatga qo'yildi"))
+        requeued = requeue_stale_imports()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"{requeued} ta osilib qolgan import qayta navbatga qo'yildi"))
+
+        purged_at = None
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                student_import = claim_next_import()
+                if student_import is not None:
+                    started = time.monotonic()
+                    student_import = run_import(student_import)
+                    self.stdout.write(f"Import #{student_import.id}: {student_import.status} "
+                                      f"in {time.monotonic() - started:.1f}s")
+                    continue
+                if options['once']:
+                    return
+                if purged_at is None or time.monotonic() - purged_at > PURGE_INTERVAL:
+                    purged_at = time.monotonic()
+                    purge_expired_imports()
+                time.sleep(options['interval'])
+                continue
+
+            started = time.monotonic()
+            job = run_job(job)
+            self.stdout.write(f"Job #{job.id} ({job.kind}): {job.status} in {time.monotonic() - started:.1f}s")
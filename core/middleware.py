@@ -0,0 +1,153 @@
+"""
+Query budget instrumentation
+Measures a random sample of requests: number of SQL queries, time spent
+in the database and total time. Requests over their budget are logged.
+Samples are added up in memory and folded into ViewQueryStats, which the
+admin lists worst-first, by a background thread every
+QUERY_BUDGET_FLUSH_SECONDS, so a measured request never writes to the
+database itself.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """connection.execute_wrapper hook that counts queries and their time"""
+    def __init__(self):
+        self.count = 0
+        self.db_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.db_ms += (time.perf_counter() - start) * 1000
+
+
+def query_budget(view_name):
+    """Allowed number of queries for a view"""
+    return settings.QUERY_BUDGETS.get(view_name, settings.QUERY_BUDGET_MAX_QUERIES)
+
+
+class SampleBuffer:
+    """Per-process totals of the samples not yet written, by view name"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.flushed_at = time.monotonic()
+
+    def add(self, view_name, path, queries, db_ms, duration_ms, over_budget):
+        with self.lock:
+            totals = self.views.setdefault(view_name, {
+                'samples': 0, 'over_budget': 0, 'total_queries': 0, 'max_queries': 0, 'total_db_ms': 0.0,
+                'max_db_ms': 0.0, 'total_duration_ms': 0.0, 'max_duration_ms': 0.0,
+            })
+            totals['samples'] += 1
+            totals['over_budget'] += int(over_budget)
+            totals['total_queries'] += queries
+            totals['max_queries'] = max(totals['max_queries'], queries)
+            totals['total_db_ms'] += db_ms
+            totals['max_db_ms'] = max(totals['max_db_ms'], db_ms)
+            totals['total_duration_ms'] += duration_ms
+            totals['max_duration_ms'] = max(totals['max_duration_ms'], duration_ms)
+            totals['last_path'] = path[:500]
+            totals['last_seen'] = timezone.now()
+
+    def due(self):
+        """True once per flush interval, for the caller that should start the flush"""
+        with self.lock:
+            if not self.views or time.monotonic() - self.flushed_at < settings.QUERY_BUDGET_FLUSH_SECONDS:
+                return False
+            self.flushed_at = time.monotonic()
+            return True
+
+    def drain(self):
+        with self.lock:
+            views, self.views = self.views, {}
+        return views
+
+
+samples = SampleBuffer()
+_flusher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='query-stats')
+
+
+def flush_samples():
+    """Fold the buffered samples into ViewQueryStats: one upsert and one UPDATE per view"""
+    from .models import ViewQueryStats
+
+    for view_name, totals in samples.drain().items():
+        ViewQueryStats.objects.get_or_create(view_name=view_name)
+        ViewQueryStats.objects.filter(view_name=view_name).update(
+            samples=F('samples') + totals['samples'],
+            over_budget=F('over_budget') + totals['over_budget'],
+            total_queries=F('total_queries') + totals['total_queries'],
+            max_queries=Greatest(F('max_queries'), totals['max_queries']),
+            total_db_ms=F('total_db_ms') + totals['total_db_ms'],
+            max_db_ms=Greatest(F('max_db_ms'), totals['max_db_ms']),
+            total_duration_ms=F('total_duration_ms') + totals['total_duration_ms'],
+            max_duration_ms=Greatest(F('max_duration_ms'), totals['max_duration_ms']),
+            last_path=totals['last_path'],
+            last_seen=totals['last_seen'],
+        )
+
+
+def _flush_in_background():
+    try:
+        flush_samples()
+    except Exception:
+        # Instrumentation must never break anything; these samples are lost
+        logger.exception("Could not record query stats")
+    finally:
+        # This thread's own connection, never a request's
+        connections.close_all()
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = settings.QUERY_BUDGET_SAMPLE_RATE
+        if sample_rate <= 0 or random.random() >= sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response
+
+        view_name = match.view_name
+        over_budget = (
+            recorder.count > query_budget(view_name)
+            or recorder.db_ms > settings.QUERY_BUDGET_MAX_DB_MS
+            or duration_ms > settings.QUERY_BUDGET_MAX_DURATION_MS
+        )
+        if over_budget:
+            logger.warning(
+                "Query budget exceeded: %s %s queries=%d (budget %d) db=%.1fms total=%.1fms",
+                view_name, request.path, recorder.count, query_budget(view_name), recorder.db_ms, duration_ms,
+            )
+
+        samples.add(view_name, request.path, recorder.count, recorder.db_ms, duration_ms, over_budget)
+        if samples.due():
+            _flusher.submit(_flush_in_background)
+        return response
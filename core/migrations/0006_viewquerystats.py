@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-18 02:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewQueryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(max_length=200, unique=True)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('over_budget', models.PositiveIntegerField(default=0)),
+                ('total_queries', models.PositiveBigIntegerField(default=0)),
+                ('max_queries', models.PositiveIntegerField(default=0)),
+                ('total_db_ms', models.FloatField(default=0)),
+                ('max_db_ms', models.FloatField(default=0)),
+                ('total_duration_ms', models.FloatField(default=0)),
+                ('max_duration_ms', models.FloatField(default=0)),
+                ('last_path', models.CharField(blank=True, max_length=500)),
+                ('last_seen', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'View query statistics',
+                'verbose_name_plural': 'View query statistics',
+            },
+        ),
+    ]
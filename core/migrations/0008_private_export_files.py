@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-18 04:00
+
+import core.storage
+from django.db import migrations, models
+
+
+def move_export_files(apps, schema_editor):
+    ExportJob = apps.get_model('core', 'ExportJob')
+    for job in ExportJob.objects.exclude(file='').exclude(file__isnull=True):
+        filename = job.file.name.rsplit('/', 1)[-1]
+        job.file = core.storage.move_from_public_storage(job.file.name, 'exports')
+        job.filename = filename
+        job.save(update_fields=['file', 'filename'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='filename',
+            field=models.CharField(blank=True, help_text='Name the file is downloaded as', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=core.storage.get_private_storage, upload_to=core.storage.export_file_path),
+        ),
+        migrations.RunPython(move_export_files, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from .storage import export_file_path, get_private_storage
 
 class Notification(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
@@ -7,10 +8,86 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notification_user_recent_idx'),
+            # Partial: only unread rows, which is all the navbar counter ever looks at
+            models.Index(fields=['user'], condition=models.Q(is_read=False), name='notification_unread_idx'),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user}: {self.message[:20]}"
 
 
+class ExportJob(models.Model):
+    """Large Excel export built off the request path by `manage.py run_export_worker`"""
+    KIND_CHOICES = (
+        ('grades', 'Baholar'),
+        ('attendance', 'Davomat'),
+        ('students', "O'quvchilar"),
+        ('all_users', 'Barcha foydalanuvchilar'),
+        ('quarter_report', 'Chorak hisoboti'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Navbatda'),
+        ('running', 'Tayyorlanmoqda'),
+        ('done', 'Tayyor'),
+        ('failed', 'Xatolik'),
+    )
+
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='export_jobs')
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to=export_file_path, storage=get_private_storage, blank=True, null=True)
+    filename = models.CharField(max_length=255, blank=True, help_text="Name the file is downloaded as")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} ({self.get_status_display()}) - {self.requested_by}"
+
+
+class ViewQueryStats(models.Model):
+    """Running totals per view, written by core.middleware.QueryBudgetMiddleware for sampled requests"""
+    view_name = models.CharField(max_length=200, unique=True)
+    samples = models.PositiveIntegerField(default=0)
+    over_budget = models.PositiveIntegerField(default=0)
+    total_queries = models.PositiveBigIntegerField(default=0)
+    max_queries = models.PositiveIntegerField(default=0)
+    total_db_ms = models.FloatField(default=0)
+    max_db_ms = models.FloatField(default=0)
+    total_duration_ms = models.FloatField(default=0)
+    max_duration_ms = models.FloatField(default=0)
+    last_path = models.CharField(max_length=500, blank=True)
+    last_seen = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "View query statistics"
+        verbose_name_plural = "View query statistics"
+
+    def __str__(self):
+        return self.view_name
+
+    @property
+    def avg_queries(self):
+        return round(self.total_queries / self.samples, 1) if self.samples else 0
+
+    @property
+    def avg_db_ms(self):
+        return round(self.total_db_ms / self.samples, 1) if self.samples else 0
+
+    @property
+    def avg_duration_ms(self):
+        return round(self.total_duration_ms / self.samples, 1) if self.samples else 0
+
+
 class School(models.Model):
     name = models.CharField(max_length=255)
     address = models.TextField()
@@ -0,0 +1,41 @@
+"""
+Notification fan-out
+Resolves who should hear about a domain event with one query per
+relation and writes all of their notifications with a single bulk_create.
+"""
+from django.db.models import Q
+
+from accounts.models import User
+from .models import Notification
+
+
+def parent_ids_by_student(student_ids):
+    """{student_id: [parent_id, ...]} for the given students, from one query"""
+    links = User.children.through.objects.filter(
+        to_user_id__in=list(student_ids), from_user__role='parent'
+    ).order_by('from_user_id').values_list('to_user_id', 'from_user_id')
+    parents = {}
+    for student_id, parent_id in links:
+        parents.setdefault(student_id, []).append(parent_id)
+    return parents
+
+
+def teacher_ids_for(class_id, subject_id):
+    """Teachers who teach `subject_id` to `class_id`, by TeacherAssignment or by timetable"""
+    return list(
+        User.objects.filter(role='teacher').filter(
+            Q(teacher_assignments__assigned_class_id=class_id, teacher_assignments__subject_id=subject_id) |
+            Q(schedules__class_obj_id=class_id, schedules__subject_id=subject_id)
+        ).values_list('id', flat=True).distinct()
+    )
+
+
+def send_notifications(recipients):
+    """
+    Write (user_id, message) pairs with one bulk_create.
+    Repeated pairs are sent once. Returns the created notifications.
+    """
+    unique = dict.fromkeys((user_id, message) for user_id, message in recipients if user_id)
+    return Notification.objects.bulk_create(
+        [Notification(user_id=user_id, message=message) for user_id, message in unique]
+    )
@@ -0,0 +1,128 @@
+"""
+Query plans
+EXPLAINs the hot filters on a generated dataset twice: as migrated, and
+with the hot-path indexes dropped inside a rolled-back transaction. The
+pair shows each filter moving from a table scan (or a scan plus a temp
+sort) to an index lookup. `manage.py explain_hot_queries` prints it.
+"""
+import re
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as dtime, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Avg, Sum
+from django.utils import timezone
+
+from communication.models import Message
+from gamification.models import PointTransaction
+from journal.models import Grade, Attendance
+from .benchmarks import benchmark_fixtures
+from .models import Notification
+
+# Models whose Meta.indexes exist for the queries below
+HOT_PATH_MODELS = [Grade, Attendance, Notification, Message, PointTransaction]
+
+
+def hot_queries():
+    """(label, queryset) for each hot filter, built the way the views build them"""
+    f = benchmark_fixtures()
+    day = Grade.objects.filter(subject=f['subject']).latest('date').date
+    month_ago = day - timedelta(days=30)
+    inbox_user = Notification.objects.order_by('-id').first().user
+    return [
+        # gradebook / grade_service: one subject on one day
+        ('gradebook_day', Grade.objects.filter(subject=f['subject'], date=day)),
+        # student and parent pages: a student's grades, newest first
+        ('student_grades', Grade.objects.filter(student=f['student']).order_by('-date')),
+        # admin dashboard and analytics APIs: the last 30 days
+        ('recent_grades', Grade.objects.filter(date__gte=month_ago).values('subject').annotate(avg=Avg('value')).order_by()),
+        # admin dashboard: today's attendance rate
+        ('attendance_day', Attendance.objects.filter(date=day, status='present')),
+        # navbar counter
+        ('unread_notifications', Notification.objects.filter(user=inbox_user, is_read=False)),
+        # notifications page
+        ('notification_list', inbox_user.notifications.order_by('-created_at')),
+        # navbar counter (counted, so unordered)
+        ('unread_messages', Message.objects.filter(conversation__participants=f['chat_user'], is_read=False)
+            .exclude(sender=f['chat_user']).order_by()),
+        # chat detail and the chat list's last-message subquery
+        ('chat_history', Message.objects.filter(conversation=f['chat_user'].conversations.order_by('-id').first())),
+        # period leaderboards
+        ('period_points', PointTransaction.objects.filter(user=f['student'], created_at__gte=timezone.make_aware(datetime.combine(month_ago, dtime.min)))
+            .values('user').annotate(points=Sum('amount')).order_by()),
+    ]
+
+
+def full_scan(plan, table):
+    """True if `plan` reads every row of `table` (SQLite or PostgreSQL EXPLAIN output)"""
+    return bool(re.search(rf'\bSCAN {table}\b|Seq Scan on {table}\b', plan))
+
+
+def access_path(plan, table):
+    """Short description of how `plan` reads `table`: 'SCAN', or the index it searches"""
+    if full_scan(plan, table):
+        access = 'SCAN'
+    else:
+        match = re.search(rf'{table}\b.*?(?:USING (?:COVERING )?INDEX|Index (?:Only )?Scan using) (\w+)', plan)
+        access = match.group(1) if match else '?'
+    return f"{access} +sort" if temp_sort(plan) else access
+
+
+def temp_sort(plan):
+    return 'TEMP B-TREE' in plan or re.search(r'^\s*->\s*Sort\b|^Sort\b', plan, re.M) is not None
+
+
+@contextmanager
+def without_hot_path_indexes():
+    """Drop the HOT_PATH_MODELS indexes for the duration of the block, then restore them"""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for model in HOT_PATH_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+        yield
+        transaction.set_rollback(True)
+
+
+def explain(queryset, tag):
+    """
+    EXPLAIN output for `queryset`. `tag` goes into a trailing SQL comment:
+    SQLite does not recompile a cached EXPLAIN after the schema changes,
+    so the same text would replay the plan from before the indexes were dropped.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql} -- {tag}", params)
+        return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+
+def _measure(queries, repeat, tag):
+    results = {}
+    for label, queryset in queries:
+        plan = explain(queryset, tag)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        results[label] = {
+            'plan': plan,
+            'full_scan': full_scan(plan, queryset.model._meta.db_table),
+            'temp_sort': temp_sort(plan),
+            'access': access_path(plan, queryset.model._meta.db_table),
+            'ms': round(statistics.median(timings), 2),
+        }
+    return results
+
+
+def measure_plans(repeat=5):
+    """{label: {'indexed': {...}, 'unindexed': {...}}} for the current database"""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')  # planner statistics, as a maintained production database would have
+    queries = hot_queries()
+    indexed = _measure(queries, repeat, 'indexed')
+    with without_hot_path_indexes():
+        unindexed = _measure(queries, repeat, 'unindexed')
+    return {label: {'indexed': indexed[label], 'unindexed': unindexed[label]} for label, _ in queries}
@@ -0,0 +1,63 @@
+"""
+Private file storage
+Exports and uploaded rosters hold personal data, so they are kept under
+PRIVATE_MEDIA_ROOT, which the web server does not serve, with random
+names. Only views that check who is asking hand them out.
+"""
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.functional import cached_property
+
+
+class PrivateFileStorage(FileSystemStorage):
+    """FileSystemStorage rooted at PRIVATE_MEDIA_ROOT, with no public URL"""
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PRIVATE_MEDIA_ROOT)
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PRIVATE_MEDIA_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+
+    def url(self, name):
+        raise ValueError("Private files have no public URL")
+
+
+private_storage = PrivateFileStorage()
+
+
+def get_private_storage():
+    # A callable, so migrations reference it instead of serializing a location
+    return private_storage
+
+
+def random_name(directory, filename):
+    """`directory`/<random hex><extension of filename>; nothing guessable from the original name"""
+    return f"{directory}/{uuid.uuid4().hex}{os.path.splitext(filename)[1].lower()}"
+
+
+def export_file_path(instance, filename):
+    return random_name('exports', filename)
+
+
+def import_file_path(instance, filename):
+    return random_name('imports', filename)
+
+
+def move_from_public_storage(name, directory):
+    """
+    Move a file saved under MEDIA_ROOT before the switch to private storage.
+    Returns its new private name, or None if the file is gone.
+    """
+    if not name or not default_storage.exists(name):
+        return None
+    with default_storage.open(name, 'rb') as fileobj:
+        new_name = private_storage.save(random_name(directory, name), fileobj)
+    default_storage.delete(name)
+    return new_name
@@ -1,3 +1,275 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.core.management import call_command, CommandError
+from io import StringIO
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from accounts.models import User
+from .models import School, Class, ExportJob, Notification, Schedule
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+TEST_PRIVATE_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, PRIVATE_MEDIA_ROOT=TEST_PRIVATE_MEDIA_ROOT)
+class ExportJobTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEST_PRIVATE_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.school = School.objects.create(name="Test School", address="Address")
+        self.class_obj = Class.objects.create(name="9-A", school=self.school)
+        self.director = User.objects.create_user(username='director', password='password123', role='director')
+        self.client.login(username='director', password='password123')
+
+    def test_background_export_is_built_by_worker(self):
+        response = self.client.get(reverse('export_all_users'), {'background': '1'})
+        self.assertRedirects(response, reverse('export_jobs'))
+        job = ExportJob.objects.get()
+        self.assertEqual(job.status, 'pending')
+
+        call_command('run_export_worker', '--once', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertTrue(job.file.name.endswith('.xlsx'))
+        # Kept outside MEDIA_ROOT under a random name, downloaded under a readable one
+        self.assertTrue(job.file.path.startswith(TEST_PRIVATE_MEDIA_ROOT))
+        self.assertFalse(os.listdir(TEST_MEDIA_ROOT))
+        self.assertNotIn(job.filename.rsplit('.', 1)[0], job.file.name)
+        self.assertTrue(Notification.objects.filter(user=self.director, message__startswith="Eksport tayyor").exists())
+
+        status = self.client.get(reverse('export_job_status', args=[job.id])).json()
+        self.assertEqual(status['download_url'], reverse('export_job_download', args=[job.id]))
+        download = self.client.get(status['download_url'])
+        self.assertEqual(download.status_code, 200)
+        self.assertIn(job.filename, download['Content-Disposition'])
+        download.close()
+
+    def test_failed_job_is_reported(self):
+        job = ExportJob.objects.create(requested_by=self.director, kind='quarter_report', params={'class_id': 999})
+        call_command('run_export_worker', '--once', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(job.error)
+
+    def test_jobs_are_private_to_requester(self):
+        job = ExportJob.objects.create(requested_by=self.director, kind='all_users')
+        User.objects.create_user(username='teacher', password='password123', role='teacher')
+        self.client.login(username='teacher', password='password123')
+        self.assertEqual(self.client.get(reverse('export_job_status', args=[job.id])).status_code, 404)
+
+
+class NotificationFanoutTests(TestCase):
+    def test_parents_resolved_in_one_query_and_duplicates_dropped(self):
+        from .notifications import parent_ids_by_student, send_notifications
+
+        children = [User.objects.create_user(username=f'child{i}', password='x', role='student') for i in range(2)]
+        parent = User.objects.create_user(username='parent', password='x', role='parent')
+        parent.children.add(*children)
+
+        with self.assertNumQueries(1):
+            parents = parent_ids_by_student([child.id for child in children])
+        self.assertEqual(parents, {children[0].id: [parent.id], children[1].id: [parent.id]})
+
+        sent = send_notifications([(parent.id, "Xabar"), (parent.id, "Xabar"), (children[0].id, "Xabar")])
+        self.assertEqual(len(sent), 2)
+
+
+class NavbarCounterTests(TestCase):
+    def setUp(self):
+        from communication.models import Conversation, Message, OnlineMeeting
+        from django.utils import timezone
+        import datetime
+
+        self.school = School.objects.create(name="Test School", address="Address")
+        self.class_obj = Class.objects.create(name="9-A", school=self.school)
+        self.parent = User.objects.create_user(username='parent', password='password123', role='parent')
+        child = User.objects.create_user(username='child', password='x', role='student', student_class=self.class_obj)
+        self.parent.children.add(child)
+        teacher = User.objects.create_user(username='teacher', password='x', role='teacher')
+
+        for _ in range(3):
+            conversation = Conversation.objects.create()
+            conversation.participants.add(self.parent, teacher)
+            Message.objects.create(conversation=conversation, sender=teacher, content="Salom")
+            Message.objects.create(conversation=conversation, sender=self.parent, content="Salom")
+        Notification.objects.create(user=self.parent, message="Xabar")
+        Notification.objects.create(user=self.parent, message="O'qilgan", is_read=True)
+
+        later = timezone.now() + datetime.timedelta(days=1)
+        OnlineMeeting.objects.create(title="Sinf", class_obj=self.class_obj, organizer=teacher, start_time=later, audience='class')
+        OnlineMeeting.objects.create(title="Ota-onalar", organizer=teacher, start_time=later, audience='parents')
+        OnlineMeeting.objects.create(title="O'qituvchilar", organizer=teacher, start_time=later, audience='teachers')
+
+    def test_counts_come_from_one_query(self):
+        from .counters import navbar_counts
+
+        with self.assertNumQueries(1):
+            counts = navbar_counts(self.parent)
+        self.assertEqual(counts, {
+            'unread_messages_count': 3,
+            'unread_notifications_count': 1,
+            'upcoming_meetings_count': 2,
+        })
+
+
+@override_settings(QUERY_BUDGET_SAMPLE_RATE=1.0, QUERY_BUDGET_MAX_QUERIES=1000, QUERY_BUDGETS={'home': 1},
+                   QUERY_BUDGET_FLUSH_SECONDS=3600)
+class QueryBudgetMiddlewareTests(TestCase):
+    def setUp(self):
+        from .middleware import samples
+
+        samples.drain()
+        User.objects.create_user(username='director', password='password123', role='director')
+        self.client.login(username='director', password='password123')
+
+    def test_sampled_requests_are_recorded_and_over_budget_logged(self):
+        from .middleware import flush_samples
+        from .models import ViewQueryStats
+
+        with self.assertLogs('core.middleware', level='WARNING') as logs:
+            self.client.get(reverse('home'))
+        self.assertIn("Query budget exceeded: home", logs.output[0])
+
+        self.client.get(reverse('home'))
+        # Nothing is written on the request path; the samples wait in memory
+        self.assertFalse(ViewQueryStats.objects.exists())
+        flush_samples()
+        stats = ViewQueryStats.objects.get(view_name='home')
+        self.assertEqual((stats.samples, stats.over_budget), (2, 2))
+        self.assertGreater(stats.max_queries, 1)
+
+    def test_unsampled_requests_are_not_measured(self):
+        from .middleware import samples
+
+        with self.settings(QUERY_BUDGET_SAMPLE_RATE=0):
+            self.client.get(reverse('home'))
+        self.assertEqual(samples.drain(), {})
+
+    def test_admin_lists_worst_offenders(self):
+        from .middleware import flush_samples
+
+        User.objects.create_superuser(username='root', password='password123', email='root@example.com')
+        self.client.login(username='root', password='password123')
+        self.client.get(reverse('home'))
+        flush_samples()
+        response = self.client.get(reverse('admin:core_viewquerystats_changelist'))
+        self.assertContains(response, 'home')
+
+
+class GenerateSchoolDataTests(TestCase):
+    def test_small_seeded_school(self):
+        from journal.models import Grade, Attendance
+        from gamification.models import PointBalance, PointTransaction
+        from django.db.models import Sum
+
+        options = ['--classes', '2', '--students', '6', '--teachers', '3', '--days', '5', '--grades-per-subject', '2',
+                   '--conversations', '2', '--quizzes', '1', '--notifications', '5', '--prefix', 't']
+        call_command('generate_school_data', *options, stdout=StringIO())
+
+        self.assertEqual(User.objects.filter(role='student', username__startswith='t_').count(), 6)
+        self.assertEqual(Grade.objects.count(), 6 * 10 * 2)
+        self.assertEqual(Attendance.objects.count(), 6 * 5)
+        self.assertEqual(Notification.objects.count(), 5)
+        self.assertEqual(
+            PointBalance.objects.aggregate(total=Sum('balance'))['total'],
+            PointTransaction.objects.aggregate(total=Sum('amount'))['total'],
+        )
+
+        with self.assertRaises(CommandError):
+            call_command('generate_school_data', *options, stdout=StringIO())
+
+    def test_timetable_never_double_books_a_teacher(self):
+        from django.db.models import Count
+
+        call_command('generate_school_data', '--classes', '4', '--students', '4', '--teachers', '2', '--days', '1',
+                     '--grades-per-subject', '1', '--conversations', '0', '--quizzes', '0', '--notifications', '0',
+                     '--prefix', 't', stdout=StringIO())
+
+        lessons = Schedule.objects.all()
+        self.assertTrue(lessons.exists())
+        self.assertFalse(
+            lessons.values('teacher', 'day_of_week', 'start_time').annotate(n=Count('id')).filter(n__gt=1).exists()
+        )
+
+
+class ViewBenchmarkTests(TestCase):
+    """CI-sized version of `manage.py benchmark_views`"""
+    def generate(self, prefix, students):
+        call_command('generate_school_data', '--classes=2', f'--students={students}', '--teachers=4', '--days=5',
+                     '--grades-per-subject=2', '--conversations=3', '--quizzes=2', '--notifications=10', f'--prefix={prefix}', stdout=StringIO())
+
+    def test_query_counts_do_not_grow_with_data(self):
+        from .benchmarks import measure_views, compare
+
+        self.generate('a', 10)
+        small = measure_views(repeat=1)
+        self.generate('b', 60)
+        large = measure_views(repeat=1)
+
+        for label, s, l, regression in compare(small, large):
+            self.assertEqual(l['status'], 200, label)
+            self.assertFalse(regression, f"{label}: {s['queries']} -> {l['queries']} queries")
+
+    def test_scaled_dataset_keeps_per_student_volume(self):
+        from .benchmarks import LARGE_DATASET, scaled_dataset
+
+        self.assertEqual(scaled_dataset(LARGE_DATASET['students']), LARGE_DATASET)
+        dataset = scaled_dataset(LARGE_DATASET['students'] * 4)
+        self.assertEqual(dataset['students'], LARGE_DATASET['students'] * 4)
+        self.assertEqual(dataset['classes'], LARGE_DATASET['classes'] * 4)
+        self.assertEqual(dataset['days'], LARGE_DATASET['days'])
+        self.assertEqual(scaled_dataset(3)['classes'], 1)
+
+
+class QueryPlanTests(TestCase):
+    """CI-sized version of `manage.py explain_hot_queries`"""
+    def test_hot_queries_use_the_new_indexes(self):
+        from .query_plans import measure_plans
+
+        call_command('generate_school_data', '--classes=2', '--students=30', '--teachers=4', '--days=40',
+                     '--grades-per-subject=4', '--conversations=5', '--quizzes=1', '--notifications=50', stdout=StringIO())
+        results = measure_plans(repeat=1)
+
+        for label, runs in results.items():
+            self.assertFalse(runs['indexed']['full_scan'], f"{label}: {runs['indexed']['plan']}")
+        self.assertEqual(results['attendance_day']['indexed']['access'], 'attendance_date_status_idx')
+        self.assertEqual(results['notification_list']['indexed']['access'], 'notification_user_recent_idx')
+        self.assertTrue(results['notification_list']['unindexed']['temp_sort'])
+        # The indexes are back after the unindexed run
+        self.assertEqual(measure_plans(repeat=1)['attendance_day']['indexed']['access'], 'attendance_date_status_idx')
+
+
+class SQLiteProfileTests(TestCase):
+    def test_connections_get_the_production_pragmas(self):
+        from django.conf import settings
+        from django.db import connection
+
+        if settings.SQLITE_PROFILE != 'production':
+            self.skipTest("SQLITE_PROFILE is not 'production'")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_BUSY_TIMEOUT * 1000)
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    def test_write_benchmark_has_no_lock_errors_with_the_production_profile(self):
+        import json
+        import os
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'writes.json')
+            call_command('benchmark_db_writes', '--writers=3', '--transactions=30', f'--json={path}', stdout=StringIO())
+            with open(path) as f:
+                results = json.load(f)
+        self.assertEqual(results['production']['journal_mode'], 'wal')
+        self.assertEqual(results['production']['committed'], 90)
+        self.assertEqual(results['production']['locked'], 0)
@@ -6,6 +6,7 @@ from accounts.models import User
 from journal.models import Grade, Attendance
 from core.models import Class, Subject, School
 from django.db.models import Count
+from analytics import rollups
 
 @login_required
 def student_dashboard(request):
@@ -63,11 +64,9 @@ def director_dashboard(request):
     total_teachers = User.objects.filter(role='teacher').count()
     total_classes = Class.objects.count()
     
+    # Charts and ratings read the pre-aggregated analytics rollups, not the journal
     # 1. Subject Performance Analysis (Avg Grade per Subject)
-    from django.db.models import Avg, Count, Q
-    subject_performance = Grade.objects.values('subject__name').annotate(
-        avg_grade=Avg('value')
-    ).order_by('-avg_grade')
+    subject_performance = rollups.subject_averages()
     
     # Prepare data for Chart.js
     subject_labels = [item['subject__name'] for item in subject_performance]
@@ -76,32 +75,20 @@ def director_dashboard(request):
     # 2. Attendance Analysis (Avg Attendance per Class)
     # Simple logic: Percentage of 'present' vs 'absent' overall or per class
     # Let's do Overall Attendance for Pie Chart
-    attendance_stats = Attendance.objects.values('status').annotate(count=Count('status'))
     attendance_data = {
         'present': 0,
         'absent': 0,
         'late': 0,
         'excused': 0
     }
-    for item in attendance_stats:
-        attendance_data[item['status']] = item['count']
+    attendance_data.update(rollups.attendance_counts())
         
     # 3. Activity Ratings
     # Top Teachers (by number of grades given)
-    top_teachers = Grade.objects.values('teacher__first_name', 'teacher__last_name').annotate(
-        grade_count=Count('id')
-    ).order_by('-grade_count')[:5]
+    top_teachers = rollups.top_teachers(5)
     
-    # Top Students (by GPA) -- Corrected lookup path
-    # Grade -> Student (User) -> Class -> Name
-    # student__student_class__name might be correct if User has student_class FK.
-    # Let's check User model.. if standard User, it doesn't have student_class directly unless extended.
-    # Ah, User model in accounts/models.py has student_class.
-    top_students = Grade.objects.values(
-        'student__first_name', 'student__last_name', 'student__student_class__name'
-    ).annotate(
-        gpa=Avg('value')
-    ).order_by('-gpa')[:5]
+    # Top Students (by GPA)
+    top_students = rollups.top_students(5)
     
     # Recent activity - Removed 'teacher' from select_related as it doesn't exist
     recent_grades = Grade.objects.select_related('student', 'subject').order_by('-date')[:10]
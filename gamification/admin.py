@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Badge, UserBadge, PointTransaction, Reward, Redemption
+from django.utils import timezone
+from .models import Badge, UserBadge, PointTransaction, PointBalance, Reward, Redemption
 
 @admin.register(Badge)
 class BadgeAdmin(admin.ModelAdmin):
@@ -18,6 +19,12 @@ class PointTransactionAdmin(admin.ModelAdmin):
     list_filter = ('transaction_type', 'created_at')
     search_fields = ('user__username', 'description')
 
+@admin.register(PointBalance)
+class PointBalanceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'balance', 'updated_at')
+    search_fields = ('user__username', 'user__first_name', 'user__last_name')
+    readonly_fields = ('user', 'balance', 'updated_at')
+
 @admin.register(Reward)
 class RewardAdmin(admin.ModelAdmin):
     list_display = ('name', 'cost', 'is_active')
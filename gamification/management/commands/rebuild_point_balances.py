@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from accounts.models import User
+from gamification.models import PointBalance, PointTransaction
+
+
+class Command(BaseCommand):
+    help = "Rebuild PointBalance rows from the PointTransaction log and report any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Only report mismatched balances, do not write anything",
+        )
+
+    def handle(self, *args, **options):
+        check_only = options['check']
+
+        expected = dict(
+            PointTransaction.objects.values('user_id').annotate(total=Sum('amount')).values_list('user_id', 'total')
+        )
+        current = dict(PointBalance.objects.values_list('user_id', 'balance'))
+
+        user_ids = set(expected) | set(current)
+        drift = {
+            user_id: (current.get(user_id), expected.get(user_id, 0))
+            for user_id in user_ids
+            if current.get(user_id) != expected.get(user_id, 0)
+        }
+
+        for user_id, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f"user={user_id}: stored={stored} actual={actual}")
+
+        if check_only:
+            if drift:
+                self.stdout.write(self.style.WARNING(f"{len(drift)} ta balans mos emas"))
+            else:
+                self.stdout.write(self.style.SUCCESS("Barcha balanslar to'g'ri"))
+            return
+
+        with transaction.atomic():
+            existing_users = set(User.objects.filter(id__in=drift.keys()).values_list('id', flat=True))
+            to_create = []
+            to_update = []
+            rows = {b.user_id: b for b in PointBalance.objects.filter(user_id__in=drift.keys())}
+            for user_id, (stored, actual) in drift.items():
+                if user_id not in existing_users:
+                    continue
+                if user_id in rows:
+                    rows[user_id].balance = actual
+                    to_update.append(rows[user_id])
+                else:
+                    to_create.append(PointBalance(user_id=user_id, balance=actual))
+
+            PointBalance.objects.bulk_create(to_create, batch_size=1000)
+            PointBalance.objects.bulk_update(to_update, ['balance'], batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(to_create)} ta balans yaratildi, {len(to_update)} ta balans tuzatildi"
+        ))
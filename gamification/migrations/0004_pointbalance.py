@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-18 02:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate_balances(apps, schema_editor):
+    PointTransaction = apps.get_model('gamification', 'PointTransaction')
+    PointBalance = apps.get_model('gamification', 'PointBalance')
+    totals = PointTransaction.objects.values('user_id').annotate(total=Sum('amount'))
+    PointBalance.objects.bulk_create(
+        [PointBalance(user_id=row['user_id'], balance=row['total'] or 0) for row in totals],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0003_redemption_is_equipped'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.IntegerField(db_index=True, default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='point_balance', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-18 03:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0004_pointbalance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pointtransaction',
+            index=models.Index(fields=['user', 'created_at'], name='pointtx_user_created_idx'),
+        ),
+    ]
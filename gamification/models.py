@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
 
 class Badge(models.Model):
@@ -22,6 +23,58 @@ class UserBadge(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.badge.name}"
 
+class PointBalanceManager(models.Manager):
+    def adjust(self, user_id, delta):
+        """Atomically change a single user's balance"""
+        self.adjust_many({user_id: delta})
+
+    def adjust_many(self, deltas):
+        """
+        Apply {user_id: delta} changes.
+        Missing rows are created with one bulk_create, then incremented with F(),
+        one UPDATE per distinct delta (grade rewards are only a few values).
+        """
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        by_delta = {}
+        for user_id, delta in deltas.items():
+            by_delta.setdefault(delta, []).append(user_id)
+        with transaction.atomic():
+            self.bulk_create(
+                [self.model(user_id=user_id, balance=0) for user_id in deltas],
+                ignore_conflicts=True
+            )
+            for delta, user_ids in by_delta.items():
+                self.filter(user_id__in=user_ids).update(balance=F('balance') + delta)
+
+
+class PointBalance(models.Model):
+    """
+    Denormalized running total of a user's PointTransaction log.
+    Updated on every transaction write; reconciled by `manage.py rebuild_point_balances`.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='point_balance')
+    balance = models.IntegerField(default=0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PointBalanceManager()
+
+    def __str__(self):
+        return f"{self.user.username}: {self.balance}"
+
+
+class PointTransactionQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic():
+            created = super().bulk_create(objs, *args, **kwargs)
+            deltas = {}
+            for obj in created:
+                deltas[obj.user_id] = deltas.get(obj.user_id, 0) + obj.amount
+            PointBalance.objects.adjust_many(deltas)
+        return created
+
+
 class PointTransaction(models.Model):
     TRANSACTION_TYPES = (
         ('grade', 'Grade Reward'),
@@ -35,7 +88,24 @@ class PointTransaction(models.Model):
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
     description = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
-    
+
+    objects = PointTransactionQuerySet.as_manager()
+
+    class Meta:
+        # Period leaderboards sum each student's transactions since a date
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='pointtx_user_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Write the transaction and the balance change in one DB transaction
+        with transaction.atomic():
+            previous_amount = 0
+            if self.pk:
+                previous_amount = PointTransaction.objects.filter(pk=self.pk).values_list('amount', flat=True).first() or 0
+            super().save(*args, **kwargs)
+            PointBalance.objects.adjust(self.user_id, self.amount - previous_amount)
+
     def __str__(self):
         return f"{self.user.username}: {self.amount} ({self.transaction_type})"
 
@@ -1,21 +1,35 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.db.models import F
 from journal.models import Grade
-from .models import PointTransaction
+from .models import PointTransaction, PointBalance
+
+# Points awarded for a new grade, by value
+GRADE_POINTS = {5: 10, 4: 5}
+
+
+def grade_point_transaction(grade):
+    """Unsaved reward transaction for a new grade, or None if the grade earns nothing"""
+    points = GRADE_POINTS.get(grade.value, 0)
+    if points <= 0:
+        return None
+    return PointTransaction(
+        user_id=grade.student_id,
+        amount=points,
+        transaction_type='grade',
+        description=f"{grade.subject.name} fanidan {grade.value} baho uchun"
+    )
+
 
 @receiver(post_save, sender=Grade)
 def award_points_for_grade(sender, instance, created, **kwargs):
     if created:
-        points = 0
-        if instance.value == 5:
-            points = 10
-        elif instance.value == 4:
-            points = 5
-            
-        if points > 0:
-            PointTransaction.objects.create(
-                user=instance.student,
-                amount=points,
-                transaction_type='grade',
-                description=f"{instance.subject.name} fanidan {instance.value} baho uchun"
-            )
+        transaction = grade_point_transaction(instance)
+        if transaction:
+            transaction.save()
+
+
+@receiver(post_delete, sender=PointTransaction)
+def reverse_points_on_delete(sender, instance, **kwargs):
+    # Plain update (no upsert): during a user cascade the balance row may already be gone
+    PointBalance.objects.filter(user_id=instance.user_id).update(balance=F('balance') - instance.amount)
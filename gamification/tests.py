@@ -1,3 +1,136 @@
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.core.management import call_command
+from io import StringIO
+from unittest import mock
+from datetime import timedelta
+from django.utils import timezone
+from accounts.models import User
+from core.models import School, Class
+from .models import PointTransaction, PointBalance, Reward, Badge, UserBadge
 
-# Create your tests here.
+
+class PointBalanceTests(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name="Test School", address="Address")
+        self.class_obj = Class.objects.create(name="9-A", school=self.school)
+        self.student = User.objects.create_user(username='student', password='password123', role='student', student_class=self.class_obj)
+
+    def balance(self, user):
+        return PointBalance.objects.get(user=user).balance
+
+    def test_balance_follows_transactions(self):
+        PointTransaction.objects.create(user=self.student, amount=10, transaction_type='manual', description='a')
+        tx = PointTransaction.objects.create(user=self.student, amount=5, transaction_type='manual', description='b')
+        self.assertEqual(self.balance(self.student), 15)
+
+        tx.amount = 7
+        tx.save()
+        self.assertEqual(self.balance(self.student), 17)
+
+        tx.delete()
+        self.assertEqual(self.balance(self.student), 10)
+
+    def test_bulk_create_updates_balance(self):
+        PointTransaction.objects.bulk_create([
+            PointTransaction(user=self.student, amount=3, transaction_type='manual', description='x')
+            for _ in range(4)
+        ])
+        self.assertEqual(self.balance(self.student), 12)
+
+    def test_redeem_reward_uses_balance(self):
+        PointTransaction.objects.create(user=self.student, amount=20, transaction_type='manual', description='a')
+        reward = Reward.objects.create(name='Pen', description='Pen', cost=15, type='digital')
+
+        self.client.login(username='student', password='password123')
+        self.client.post(reverse('redeem_reward', args=[reward.id]))
+        self.assertEqual(self.balance(self.student), 5)
+
+        # Not enough points for a second one
+        self.client.post(reverse('redeem_reward', args=[reward.id]))
+        self.assertEqual(self.balance(self.student), 5)
+        self.assertEqual(self.student.redemptions.count(), 1)
+
+    def test_leaderboard_query_count_is_constant(self):
+        badge = Badge.objects.create(name='Star', description='Star', icon='bi-star')
+
+        def add_students(start, count):
+            for i in range(start, start + count):
+                student = User.objects.create_user(username=f's{i}', password='x', role='student', student_class=self.class_obj)
+                PointTransaction.objects.create(user=student, amount=i, transaction_type='manual', description='x')
+                UserBadge.objects.create(user=student, badge=badge)
+
+        self.client.login(username='student', password='password123')
+        add_students(0, 2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('leaderboard'))
+
+        add_students(2, 10)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('leaderboard'))
+
+        self.assertEqual(len(small), len(large))
+        ranking = response.context['leaderboard']
+        self.assertEqual(ranking[0]['total_points'], 11)
+        self.assertEqual(len(ranking[0]['badges']), 1)
+
+    def test_leaderboard_links_keep_filters(self):
+        for i in range(3):
+            User.objects.create_user(username=f's{i}', password='x', role='student', student_class=self.class_obj)
+        self.client.login(username='student', password='password123')
+        with mock.patch('gamification.views.LEADERBOARD_PAGE_SIZE', 2):
+            response = self.client.get(reverse('leaderboard'), {'class_id': self.class_obj.id, 'period': 'week', 'page': 1})
+        self.assertContains(response, f'href="?class_id={self.class_obj.id}&amp;period=week&amp;page=2"')
+        self.assertContains(response, f'href="?class_id={self.class_obj.id}&amp;period=month"')
+
+    def test_rebuild_command_fixes_drift(self):
+        PointTransaction.objects.create(user=self.student, amount=10, transaction_type='manual', description='a')
+        PointBalance.objects.filter(user=self.student).update(balance=999)
+
+        out = StringIO()
+        call_command('rebuild_point_balances', '--check', stdout=out)
+        self.assertEqual(self.balance(self.student), 999)
+
+        call_command('rebuild_point_balances', stdout=out)
+        self.assertEqual(self.balance(self.student), 10)
+
+
+class LeaderboardApiTests(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name="Test School", address="Address")
+        self.class_a = Class.objects.create(name="9-A", school=self.school)
+        self.class_b = Class.objects.create(name="9-B", school=self.school)
+        self.students = []
+        for i, (cls, points) in enumerate([(self.class_a, 30), (self.class_a, 10), (self.class_b, 20), (self.class_b, 20)]):
+            student = User.objects.create_user(username=f'st{i}', password='password123', role='student', student_class=cls)
+            PointTransaction.objects.create(user=student, amount=points, transaction_type='manual', description='x')
+            self.students.append(student)
+
+    def test_school_ranking_and_my_rank(self):
+        self.client.login(username='st1', password='password123')
+        data = self.client.get(reverse('api_leaderboard'), {'school_id': self.school.id}).json()
+
+        self.assertEqual(data['total'], 4)
+        self.assertEqual([row['rank'] for row in data['results']], [1, 2, 2, 4])
+        self.assertEqual(data['me'], {'rank': 4, 'points': 10})
+
+    def test_class_ranking_with_pagination(self):
+        self.client.login(username='st1', password='password123')
+        data = self.client.get(reverse('api_leaderboard'), {'class_id': self.class_a.id, 'page_size': 1}).json()
+
+        self.assertEqual(data['num_pages'], 2)
+        self.assertEqual(data['results'][0]['student_id'], self.students[0].id)
+        self.assertEqual(data['me'], {'rank': 2, 'points': 10})
+
+    def test_period_window_only_counts_recent_points(self):
+        old = PointTransaction.objects.create(user=self.students[1], amount=100, transaction_type='manual', description='old')
+        PointTransaction.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=400))
+
+        self.client.login(username='st1', password='password123')
+        all_time = self.client.get(reverse('api_leaderboard'), {'period': 'all'}).json()
+        quarter = self.client.get(reverse('api_leaderboard'), {'period': 'quarter'}).json()
+
+        self.assertEqual(all_time['me']['rank'], 1)
+        self.assertEqual(quarter['me'], {'rank': 4, 'points': 10})
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('api/leaderboard/', views.api_leaderboard, name='api_leaderboard'),
     path('shop/', views.rewards_shop, name='rewards_shop'),
     path('redeem/<int:reward_id>/', views.redeem_reward, name='redeem_reward'),
     path('inventory/', views.student_inventory, name='student_inventory'),
@@ -1,41 +1,152 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum
-from .models import PointTransaction, Reward, Redemption, UserBadge
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F, Prefetch, Q, Sum, Window, prefetch_related_objects
+from django.db.models.functions import Coalesce, Rank
+from django.http import JsonResponse
+from datetime import datetime, time, timedelta
+from .models import PointTransaction, PointBalance, Reward, Redemption, UserBadge
 from django.utils import timezone
 from accounts.models import User
 
+LEADERBOARD_PERIODS = ('all', 'week', 'month', 'quarter')
+LEADERBOARD_PAGE_SIZE = 50
+LEADERBOARD_API_MAX_PAGE_SIZE = 100
+
+
+def _period_start(period):
+    """Start of the current week/month/quarter, or None for all-time"""
+    today = timezone.localdate()
+    if period == 'week':
+        start = today - timedelta(days=today.weekday())
+    elif period == 'month':
+        start = today.replace(day=1)
+    elif period == 'quarter':
+        start = today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1)
+    else:
+        return None
+    return timezone.make_aware(datetime.combine(start, time.min))
+
+
+def _scoped_points(class_id=None, school_id=None, period='all'):
+    """Students in scope annotated with their points for the period"""
+    students = User.objects.filter(role='student')
+    if class_id:
+        students = students.filter(student_class_id=class_id)
+    if school_id:
+        students = students.filter(student_class__school_id=school_id)
+    
+    since = _period_start(period)
+    if since is None:
+        # All-time points come straight from the materialized balance
+        points = Coalesce('point_balance__balance', 0)
+    else:
+        points = Coalesce(Sum('point_transactions__amount', filter=Q(point_transactions__created_at__gte=since)), 0)
+    return students.annotate(total_points=points)
+
+
+def ranked_students(class_id=None, school_id=None, period='all'):
+    """Students ranked by points with a single RANK() window query"""
+    return _scoped_points(class_id, school_id, period).annotate(
+        rank=Window(Rank(), order_by=F('total_points').desc())
+    ).select_related('student_class').order_by('rank', 'id')
+
+
+def student_rank(user, class_id=None, school_id=None, period='all'):
+    """(rank, points) of one student in the given window, or None if out of scope"""
+    scoped = _scoped_points(class_id, school_id, period)
+    points = scoped.filter(id=user.id).values_list('total_points', flat=True).first()
+    if points is None:
+        return None
+    return scoped.filter(total_points__gt=points).count() + 1, points
+
+
+def _leaderboard_filters(request):
+    period = request.GET.get('period', 'all')
+    if period not in LEADERBOARD_PERIODS:
+        period = 'all'
+    class_id = request.GET.get('class_id') or None
+    school_id = request.GET.get('school_id') or None
+    if class_id and not class_id.isdigit():
+        class_id = None
+    if school_id and not school_id.isdigit():
+        school_id = None
+    return {'class_id': class_id, 'school_id': school_id, 'period': period}
+
+
 @login_required
 def leaderboard(request):
-    students = User.objects.filter(role='student')
+    filters = _leaderboard_filters(request)
+    paginator = Paginator(ranked_students(**filters), LEADERBOARD_PAGE_SIZE)
+    page_obj = paginator.get_page(request.GET.get('page'))
     
-    leaderboard_data = []
-    for student in students:
-        total_points = PointTransaction.objects.filter(user=student).aggregate(Sum('amount'))['amount__sum'] or 0
-        badges = UserBadge.objects.filter(user=student).select_related('badge')
-        
-        leaderboard_data.append({
-            'student': student,
-            'total_points': total_points,
-            'badges': badges
-        })
+    # Badges only for the students on this page
+    students = list(page_obj.object_list)
+    prefetch_related_objects(students, Prefetch('badges', queryset=UserBadge.objects.select_related('badge')))
     
-    # Sort by points descending
-    leaderboard_data.sort(key=lambda x: x['total_points'], reverse=True)
+    leaderboard_data = [{
+        'student': student,
+        'rank': student.rank,
+        'total_points': student.total_points,
+        'badges': student.badges.all()
+    } for student in students]
     
     context = {
-        'leaderboard': leaderboard_data
+        'leaderboard': leaderboard_data,
+        'page_obj': page_obj,
+        'period': filters['period'],
     }
     return render(request, 'gamification/ranking.html', context)
 
+
+@login_required
+def api_leaderboard(request):
+    """
+    JSON leaderboard: ?class_id=&school_id=&period=all|week|month|quarter&page=&page_size=
+    Returns one page of ranked students plus the current user's own rank.
+    """
+    filters = _leaderboard_filters(request)
+    try:
+        page_size = min(max(int(request.GET.get('page_size', 20)), 1), LEADERBOARD_API_MAX_PAGE_SIZE)
+    except ValueError:
+        page_size = 20
+    
+    paginator = Paginator(ranked_students(**filters), page_size)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    
+    results = [{
+        'rank': student.rank,
+        'student_id': student.id,
+        'name': student.get_full_name() or student.username,
+        'class': student.student_class.name if student.student_class else None,
+        'points': student.total_points,
+    } for student in page_obj.object_list]
+    
+    me = None
+    if request.user.role == 'student':
+        my_rank = student_rank(request.user, **filters)
+        if my_rank:
+            me = {'rank': my_rank[0], 'points': my_rank[1]}
+    
+    return JsonResponse({
+        'period': filters['period'],
+        'class_id': filters['class_id'],
+        'school_id': filters['school_id'],
+        'page': page_obj.number,
+        'num_pages': paginator.num_pages,
+        'total': paginator.count,
+        'results': results,
+        'me': me,
+    })
+
 @login_required
 def rewards_shop(request):
     rewards = Reward.objects.filter(is_active=True)
     
     # Get current user's balance
-    balance_info = PointTransaction.objects.filter(user=request.user).aggregate(Sum('amount'))
-    user_balance = balance_info['amount__sum'] or 0
+    user_balance = get_user_balance(request.user)
     
     context = {
         'rewards': rewards,
@@ -50,36 +161,43 @@ def redeem_reward(request, reward_id):
         
     reward = get_object_or_404(Reward, id=reward_id)
     
-    # Check balance
-    balance_info = PointTransaction.objects.filter(user=request.user).aggregate(Sum('amount'))
-    user_balance = balance_info['amount__sum'] or 0
-    
-    if user_balance >= reward.cost:
-        # Create negative transaction
-        PointTransaction.objects.create(
-            user=request.user,
-            amount=-reward.cost,
-            transaction_type='reward_purchase',
-            description=f"Sotib olindi: {reward.name}"
-        )
+    with transaction.atomic():
+        # Lock the balance row so two concurrent purchases can't overspend
+        balance_row = PointBalance.objects.select_for_update().filter(user=request.user).first()
+        user_balance = balance_row.balance if balance_row else 0
         
-        # Create redemption record
-        status = 'approved' if reward.type in ['digital', 'privilege'] else 'pending'
-        processed_at = timezone.now() if status == 'approved' else None
-        
-        Redemption.objects.create(
-            user=request.user,
-            reward=reward,
-            status=status,
-            processed_at=processed_at
-        )
-        
-        messages.success(request, f"{reward.name} muvaffaqiyatli sotib olindi!")
-    else:
-        messages.error(request, "Ballar yetarli emas!")
+        if user_balance >= reward.cost:
+            # Create negative transaction
+            PointTransaction.objects.create(
+                user=request.user,
+                amount=-reward.cost,
+                transaction_type='reward_purchase',
+                description=f"Sotib olindi: {reward.name}"
+            )
+            
+            # Create redemption record
+            status = 'approved' if reward.type in ['digital', 'privilege'] else 'pending'
+            processed_at = timezone.now() if status == 'approved' else None
+            
+            Redemption.objects.create(
+                user=request.user,
+                reward=reward,
+                status=status,
+                processed_at=processed_at
+            )
+            
+            messages.success(request, f"{reward.name} muvaffaqiyatli sotib olindi!")
+        else:
+            messages.error(request, "Ballar yetarli emas!")
         
     return redirect('rewards_shop')
 
+
+def get_user_balance(user):
+    """Current point balance of a user (one indexed lookup)"""
+    balance = PointBalance.objects.filter(user=user).values_list('balance', flat=True).first()
+    return balance or 0
+
 @login_required
 def student_inventory(request):
     # Get approved redemptions (purchased items)
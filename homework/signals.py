@@ -2,6 +2,7 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import Assignment, Submission
 from core.models import Notification
+from core.notifications import teacher_ids_for, send_notifications
 from accounts.models import User
 
 @receiver(post_save, sender=Assignment)
@@ -21,13 +22,10 @@ def create_assignment_notification(sender, instance, created, **kwargs):
 @receiver(post_save, sender=Submission)
 def create_submission_notification(sender, instance, created, **kwargs):
     if created:
-        # Notify all teachers (simplification for MVP as Assignment doesn't strictly link to one teacher)
-        teachers = User.objects.filter(role='teacher')
+        # Only the teachers of this subject in this class, not the whole school
+        assignment = instance.assignment
+        teacher_ids = teacher_ids_for(assignment.target_class_id, assignment.subject_id)
         student_name = f"{instance.student.first_name} {instance.student.last_name}"
-        message = f"Vazifa topshirildi: {student_name} {instance.assignment.subject.name} fanidan vazifa yukladi."
+        message = f"Vazifa topshirildi: {student_name} {assignment.subject.name} fanidan vazifa yukladi."
         
-        notifications = [
-            Notification(user=teacher, message=message)
-            for teacher in teachers
-        ]
-        Notification.objects.bulk_create(notifications)
+        send_notifications((teacher_id, message) for teacher_id in teacher_ids)
@@ -1,3 +1,38 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+import shutil
+import tempfile
 
-# Create your tests here.
+from accounts.models import User
+from administration.models import TeacherAssignment
+from core.models import School, Class, Subject, Notification
+from .models import Assignment, Submission
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class SubmissionNotificationTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        school = School.objects.create(name="Test School", address="Address")
+        self.class_obj = Class.objects.create(name="9-A", school=school)
+        self.subject = Subject.objects.create(name="Math")
+        self.math_teacher = User.objects.create_user(username='math', password='x', role='teacher')
+        self.other_teacher = User.objects.create_user(username='other', password='x', role='teacher')
+        TeacherAssignment.objects.create(teacher=self.math_teacher, subject=self.subject, assigned_class=self.class_obj)
+        self.student = User.objects.create_user(username='student', password='x', role='student', student_class=self.class_obj)
+        self.assignment = Assignment.objects.create(subject=self.subject, target_class=self.class_obj,
+                                                    description="Mashq", deadline=timezone.now())
+
+    def test_submission_notifies_only_the_class_subject_teacher(self):
+        Notification.objects.all().delete()
+        Submission.objects.create(assignment=self.assignment, student=self.student,
+                                  file_submission=SimpleUploadedFile('javob.txt', b'42'))
+
+        self.assertEqual(list(Notification.objects.values_list('user__username', flat=True)), ['math'])
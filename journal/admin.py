@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Attendance, Grade, GradeAudit
+from .models import Attendance, Grade, GradeAudit, StudentImport
 
 admin.site.register(Attendance)
 admin.site.register(Grade)
@@ -10,3 +10,10 @@ class GradeAuditAdmin(admin.ModelAdmin):
     list_filter = ('action', 'timestamp', 'changed_by')
     search_fields = ('grade__student__username', 'grade__subject__name')
 
+
+
+@admin.register(StudentImport)
+class StudentImportAdmin(admin.ModelAdmin):
+    list_display = ('original_name', 'uploaded_by', 'status', 'last_row', 'created_count', 'created_at')
+    list_filter = ('status',)
+    readonly_fields = ('last_row', 'created_count', 'errors', 'error', 'created_at', 'updated_at')
@@ -0,0 +1,56 @@
+"""
+Batched roll-call
+Writes a whole class-day of attendance in one upsert, sends the absence
+alerts to every parent with one bulk_create and moves the dashboard
+rollup counts from the replaced marks to the new ones. Cached AI
+assistant context built from these students' attendance is dropped.
+"""
+from django.db import transaction
+
+from ai_assistant.rag.retriever import invalidate_student_context
+from analytics.rollups import AttendanceFact, apply_attendance_changes
+from core.notifications import parent_ids_by_student, send_notifications
+from .models import Attendance
+
+ATTENDANCE_STATUSES = {value for value, _ in Attendance.STATUS_CHOICES}
+
+
+def save_attendance(date, marks):
+    """
+    Upsert attendance for one day. `marks` is a list of (student, status)
+    pairs with valid statuses. Returns the number of marks written.
+    """
+    if not marks:
+        return 0
+
+    absent = [student for student, status in marks if status == 'absent']
+    parents = parent_ids_by_student(student.id for student in absent) if absent else {}
+    notifications = [
+        (parent_id, f"{student.first_name} {date} sanasida darsga kelmadi")
+        for student in absent
+        for parent_id in parents.get(student.id, [])
+    ]
+
+    with transaction.atomic():
+        previous = dict(
+            Attendance.objects.filter(date=date, student_id__in=[student.id for student, _ in marks])
+            .values_list('student_id', 'status')
+        )
+        Attendance.objects.bulk_create(
+            [Attendance(student=student, date=date, status=status) for student, status in marks],
+            update_conflicts=True,
+            unique_fields=['student', 'date'],
+            update_fields=['status'],
+        )
+        send_notifications(notifications)
+
+        apply_attendance_changes(
+            added=[AttendanceFact(date, student.student_class_id, status) for student, status in marks],
+            removed=[
+                AttendanceFact(date, student.student_class_id, previous[student.id])
+                for student, _ in marks if student.id in previous
+            ],
+        )
+        invalidate_student_context([student.id for student, _ in marks])
+
+    return len(marks)
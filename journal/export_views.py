@@ -1,14 +1,225 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
 from core.models import Class, Subject
+from core.job_views import queue_export_response
 from accounts.models import User
 from .models import Grade, Attendance
 from django.utils import timezone
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
 from datetime import datetime
+import csv
+import tempfile
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Rows fetched per round-trip while streaming an export
+EXPORT_CHUNK_SIZE = 2000
+
+
+# ========== EXPORT DEFINITIONS ==========
+# Each builder returns a dict describing one sheet: title rows, headers,
+# column widths, the queryset to stream and a function turning one
+# queryset row into a list of cell values.
+
+def grades_export(selected_class, selected_subject):
+    grades = Grade.objects.filter(
+        student__student_class=selected_class,
+        subject=selected_subject
+    ).order_by('student__last_name', 'date').values_list(
+        'student__first_name', 'student__last_name', 'value', 'date'
+    )
+
+    return {
+        'sheet_title': "Baholar",
+        'title': f"Baholar Hisoboti - {selected_class.name} - {selected_subject.name}",
+        'subtitle': f"Sana: {datetime.now().strftime('%d.%m.%Y')}",
+        'header_color': ("4472C4", "FFFFFF"),
+        'headers': ['#', "O'quvchi", 'Baho', 'Sana'],
+        'widths': [5, 30, 10, 15],
+        'queryset': grades,
+        'row': lambda idx, g: [idx, f"{g[0]} {g[1]}", g[2], g[3].strftime('%d.%m.%Y')],
+        'filename': f"baholar_{selected_class.name}_{selected_subject.name}_{datetime.now().strftime('%Y%m%d')}",
+    }
+
+
+ATTENDANCE_STATUS_MAP = {
+    'present': 'Keldi',
+    'absent': 'Kelmadi',
+    'late': 'Kech qoldi',
+    'excused': 'Sababli'
+}
+
+
+def attendance_export(selected_class):
+    attendance_records = Attendance.objects.filter(
+        student__student_class=selected_class
+    ).order_by('date', 'student__last_name').values_list(
+        'student__first_name', 'student__last_name', 'status', 'date'
+    )
+
+    return {
+        'sheet_title': "Davomat",
+        'title': f"Davomat Hisoboti - {selected_class.name}",
+        'subtitle': f"Sana: {datetime.now().strftime('%d.%m.%Y')}",
+        'header_color': ("70AD47", "FFFFFF"),
+        'headers': ['#', "O'quvchi", 'Status', 'Sana'],
+        'widths': [5, 30, 15, 15],
+        'queryset': attendance_records,
+        'row': lambda idx, a: [idx, f"{a[0]} {a[1]}", ATTENDANCE_STATUS_MAP.get(a[2], a[2]), a[3].strftime('%d.%m.%Y')],
+        'filename': f"davomat_{selected_class.name}_{datetime.now().strftime('%Y%m%d')}",
+    }
+
+
+def students_export(selected_class=None):
+    students = User.objects.filter(role='student')
+    if selected_class:
+        students = students.filter(student_class=selected_class)
+        title = f"O'quvchilar Ro'yxati - {selected_class.name}"
+    else:
+        title = "O'quvchilar Ro'yxati - Barcha Sinflar"
+
+    students = students.order_by('student_class', 'last_name').values_list(
+        'first_name', 'last_name', 'username', 'email', 'student_class__name'
+    )
+    class_suffix = f"_{selected_class.name}" if selected_class else "_barcha"
+
+    return {
+        'sheet_title': "O'quvchilar",
+        'title': title,
+        'subtitle': f"Sana: {datetime.now().strftime('%d.%m.%Y')}",
+        'header_color': ("FFC000", "000000"),
+        'headers': ['#', 'Ism', 'Familiya', 'Username', 'Email', 'Sinf'],
+        'widths': [5, 20, 20, 15, 25, 15],
+        'queryset': students,
+        'row': lambda idx, s: [idx, s[0], s[1], s[2], s[3] or '', s[4] or ''],
+        'filename': f"oquvchilar{class_suffix}_{datetime.now().strftime('%Y%m%d')}",
+    }
+
+
+USER_ROLE_MAP = {
+    'admin': 'Administrator',
+    'director': 'Direktor',
+    'teacher': "O'qituvchi",
+    'student': "O'quvchi",
+    'parent': "Ota-ona",
+}
+
+
+def all_users_export():
+    users = User.objects.all().order_by('role', 'last_name').values_list(
+        'id', 'first_name', 'last_name', 'username', 'role', 'email'
+    )
+
+    return {
+        'sheet_title': "Barcha Foydalanuvchilar",
+        'title': "LearnSphere - Barcha Foydalanuvchilar Ro'yxati",
+        'title_size': 16,
+        'subtitle': f"Export sanasi: {datetime.now().strftime('%d.%m.%Y %H:%M')}",
+        'header_color': ("4472C4", "FFFFFF"),
+        'headers': ['#', 'ID', 'Ism', 'Familiya', 'Username', 'Rol', 'E-mail'],
+        'widths': [5, 8, 20, 20, 15, 15, 25],
+        'queryset': users,
+        'row': lambda idx, u: [idx, u[0], u[1], u[2], u[3], USER_ROLE_MAP.get(u[4], u[4]), u[5] or ''],
+        'filename': f"barcha_foydalanuvchilar_{datetime.now().strftime('%Y%m%d')}",
+    }
+
+
+# ========== WRITERS ==========
+
+def iter_export_rows(export):
+    """Yield data rows, fetching EXPORT_CHUNK_SIZE rows from the DB at a time"""
+    for idx, values in enumerate(export['queryset'].iterator(chunk_size=EXPORT_CHUNK_SIZE), 1):
+        yield export['row'](idx, values)
+
+
+def write_export_xlsx(export, fileobj):
+    """
+    Write an export to `fileobj` with a write-only worksheet.
+    Rows are flushed to disk as they are appended, so memory stays flat.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=export['sheet_title'])
+
+    last_column = get_column_letter(len(export['headers']))
+    for col, width in enumerate(export['widths'], 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+    ws.merged_cells.add(f'A1:{last_column}1')
+    ws.merged_cells.add(f'A2:{last_column}2')
+
+    title = WriteOnlyCell(ws, value=export['title'])
+    title.font = Font(bold=True, size=export.get('title_size', 14))
+    ws.append([title])
+    ws.append([export['subtitle']])
+    ws.append([])
+
+    fill_color, font_color = export['header_color']
+    header_fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
+    header_font = Font(bold=True, color=font_color)
+    header = []
+    for value in export['headers']:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = Alignment(horizontal='center')
+        header.append(cell)
+    ws.append(header)
+
+    for row in iter_export_rows(export):
+        ws.append(row)
+
+    wb.save(fileobj)
+
+
+class _Echo:
+    """File-like object whose write() just returns the value, for streaming csv.writer output"""
+    def write(self, value):
+        return value
+
+
+def iter_export_csv(export):
+    writer = csv.writer(_Echo())
+    yield '\ufeff'  # BOM so Excel opens UTF-8 names correctly
+    yield writer.writerow(export['headers'])
+    for row in iter_export_rows(export):
+        yield writer.writerow(row)
+
+
+def export_response(request, export, job_kind=None, job_params=None):
+    """
+    Stream an export back to the client.
+    With ?background=1 the export is queued as an ExportJob instead.
+    Falls back to CSV when ?format=csv is given or the row count
+    exceeds settings.EXPORT_CSV_ROW_THRESHOLD.
+    """
+    if job_kind and request.GET.get('background'):
+        return queue_export_response(request, job_kind, job_params or {})
+
+    threshold = getattr(settings, 'EXPORT_CSV_ROW_THRESHOLD', 50000)
+    as_csv = request.GET.get('format') == 'csv' or export['queryset'].count() > threshold
+
+    if as_csv:
+        response = StreamingHttpResponse(iter_export_csv(export), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{export["filename"]}.csv"'
+        return response
+
+    fileobj = tempfile.TemporaryFile()
+    write_export_xlsx(export, fileobj)
+    fileobj.seek(0)
+    return FileResponse(
+        fileobj,
+        as_attachment=True,
+        filename=f"{export['filename']}.xlsx",
+        content_type=XLSX_CONTENT_TYPE
+    )
+
+
+# ========== VIEWS ==========
 
 @login_required
 def export_grades_excel(request):
@@ -16,72 +227,19 @@ def export_grades_excel(request):
     if request.user.role not in ['admin', 'director', 'vice_director', 'teacher']:
         messages.error(request, "Ruxsat yo'q!")
         return redirect('home')
-    
+
     class_id = request.GET.get('class_id')
     subject_id = request.GET.get('subject_id')
-    
+
     if not class_id or not subject_id:
         messages.error(request, "Sinf va fanni tanlang!")
         return redirect('gradebook')
-    
+
     selected_class = get_object_or_404(Class, id=class_id)
     selected_subject = get_object_or_404(Subject, id=subject_id)
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Baholar"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-    
-    # Title
-    ws['A1'] = f"Baholar Hisoboti - {selected_class.name} - {selected_subject.name}"
-    ws['A1'].font = Font(bold=True, size=14)
-    ws.merge_cells('A1:D1')
-    
-    ws['A2'] = f"Sana: {datetime.now().strftime('%d.%m.%Y')}"
-    ws.merge_cells('A2:D2')
-    
-    # Headers
-    headers = ['#', "O'quvchi", 'Baho', 'Sana']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=4, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Data
-    grades = Grade.objects.filter(
-        student__student_class=selected_class,
-        subject=selected_subject
-    ).select_related('student').order_by('student__last_name', 'date')
-    
-    row = 5
-    for idx, grade in enumerate(grades, 1):
-        ws.cell(row=row, column=1, value=idx)
-        ws.cell(row=row, column=2, value=f"{grade.student.first_name} {grade.student.last_name}")
-        ws.cell(row=row, column=3, value=grade.value)
-        ws.cell(row=row, column=4, value=grade.date.strftime('%d.%m.%Y'))
-        row += 1
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 5
-    ws.column_dimensions['B'].width = 30
-    ws.column_dimensions['C'].width = 10
-    ws.column_dimensions['D'].width = 15
-    
-    # Create response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    filename = f"baholar_{selected_class.name}_{selected_subject.name}_{datetime.now().strftime('%Y%m%d')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb.save(response)
-    return response
+
+    return export_response(request, grades_export(selected_class, selected_subject), 'grades',
+                           {'class_id': selected_class.id, 'subject_id': selected_subject.id})
 
 
 @login_required
@@ -90,76 +248,16 @@ def export_attendance_excel(request):
     if request.user.role not in ['admin', 'director', 'vice_director', 'teacher']:
         messages.error(request, "Ruxsat yo'q!")
         return redirect('home')
-    
+
     class_id = request.GET.get('class_id')
-    
+
     if not class_id:
         messages.error(request, "Sinfni tanlang!")
         return redirect('attendance')
-    
+
     selected_class = get_object_or_404(Class, id=class_id)
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Davomat"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-    
-    # Title
-    ws['A1'] = f"Davomat Hisoboti - {selected_class.name}"
-    ws['A1'].font = Font(bold=True, size=14)
-    ws.merge_cells('A1:D1')
-    
-    ws['A2'] = f"Sana: {datetime.now().strftime('%d.%m.%Y')}"
-    ws.merge_cells('A2:D2')
-    
-    # Headers
-    headers = ['#', "O'quvchi", 'Status', 'Sana']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=4, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Data
-    attendance_records = Attendance.objects.filter(
-        student__student_class=selected_class
-    ).select_related('student').order_by('date', 'student__last_name')
-    
-    status_map = {
-        'present': 'Keldi',
-        'absent': 'Kelmadi',
-        'late': 'Kech qoldi',
-        'excused': 'Sababli'
-    }
-    
-    row = 5
-    for idx, record in enumerate(attendance_records, 1):
-        ws.cell(row=row, column=1, value=idx)
-        ws.cell(row=row, column=2, value=f"{record.student.first_name} {record.student.last_name}")
-        ws.cell(row=row, column=3, value=status_map.get(record.status, record.status))
-        ws.cell(row=row, column=4, value=record.date.strftime('%d.%m.%Y'))
-        row += 1
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 5
-    ws.column_dimensions['B'].width = 30
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 15
-    
-    # Create response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    filename = f"davomat_{selected_class.name}_{datetime.now().strftime('%Y%m%d')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb.save(response)
-    return response
+
+    return export_response(request, attendance_export(selected_class), 'attendance', {'class_id': selected_class.id})
 
 
 @login_required
@@ -168,71 +266,12 @@ def export_students_excel(request):
     if request.user.role not in ['admin', 'director', 'vice_director', 'teacher']:
         messages.error(request, "Ruxsat yo'q!")
         return redirect('home')
-    
+
     class_id = request.GET.get('class_id')
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "O'quvchilar"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")
-    header_font = Font(bold=True, color="000000")
-    
-    # Title
-    if class_id:
-        selected_class = get_object_or_404(Class, id=class_id)
-        ws['A1'] = f"O'quvchilar Ro'yxati - {selected_class.name}"
-        students = User.objects.filter(role='student', student_class=selected_class)
-    else:
-        ws['A1'] = "O'quvchilar Ro'yxati - Barcha Sinflar"
-        students = User.objects.filter(role='student')
-    
-    ws['A1'].font = Font(bold=True, size=14)
-    ws.merge_cells('A1:F1')
-    
-    ws['A2'] = f"Sana: {datetime.now().strftime('%d.%m.%Y')}"
-    ws.merge_cells('A2:F2')
-    
-    # Headers
-    headers = ['#', 'Ism', 'Familiya', 'Username', 'Email', 'Sinf']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=4, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Data
-    row = 5
-    for idx, student in enumerate(students.order_by('student_class', 'last_name'), 1):
-        ws.cell(row=row, column=1, value=idx)
-        ws.cell(row=row, column=2, value=student.first_name)
-        ws.cell(row=row, column=3, value=student.last_name)
-        ws.cell(row=row, column=4, value=student.username)
-        ws.cell(row=row, column=5, value=student.email or '')
-        ws.cell(row=row, column=6, value=str(student.student_class) if student.student_class else '')
-        row += 1
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 5
-    ws.column_dimensions['B'].width = 20
-    ws.column_dimensions['C'].width = 20
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 25
-    ws.column_dimensions['F'].width = 15
-    
-    # Create response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    class_suffix = f"_{selected_class.name}" if class_id else "_barcha"
-    filename = f"oquvchilar{class_suffix}_{datetime.now().strftime('%Y%m%d')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb.save(response)
-    return response
+    selected_class = get_object_or_404(Class, id=class_id) if class_id else None
+
+    return export_response(request, students_export(selected_class), 'students',
+                           {'class_id': selected_class.id if selected_class else None})
 
 
 @login_required
@@ -241,70 +280,5 @@ def export_all_users_excel(request):
     if request.user.role not in ['admin', 'director', 'vice_director']:
         messages.error(request, "Ruxsat yo'q!")
         return redirect('home')
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Barcha Foydalanuvchilar"
-    
-    # Header styling
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-    
-    # Title
-    ws['A1'] = "LearnSphere - Barcha Foydalanuvchilar Ro'yxati"
-    ws['A1'].font = Font(bold=True, size=16)
-    ws.merge_cells('A1:G1')
-    
-    ws['A2'] = f"Export sanasi: {datetime.now().strftime('%d.%m.%Y %H:%M')}"
-    ws.merge_cells('A2:G2')
-    
-    # Headers
-    headers = ['#', 'ID', 'Ism', 'Familiya', 'Username', 'Rol', 'E-mail']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=4, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Data
-    users = User.objects.all().order_by('role', 'last_name')
-    
-    role_map = {
-        'admin': 'Administrator',
-        'director': 'Direktor',
-        'teacher': "O'qituvchi",
-        'student': "O'quvchi",
-        'parent': "Ota-ona",
-    }
-    
-    row = 5
-    for idx, user in enumerate(users, 1):
-        ws.cell(row=row, column=1, value=idx)
-        ws.cell(row=row, column=2, value=user.id)
-        ws.cell(row=row, column=3, value=user.first_name)
-        ws.cell(row=row, column=4, value=user.last_name)
-        ws.cell(row=row, column=5, value=user.username)
-        ws.cell(row=row, column=6, value=role_map.get(user.role, user.role))
-        ws.cell(row=row, column=7, value=user.email or '')
-        row += 1
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 5
-    ws.column_dimensions['B'].width = 8
-    ws.column_dimensions['C'].width = 20
-    ws.column_dimensions['D'].width = 20
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
-    ws.column_dimensions['G'].width = 25
-    
-    # Create response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    filename = f"barcha_foydalanuvchilar_{datetime.now().strftime('%Y%m%d')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb.save(response)
-    return response
+
+    return export_response(request, all_users_export(), 'all_users')
@@ -0,0 +1,118 @@
+"""
+Bulk gradebook save
+Writes a whole class's grades for one subject and date with a fixed number
+of queries. Existing grades are read and locked inside the transaction, so a
+grade another save wrote first is handled as an update. New ones are bulk
+inserted (upserting on the unique key as a last resort), existing ones
+are bulk updated, and the audit rows, reward points and notifications the
+per-grade signals would have produced are written in batches, along with
+the dashboard rollup deltas. Cached AI assistant context built from these
+students' grades is dropped.
+"""
+from django.db import transaction
+
+from ai_assistant.rag.retriever import invalidate_student_context
+from analytics.rollups import grade_fact, apply_grade_changes
+from core.notifications import parent_ids_by_student, send_notifications
+from gamification.models import PointTransaction
+from gamification.signals import grade_point_transaction
+from .models import Grade, GradeAudit
+from .signals import new_grade_notifications
+
+# Grades at or below this value are reported to the parent
+LOW_GRADE_THRESHOLD = 3
+
+GRADE_UPDATE_FIELDS = ['value', 'comment', 'teacher', 'metadata']
+
+
+def save_grades(teacher, subject, date, entries):
+    """
+    Save gradebook rows for one subject and date.
+    `entries` is a list of dicts with 'student', 'value', 'comment' and
+    optional 'competency'. Returns the saved Grade objects.
+    """
+    if not entries:
+        return []
+
+    student_ids = [entry['student'].id for entry in entries]
+    parents = parent_ids_by_student(student_ids)
+    notifications, transactions = [], []
+
+    with transaction.atomic():
+        # Read inside the transaction with row locks, so a grade another save
+        # wrote in the meantime is treated as an update, not a second create
+        existing = {
+            grade.student_id: grade
+            for grade in Grade.objects.select_for_update().filter(subject=subject, date=date, student_id__in=student_ids)
+        }
+
+        new_grades, existing_grades, saved = [], [], []
+        audits, replaced = [], []
+        for entry in entries:
+            student = entry['student']
+            grade = existing.get(student.id)
+            previous_value = grade.value if grade else None
+
+            if grade is None:
+                grade = Grade(student=student, subject=subject, date=date, metadata={})
+                new_grades.append(grade)
+            else:
+                grade.student = student
+                grade.subject = subject
+                existing_grades.append(grade)
+                replaced.append(grade_fact(grade, student.student_class_id))
+
+            grade.value = entry['value']
+            grade.comment = entry['comment']
+            grade.teacher = teacher
+            if entry.get('competency'):
+                # Merge with existing metadata or create new
+                grade.metadata = {**(grade.metadata or {}), 'competency': entry['competency']}
+
+            if previous_value != grade.value:
+                audits.append((grade, previous_value, 'update' if previous_value is not None else 'create'))
+            saved.append(grade)
+
+        if new_grades:
+            # The upsert still covers a row inserted after the read but before this statement
+            Grade.objects.bulk_create(
+                new_grades,
+                update_conflicts=True,
+                unique_fields=['student', 'subject', 'date'],
+                update_fields=GRADE_UPDATE_FIELDS,
+            )
+        if existing_grades:
+            Grade.objects.bulk_update(existing_grades, GRADE_UPDATE_FIELDS)
+
+        GradeAudit.objects.bulk_create([
+            GradeAudit(grade=grade, changed_by=teacher, previous_value=previous_value,
+                       new_value=grade.value, action=action)
+            for grade, previous_value, action in audits
+        ])
+
+        # What the Grade post_save signals do for new grades
+        for grade in new_grades:
+            notifications.extend(new_grade_notifications(grade, parents.get(grade.student_id, [])))
+            point_transaction = grade_point_transaction(grade)
+            if point_transaction:
+                transactions.append(point_transaction)
+        PointTransaction.objects.bulk_create(transactions)
+
+        # Low grades (3 and below) are also reported to the first parent
+        for grade in saved:
+            parent_ids = parents.get(grade.student_id)
+            if grade.value <= LOW_GRADE_THRESHOLD and parent_ids:
+                message = f"{grade.student.first_name} {subject.name} fanidan {grade.value} baho oldi"
+                if grade.comment:
+                    message += f". O'qituvchi izohi: {grade.comment}"
+                notifications.append((parent_ids[0], message))
+
+        send_notifications(notifications)
+
+        apply_grade_changes(
+            added=[grade_fact(grade, grade.student.student_class_id) for grade in saved],
+            removed=replaced,
+        )
+        invalidate_student_context(student_ids)
+
+    return saved
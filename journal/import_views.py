@@ -1,9 +1,10 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import HttpResponse
-from accounts.models import User
 from core.models import Class
+from .models import StudentImport
+from .student_import import open_roster, dry_run, resume_import, write_error_report
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, PatternFill, Alignment
 from datetime import datetime
@@ -74,86 +75,82 @@ def download_students_template(request):
 
 @login_required
 def import_students(request):
-    """Import students from Excel file"""
+    """
+    Import students from Excel file.
+    mode=dry_run only validates the sheet and shows what would be created;
+    mode=commit queues it as a StudentImport; the worker commits it chunk by chunk.
+    """
     if request.user.role != 'director':
         messages.error(request, "Ruxsat yo'q!")
         return redirect('home')
     
+    classes = Class.objects.all()
+    imports = StudentImport.objects.filter(uploaded_by=request.user)[:5]
+    
     if request.method == 'POST' and request.FILES.get('excel_file'):
         excel_file = request.FILES['excel_file']
         
-        try:
-            wb = load_workbook(excel_file)
-            ws = wb.active
-            
-            success_count = 0
-            error_count = 0
-            errors = []
-            
-            # Start from row 5 (after headers and example)
-            for row_num, row in enumerate(ws.iter_rows(min_row=5, values_only=True), start=5):
-                # Skip empty rows
-                if not any(row):
-                    continue
-                
+        if request.POST.get('mode') == 'dry_run':
+            try:
+                wb = open_roster(excel_file)
                 try:
-                    first_name = row[0]
-                    last_name = row[1]
-                    username = row[2]
-                    email = row[3] or ''
-                    password = row[4]
-                    class_id = row[5]
-                    
-                    # Validate required fields
-                    if not all([first_name, last_name, username, password, class_id]):
-                        errors.append(f"Qator {row_num}: Majburiy maydonlar to'ldirilmagan")
-                        error_count += 1
-                        continue
-                    
-                    # Check if username already exists
-                    if User.objects.filter(username=username).exists():
-                        errors.append(f"Qator {row_num}: '{username}' allaqachon mavjud")
-                        error_count += 1
-                        continue
-                    
-                    # Get class
-                    try:
-                        student_class = Class.objects.get(id=int(class_id))
-                    except (Class.DoesNotExist, ValueError):
-                        errors.append(f"Qator {row_num}: Sinf ID {class_id} topilmadi")
-                        error_count += 1
-                        continue
-                    
-                    # Create student
-                    user = User.objects.create_user(
-                        username=username,
-                        password=password,
-                        first_name=first_name,
-                        last_name=last_name,
-                        email=email,
-                        role='student',
-                        student_class=student_class
-                    )
-                    success_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Qator {row_num}: Xatolik - {str(e)}")
-                    error_count += 1
+                    result = dry_run(wb.active)
+                finally:
+                    wb.close()
+            except Exception as e:
+                messages.error(request, f"Fayl o'qishda xatolik: {str(e)}")
+                return redirect('import_students')
             
-            # Show results
-            if success_count > 0:
-                messages.success(request, f"{success_count} ta o'quvchi muvaffaqiyatli yuklandi!")
-            if error_count > 0:
-                messages.warning(request, f"{error_count} ta xatolik. Quyida batafsil:")
-                for error in errors[:10]:  # Show first 10 errors
-                    messages.error(request, error)
-            
-            return redirect('import_students')
-            
-        except Exception as e:
-            messages.error(request, f"Fayl o'qishda xatolik: {str(e)}")
-            return redirect('import_students')
+            return render(request, 'core/import_students.html', {
+                'classes': classes,
+                'imports': imports,
+                'dry_run': result,
+                'dry_run_file': excel_file.name,
+            })
+        
+        StudentImport.objects.create(
+            uploaded_by=request.user,
+            file=excel_file,
+            original_name=excel_file.name,
+        )
+        messages.success(request, "Import navbatga qo'yildi. Tugagach bildirishnoma yuboriladi.")
+        return redirect('import_students')
     
     # GET request - show form
-    classes = Class.objects.all()
-    return render(request, 'core/import_students.html', {'classes': classes})
+    return render(request, 'core/import_students.html', {'classes': classes, 'imports': imports})
+
+
+@login_required
+def resume_student_import(request, import_id):
+    """Queue a failed or stalled import again; it goes on from its last committed chunk"""
+    if request.user.role != 'director':
+        messages.error(request, "Ruxsat yo'q!")
+        return redirect('home')
+    
+    student_import = get_object_or_404(StudentImport, id=import_id, uploaded_by=request.user)
+    if request.method == 'POST':
+        if resume_import(student_import):
+            messages.success(request, f"Import {student_import.last_row}-qatordan davom ettirish uchun navbatga qo'yildi.")
+        elif student_import.status in ('failed', 'running') and not student_import.file:
+            messages.error(request, "Import fayli o'chirilgan. Faylni qaytadan yuklang.")
+        else:
+            messages.error(request, "Bu importni davom ettirib bo'lmaydi.")
+    return redirect('import_students')
+
+
+@login_required
+def download_import_errors(request, import_id):
+    """Per-row error report of a student import"""
+    if request.user.role != 'director':
+        messages.error(request, "Ruxsat yo'q!")
+        return redirect('home')
+    
+    student_import = get_object_or_404(StudentImport, id=import_id, uploaded_by=request.user)
+    
+    response = HttpResponse(
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    filename = f"import_xatoliklari_{student_import.created_at.strftime('%Y%m%d_%H%M')}.xlsx"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    write_error_report(student_import.errors, response)
+    return response
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from journal.student_import import purge_expired_imports
+
+
+class Command(BaseCommand):
+    help = "Delete uploaded rosters of student imports that can no longer be resumed (run_export_worker also does this hourly)"
+
+    def handle(self, *args, **options):
+        purged = purge_expired_imports()
+        self.stdout.write(self.style.SUCCESS(
+            f"{purged} ta import fayli o'chirildi ({settings.STUDENT_IMPORT_RESUME_HOURS} soatdan eski)"
+        ))
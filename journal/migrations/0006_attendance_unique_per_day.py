@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-18 02:42
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicate_attendance(apps, schema_editor):
+    """Keep only the latest mark for each student and day before adding the constraint"""
+    Attendance = apps.get_model('journal', 'Attendance')
+    duplicates = (
+        Attendance.objects.values('student_id', 'date')
+        .annotate(n=Count('id'), keep=Max('id'))
+        .filter(n__gt=1)
+    )
+    for row in duplicates:
+        Attendance.objects.filter(student_id=row['student_id'], date=row['date']).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0005_studentimport'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('student', 'date'), name='unique_attendance_per_day'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-18 04:02
+
+import core.storage
+from django.db import migrations, models
+
+
+def move_import_files(apps, schema_editor):
+    StudentImport = apps.get_model('journal', 'StudentImport')
+    for student_import in StudentImport.objects.exclude(file='').exclude(file__isnull=True):
+        student_import.file = core.storage.move_from_public_storage(student_import.file.name, 'imports')
+        student_import.save(update_fields=['file'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0007_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentimport',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=core.storage.get_private_storage, upload_to=core.storage.import_file_path),
+        ),
+        migrations.RunPython(move_import_files, migrations.RunPython.noop),
+    ]
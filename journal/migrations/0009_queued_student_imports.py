@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0008_private_import_files'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentimport',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Navbatda'), ('running', 'Yuklanmoqda'), ('done', 'Tayyor'), ('failed', 'Xatolik')], default='pending', max_length=10),
+        ),
+    ]
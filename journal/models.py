@@ -1,7 +1,11 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
 from django.utils import timezone
 from core.models import Subject
+from core.storage import get_private_storage, import_file_path
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
@@ -16,6 +20,16 @@ class Attendance(models.Model):
     date = models.DateField(default=timezone.now)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
     
+    class Meta:
+        # One mark per student per day; lets roll-call upsert a whole class at once
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'date'], name='unique_attendance_per_day'),
+        ]
+        # The unique constraint already indexes (student, date); dashboards count a day by status
+        indexes = [
+            models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.student} - {self.date} - {self.status}"
 
@@ -32,6 +46,12 @@ class Grade(models.Model):
     
     class Meta:
         unique_together = ['student', 'subject', 'date']
+        # The unique index leads with student; these serve the date-ordered and date-ranged reads
+        indexes = [
+            models.Index(fields=['student', 'date'], name='grade_student_date_idx'),
+            models.Index(fields=['subject', 'date'], name='grade_subject_date_idx'),
+            models.Index(fields=['date'], name='grade_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.username} - {self.subject.name} - {self.value}"
@@ -46,3 +66,54 @@ class GradeAudit(models.Model):
 
     def __str__(self):
         return f"{self.grade} - {self.action} by {self.changed_by} at {self.timestamp}"
+
+
+class StudentImport(models.Model):
+    """
+    One uploaded student roster, committed by `manage.py run_export_worker`.
+    Rows are committed in chunks and `last_row` records the last sheet row
+    that made it in, so a failed import, or one whose worker died, can be
+    resumed without redoing finished chunks. The file holds plain passwords:
+    it lives in private storage and is deleted once the import is done or
+    its resume window has passed.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Navbatda'),
+        ('running', 'Yuklanmoqda'),
+        ('done', 'Tayyor'),
+        ('failed', 'Xatolik'),
+    )
+
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='student_imports')
+    file = models.FileField(upload_to=import_file_path, storage=get_private_storage, blank=True, null=True)
+    original_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    last_row = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)  # [row, username, message] per rejected row
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.original_name} ({self.get_status_display()}) - {self.uploaded_by}"
+
+    # A running import saves a checkpoint every chunk; one silent for this long lost its worker
+    STALE_AFTER = timedelta(minutes=30)
+
+    @classmethod
+    def resumable_q(cls, now=None):
+        """Failed imports and running ones whose worker died"""
+        stale = (now or timezone.now()) - cls.STALE_AFTER
+        return Q(status='failed') | Q(status='running', updated_at__lt=stale)
+
+    @property
+    def is_resumable(self):
+        if not self.file:
+            return False
+        return self.status == 'failed' or (
+            self.status == 'running' and self.updated_at < timezone.now() - self.STALE_AFTER
+        )
@@ -1,7 +1,30 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import Grade
-from core.models import Notification
+from core.notifications import parent_ids_by_student, send_notifications
+
+
+def new_grade_notifications(grade, parent_ids):
+    """
+    Yangi baho uchun (user_id, xabar) juftliklari: o'quvchiga va har bir ota-onaga.
+    Used by the signal below and by the bulk gradebook save.
+    """
+    student = grade.student
+
+    # 1. O'quvchiga xabar
+    student_msg = f"Sizga {grade.subject.name} fanidan yangi baho qo'yildi: {grade.value}."
+    if grade.comment:
+        student_msg += f" Izoh: {grade.comment}"
+    recipients = [(student.id, student_msg)]
+
+    # 2. Ota-onalarga xabar
+    student_name = student.get_full_name() or student.username
+    parent_msg = f"Farzandingiz {student_name}ga {grade.subject.name} fanidan yangi baho qo'yildi: {grade.value}."
+    if grade.comment:
+        parent_msg += f" Izoh: {grade.comment}"
+    recipients += [(parent_id, parent_msg) for parent_id in parent_ids]
+    return recipients
+
 
 @receiver(post_save, sender=Grade)
 def create_grade_notification(sender, instance, created, **kwargs):
@@ -9,27 +32,5 @@ def create_grade_notification(sender, instance, created, **kwargs):
     Yangi baho qo'yilganda o'quvchi va uning ota-onasiga bildirishnoma yuborish.
     """
     if created:
-        # 1. O'quvchiga xabar
-        student_msg = f"Sizga {instance.subject.name} fanidan yangi baho qo'yildi: {instance.value}."
-        if instance.comment:
-            student_msg += f" Izoh: {instance.comment}"
-        
-        Notification.objects.create(
-            user=instance.student,
-            message=student_msg
-        )
-        
-        # 2. Ota-onalarga xabar
-        # accounts.User modelida children M2M maydoni related_name='parents' deb belgilangan
-        if hasattr(instance.student, 'parents'):
-            parents = instance.student.parents.all()
-            for parent in parents:
-                student_name = instance.student.get_full_name() or instance.student.username
-                parent_msg = f"Farzandingiz {student_name}ga {instance.subject.name} fanidan yangi baho qo'yildi: {instance.value}."
-                if instance.comment:
-                    parent_msg += f" Izoh: {instance.comment}"
-                
-                Notification.objects.create(
-                    user=parent,
-                    message=parent_msg
-                )
+        parent_ids = parent_ids_by_student([instance.student_id]).get(instance.student_id, [])
+        send_notifications(new_grade_notifications(instance, parent_ids))
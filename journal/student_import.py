@@ -0,0 +1,323 @@
+"""
+Student import engine
+Uploads are queued as StudentImport rows and committed by
+`manage.py run_export_worker`, never inside a web request.
+Rosters are streamed from a read-only workbook in chunks. Each chunk is
+validated with one query for existing usernames and one for class IDs,
+its passwords are hashed in a process pool and the students are inserted
+with bulk_create together with a checkpoint (see StudentImport).
+"""
+import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+
+from accounts.models import User
+from core.models import Class, Notification
+
+from .models import StudentImport
+
+# Data starts after the title, note and header rows of the template
+FIRST_DATA_ROW = 5
+COLUMNS = ['first_name', 'last_name', 'username', 'email', 'password', 'class_id']
+
+# Rows validated, hashed and committed per checkpoint
+CHUNK_SIZE = 500
+
+# Accepted rows listed on the dry-run page
+DRY_RUN_PREVIEW_ROWS = 50
+
+# Rows per INSERT statement
+BULK_BATCH_SIZE = 500
+
+# Below this many passwords the pool start-up costs more than it saves
+POOL_MIN_PASSWORDS = 50
+
+
+# ========== READING & VALIDATION ==========
+
+def _clean(value):
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def open_roster(fileobj):
+    """Open an uploaded roster in read-only mode so rows are streamed, not loaded"""
+    return load_workbook(fileobj, read_only=True, data_only=True)
+
+
+def read_student_rows(ws, after_row=0):
+    """Yield (row_num, row dict) for every non-empty data row below `after_row`"""
+    first_row = max(FIRST_DATA_ROW, after_row + 1)
+    for row_num, row in enumerate(ws.iter_rows(min_row=first_row, values_only=True), start=first_row):
+        if not any(row):
+            continue
+        values = list(row[:len(COLUMNS)]) + [None] * (len(COLUMNS) - len(row))
+        yield row_num, dict(zip(COLUMNS, values))
+
+
+def iter_chunks(rows, size=None):
+    size = size or CHUNK_SIZE
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_class_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_student_rows(rows, seen=None):
+    """
+    Check rows before anything is written.
+    Returns (valid, errors): valid is a list of (row_num, cleaned dict),
+    errors a list of (row_num, username, message). `seen` maps usernames
+    accepted in earlier chunks to their row and is updated in place.
+    """
+    rows = list(rows)
+    seen = {} if seen is None else seen
+    usernames = {_clean(row['username']) for _, row in rows if row['username']}
+    class_ids = {_parse_class_id(row['class_id']) for _, row in rows} - {None}
+
+    taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    existing_classes = set(Class.objects.filter(id__in=class_ids).values_list('id', flat=True))
+
+    valid, errors = [], []
+    for row_num, row in rows:
+        data = {key: _clean(row[key]) for key in COLUMNS}
+        username = data['username']
+
+        if not all([data['first_name'], data['last_name'], username, data['password'], data['class_id']]):
+            errors.append((row_num, username, "Majburiy maydonlar to'ldirilmagan"))
+            continue
+        if username in taken:
+            errors.append((row_num, username, f"'{username}' allaqachon mavjud"))
+            continue
+        if username in seen:
+            errors.append((row_num, username, f"'{username}' faylda takrorlangan (qator {seen[username]})"))
+            continue
+
+        class_id = _parse_class_id(row['class_id'])
+        if class_id not in existing_classes:
+            errors.append((row_num, username, f"Sinf ID {data['class_id']} topilmadi"))
+            continue
+
+        seen[username] = row_num
+        data['class_id'] = class_id
+        valid.append((row_num, data))
+
+    return valid, errors
+
+
+def dry_run(ws):
+    """
+    Validate a whole sheet chunk by chunk without writing anything.
+    Returns the numbers of accepted and rejected rows, a preview of the
+    first accepted rows and the list of errors.
+    """
+    class_names = dict(Class.objects.values_list('id', 'name'))
+    seen = {}
+    result = {'valid_count': 0, 'preview': [], 'errors': []}
+    for chunk in iter_chunks(read_student_rows(ws)):
+        valid, errors = validate_student_rows(chunk, seen)
+        result['valid_count'] += len(valid)
+        result['errors'].extend(errors)
+        for row_num, data in valid[:DRY_RUN_PREVIEW_ROWS - len(result['preview'])]:
+            result['preview'].append({
+                'row': row_num,
+                'username': data['username'],
+                'name': f"{data['first_name']} {data['last_name']}",
+                'class_name': class_names.get(data['class_id'], ''),
+            })
+    return result
+
+
+# ========== HASHING & INSERT ==========
+
+def _init_hash_worker():
+    # Spawned workers (macOS/Windows) start without Django configured
+    import django
+    django.setup()
+
+
+def hashing_pool():
+    """Process pool for password hashing; workers start lazily on first use"""
+    return ProcessPoolExecutor(max_workers=os.cpu_count() or 1, initializer=_init_hash_worker)
+
+
+def hash_passwords(passwords, pool=None, min_pool_size=POOL_MIN_PASSWORDS):
+    """
+    Hash passwords with the default hasher.
+    PBKDF2 is CPU bound, so large batches are spread over `pool`.
+    """
+    passwords = list(passwords)
+    if pool is None or len(passwords) < min_pool_size:
+        return [make_password(p) for p in passwords]
+
+    chunksize = max(1, len(passwords) // ((os.cpu_count() or 1) * 4))
+    try:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+    except (OSError, BrokenProcessPool):
+        # No process support on this host, hash in-process
+        return [make_password(p) for p in passwords]
+
+
+def build_students(valid, pool=None):
+    """Unsaved User objects for validated rows, passwords already hashed"""
+    hashes = hash_passwords((data['password'] for _, data in valid), pool)
+    return [
+        User(
+            username=User.normalize_username(data['username']),
+            password=password_hash,
+            first_name=data['first_name'],
+            last_name=data['last_name'],
+            email=User.objects.normalize_email(data['email']),
+            role='student',
+            student_class_id=data['class_id'],
+        )
+        for (_, data), password_hash in zip(valid, hashes)
+    ]
+
+
+# ========== QUEUE ==========
+
+def claim_next_import():
+    """Atomically move the oldest pending import to 'running' (see core.export_jobs.claim_next_job)"""
+    while True:
+        import_id = StudentImport.objects.filter(status='pending').order_by('created_at').values_list(
+            'id', flat=True).first()
+        if import_id is None:
+            return None
+        with transaction.atomic():
+            claimed = StudentImport.objects.filter(id=import_id, status='pending').update(
+                status='running', updated_at=timezone.now()
+            )
+        if claimed:
+            return StudentImport.objects.select_related('uploaded_by').get(id=import_id)
+
+
+def requeue_stale_imports():
+    """Put back imports left 'running' by a worker that died mid-roster; they go on from their checkpoint"""
+    return StudentImport.objects.filter(
+        status='running', updated_at__lt=timezone.now() - StudentImport.STALE_AFTER
+    ).exclude(file='').exclude(file__isnull=True).update(status='pending')
+
+
+def resume_import(student_import):
+    """Queue a failed or stale import again; False if it is no longer resumable"""
+    if not student_import.is_resumable:
+        return False
+    return bool(StudentImport.objects.filter(StudentImport.resumable_q(), pk=student_import.pk).update(
+        status='pending', error=''
+    ))
+
+
+def run_import(student_import):
+    """
+    Commit a StudentImport from its checkpoint onwards and notify the uploader.
+    Each chunk is hashed outside the transaction, then inserted together
+    with the new checkpoint, so a failure only loses the current chunk.
+    The uploaded file (it holds plain passwords) is deleted once done; a
+    failed import keeps it until purge_expired_imports runs.
+    """
+    student_import.status = 'running'
+    student_import.error = ''
+    student_import.save(update_fields=['status', 'error', 'updated_at'])
+
+    try:
+        with student_import.file.open('rb') as fileobj, hashing_pool() as pool:
+            wb = open_roster(fileobj)
+            try:
+                for chunk in iter_chunks(read_student_rows(wb.active, after_row=student_import.last_row)):
+                    valid, errors = validate_student_rows(chunk)
+                    students = build_students(valid, pool)
+                    with transaction.atomic():
+                        User.objects.bulk_create(students, batch_size=BULK_BATCH_SIZE)
+                        student_import.last_row = chunk[-1][0]
+                        student_import.created_count += len(students)
+                        student_import.errors += [list(error) for error in errors]
+                        student_import.save(update_fields=['last_row', 'created_count', 'errors', 'updated_at'])
+            finally:
+                wb.close()
+    except Exception as e:
+        student_import.status = 'failed'
+        student_import.error = str(e)
+        student_import.save(update_fields=['status', 'error', 'updated_at'])
+        Notification.objects.create(
+            user=student_import.uploaded_by,
+            message=f"O'quvchilar importi {student_import.last_row}-qatordan keyin to'xtadi: {e}. "
+                    f"Import sahifasida davom ettiring.",
+        )
+        return student_import
+
+    student_import.file.delete(save=False)
+    student_import.status = 'done'
+    student_import.save(update_fields=['status', 'file', 'updated_at'])
+    Notification.objects.create(
+        user=student_import.uploaded_by,
+        message=f"O'quvchilar importi tugadi: {student_import.created_count} ta yuklandi, "
+                f"{len(student_import.errors)} ta xatolik.",
+    )
+    return student_import
+
+
+def purge_expired_imports(now=None):
+    """
+    Delete the rosters of resumable imports (failed, or running with a dead
+    worker) last touched more than STUDENT_IMPORT_RESUME_HOURS ago.
+    Returns the number of files deleted.
+    """
+    now = now or timezone.now()
+    cutoff = now - datetime.timedelta(hours=settings.STUDENT_IMPORT_RESUME_HOURS)
+    expired = StudentImport.objects.filter(StudentImport.resumable_q(now), updated_at__lt=cutoff).exclude(file='')
+    purged = 0
+    for student_import in expired.exclude(file__isnull=True):
+        student_import.file.delete(save=False)
+        student_import.status = 'failed'
+        student_import.error = "Davom ettirish muddati o'tdi, fayl o'chirildi"
+        student_import.save(update_fields=['status', 'file', 'error', 'updated_at'])
+        purged += 1
+    return purged
+
+
+# ========== ERROR REPORT ==========
+
+def write_error_report(errors, fileobj):
+    """Write the per-row errors of an import to an xlsx file"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title="Xatoliklar")
+    ws.column_dimensions['A'].width = 10
+    ws.column_dimensions['B'].width = 20
+    ws.column_dimensions['C'].width = 60
+
+    header_fill = PatternFill(start_color="C00000", end_color="C00000", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    header = []
+    for value in ['Qator', 'Username', 'Xatolik']:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.fill = header_fill
+        cell.font = header_font
+        header.append(cell)
+    ws.append(header)
+
+    for row_num, username, message in errors:
+        ws.append([row_num, username, message])
+
+    wb.save(fileobj)
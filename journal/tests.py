@@ -2,9 +2,19 @@ from django.test import TestCase, Client
 from django.urls import reverse
 from accounts.models import User
 from core.models import School, Class, Subject, Schedule
-from journal.models import Grade, GradeAudit
+from journal.models import Grade, GradeAudit, StudentImport, Attendance
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.utils import timezone
+from unittest import mock
 import datetime
+import os
+import shutil
+import tempfile
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+TEST_PRIVATE_MEDIA_ROOT = tempfile.mkdtemp()
 
 class GradeConstraintTest(TestCase):
     def setUp(self):
@@ -87,3 +97,336 @@ class GradeConstraintTest(TestCase):
         self.assertEqual(audit.previous_value, 4)
         self.assertEqual(audit.new_value, 5)
         self.assertEqual(audit.changed_by, self.teacher)
+
+
+class BulkGradeSaveTests(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name="Test School", address="Address")
+        self.class_obj = Class.objects.create(name="9-A", school=self.school)
+        self.subject = Subject.objects.create(name="Math")
+        self.teacher = User.objects.create_user(username='teacher', password='password123', role='teacher')
+        Schedule.objects.create(class_obj=self.class_obj, subject=self.subject, teacher=self.teacher, room="101",
+                                day_of_week="monday", start_time="09:00", end_time="10:00")
+        self.date = datetime.date(2026, 3, 2)
+        self.client.login(username='teacher', password='password123')
+
+    def _add_students(self, count):
+        for i in range(count):
+            student = User.objects.create_user(username=f'st{User.objects.filter(role="student").count()}', password='x', role='student',
+                                               student_class=self.class_obj, first_name='Ism')
+            parent = User.objects.create_user(username=f'parent_{student.username}', password='x', role='parent')
+            parent.children.add(student)
+
+    def _save(self, value=5):
+        data = {'bulk_save': 'true', 'date': self.date.isoformat()}
+        for student in User.objects.filter(role='student'):
+            data[f'grade_{student.id}'] = value
+            data[f'competency_{student.id}'] = 'algebra'
+        url = reverse('gradebook') + f'?class_id={self.class_obj.id}&subject_id={self.subject.id}'
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(url, data)
+        return len(ctx)
+
+    def test_bulk_save_emits_audits_points_and_notifications(self):
+        from core.models import Notification
+        from gamification.models import PointTransaction, PointBalance
+
+        self._add_students(2)
+        Grade.objects.create(student=User.objects.get(username='st1'), subject=self.subject, value=2, date=self.date)
+        Notification.objects.all().delete()
+
+        self._save(value=5)
+
+        self.assertEqual(Grade.objects.filter(value=5, date=self.date).count(), 2)
+        self.assertEqual(Grade.objects.get(student__username='st0').metadata, {'competency': 'algebra'})
+        self.assertEqual(sorted(GradeAudit.objects.values_list('action', 'previous_value')), [('create', None), ('update', 2)])
+        # Only the new grade earns points and "new grade" notifications, as with the post_save signals
+        self.assertEqual(PointTransaction.objects.count(), 1)
+        self.assertEqual(PointBalance.objects.get(user__username='st0').balance, 10)
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_grade_saved_concurrently_is_updated_not_created(self):
+        from analytics.models import StudentGradeTotal
+        from gamification.models import PointTransaction
+        from journal import grade_service
+
+        self._add_students(1)
+        student = User.objects.get(username='st0')
+        real_parent_ids = grade_service.parent_ids_by_student
+
+        def racing_parent_ids(student_ids):
+            # Another teacher's save lands after this one started
+            Grade.objects.create(student=student, subject=self.subject, teacher=self.teacher, value=4, date=self.date)
+            return real_parent_ids(student_ids)
+
+        with mock.patch.object(grade_service, 'parent_ids_by_student', racing_parent_ids):
+            grade_service.save_grades(self.teacher, self.subject, self.date,
+                                      [{'student': student, 'value': 5, 'comment': ''}])
+
+        self.assertEqual(Grade.objects.get(student=student).value, 5)
+        self.assertEqual(PointTransaction.objects.filter(user=student).count(), 1)
+        self.assertFalse(GradeAudit.objects.filter(grade__student=student, action='create').exists())
+        self.assertTrue(GradeAudit.objects.filter(grade__student=student, action='update', previous_value=4).exists())
+        total = StudentGradeTotal.objects.get(student=student)
+        self.assertEqual((total.value_sum, total.grade_count), (5, 1))
+
+    def test_bulk_save_query_count_is_constant(self):
+        self._add_students(2)
+        # The first write ever also creates the shared data-version rows
+        self._save()
+        Grade.objects.all().delete()
+        small = self._save()
+        self._add_students(20)
+        Grade.objects.all().delete()
+        self.assertEqual(self._save(), small)
+
+
+class AttendanceBatchTests(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name="Test School", address="Address")
+        self.class_obj = Class.objects.create(name="9-A", school=self.school)
+        self.teacher = User.objects.create_user(username='teacher', password='password123', role='teacher')
+        self.absent = User.objects.create_user(username='absent', password='x', role='student',
+                                               student_class=self.class_obj, first_name='Ali')
+        self.present = User.objects.create_user(username='present', password='x', role='student',
+                                                student_class=self.class_obj)
+        for name in ['mom', 'dad']:
+            User.objects.create_user(username=name, password='x', role='parent').children.add(self.absent)
+        self.date = datetime.date(2026, 3, 2)
+        Attendance.objects.create(student=self.absent, date=self.date, status='present')
+        self.client.login(username='teacher', password='password123')
+
+    def test_roll_call_upserts_and_alerts_every_parent(self):
+        from core.models import Notification
+
+        url = reverse('attendance') + f'?class_id={self.class_obj.id}'
+        self.client.post(url, {
+            'bulk_save': 'true',
+            'date': self.date.isoformat(),
+            f'attendance_{self.absent.id}': 'absent',
+            f'attendance_{self.present.id}': 'present',
+        })
+
+        self.assertEqual(Attendance.objects.filter(date=self.date).count(), 2)
+        self.assertEqual(Attendance.objects.get(student=self.absent).status, 'absent')
+        self.assertEqual(
+            sorted(Notification.objects.values_list('user__username', flat=True)),
+            ['dad', 'mom']
+        )
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name="Test School", address="Address")
+        self.class_obj = Class.objects.create(name="9-A", school=self.school)
+        self.subject = Subject.objects.create(name="Math")
+        self.director = User.objects.create_user(username='director', password='password123', role='director')
+        for i in range(3):
+            student = User.objects.create_user(username=f'st{i}', password='x', role='student', student_class=self.class_obj,
+                                               first_name=f'Ism{i}', last_name=f'Familiya{i}')
+            Grade.objects.create(student=student, subject=self.subject, value=3 + i, date=datetime.date(2026, 3, 2))
+        self.client.login(username='director', password='password123')
+
+    def test_grades_export_xlsx(self):
+        from openpyxl import load_workbook
+        from io import BytesIO
+
+        response = self.client.get(reverse('export_grades'), {'class_id': self.class_obj.id, 'subject_id': self.subject.id})
+        self.assertEqual(response.status_code, 200)
+        ws = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(ws.iter_rows(min_row=4, values_only=True))
+        self.assertEqual(rows[0], ('#', "O'quvchi", 'Baho', 'Sana'))
+        self.assertEqual(rows[1], (1, 'Ism0 Familiya0', 3, '02.03.2026'))
+        self.assertEqual(len(rows), 4)
+
+    def test_large_export_falls_back_to_csv(self):
+        with self.settings(EXPORT_CSV_ROW_THRESHOLD=2):
+            response = self.client.get(reverse('export_all_users'))
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[0], '#,ID,Ism,Familiya,Username,Rol,E-mail')
+        self.assertEqual(len(lines), 5)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, PRIVATE_MEDIA_ROOT=TEST_PRIVATE_MEDIA_ROOT)
+class StudentImportTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEST_PRIVATE_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.school = School.objects.create(name="Test School", address="Address")
+        self.class_obj = Class.objects.create(name="9-A", school=self.school)
+        self.director = User.objects.create_user(username='director', password='password123', role='director')
+        User.objects.create_user(username='taken', password='x', role='student')
+        self.client.login(username='director', password='password123')
+
+    def _upload(self, rows, mode='commit'):
+        from openpyxl import Workbook
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from io import BytesIO
+
+        wb = Workbook()
+        ws = wb.active
+        for row_num, row in enumerate(rows, start=5):
+            for col, value in enumerate(row, 1):
+                ws.cell(row=row_num, column=col, value=value)
+        buffer = BytesIO()
+        wb.save(buffer)
+        upload = SimpleUploadedFile('students.xlsx', buffer.getvalue())
+        response = self.client.post(reverse('import_students'), {'excel_file': upload, 'mode': mode})
+        if mode == 'commit':
+            # Nothing is committed inside the request
+            self.assertEqual(StudentImport.objects.order_by('-id').first().status, 'pending')
+            self.work()
+        return response
+
+    def work(self):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('run_export_worker', '--once', stdout=StringIO())
+
+    def test_valid_rows_are_imported_and_errors_reported(self):
+        from openpyxl import load_workbook
+        from io import BytesIO
+
+        response = self._upload([
+            ['Ali', 'Valiyev', 'ali', 'ali@example.com', 'parol123', self.class_obj.id],
+            ['Vali', 'Aliyev', 'vali', '', 'parol123', str(self.class_obj.id)],
+            ['Bor', 'Edi', 'taken', '', 'parol123', self.class_obj.id],
+            ['Yana', 'Ali', 'ali', '', 'parol123', self.class_obj.id],
+            ['Sinfsiz', 'Bola', 'nocls', '', 'parol123', 999],
+            ['Parolsiz', 'Bola', 'nopass', '', None, self.class_obj.id],
+        ])
+        self.assertRedirects(response, reverse('import_students'))
+
+        ali = User.objects.get(username='ali')
+        self.assertEqual(ali.student_class, self.class_obj)
+        self.assertEqual(ali.role, 'student')
+        self.assertTrue(ali.check_password('parol123'))
+        self.assertTrue(User.objects.filter(username='vali').exists())
+        self.assertFalse(User.objects.filter(username__in=['nocls', 'nopass']).exists())
+
+        student_import = StudentImport.objects.get()
+        self.assertEqual(student_import.status, 'done')
+        self.assertFalse(student_import.file)
+        report = self.client.get(reverse('download_import_errors', args=[student_import.id]))
+        ws = load_workbook(BytesIO(report.content)).active
+        rows = list(ws.iter_rows(min_row=2, values_only=True))
+        self.assertEqual([row[0] for row in rows], [7, 8, 9, 10])
+        self.assertIn("takrorlangan", rows[1][2])
+
+    def test_validation_uses_constant_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from journal.student_import import validate_student_rows
+
+        def rows(n):
+            return [(i, {'first_name': 'A', 'last_name': 'B', 'username': f'u{i}', 'email': '',
+                         'password': 'p', 'class_id': self.class_obj.id}) for i in range(n)]
+
+        with CaptureQueriesContext(connection) as ctx:
+            valid, errors = validate_student_rows(rows(200))
+        self.assertEqual(len(ctx), 2)
+        self.assertEqual((len(valid), len(errors)), (200, 0))
+
+    def test_process_pool_hashing(self):
+        from django.contrib.auth.hashers import check_password
+        from journal.student_import import hash_passwords, hashing_pool
+
+        with hashing_pool() as pool:
+            hashes = hash_passwords(['a', 'b', 'c'], pool, min_pool_size=0)
+        self.assertTrue(all(check_password(p, h) for p, h in zip('abc', hashes)))
+
+    def test_dry_run_writes_nothing(self):
+        response = self._upload([
+            ['Ali', 'Valiyev', 'ali', '', 'parol123', self.class_obj.id],
+            ['Bor', 'Edi', 'taken', '', 'parol123', self.class_obj.id],
+        ], mode='dry_run')
+        self.assertEqual(response.status_code, 200)
+        result = response.context['dry_run']
+        self.assertEqual(result['valid_count'], 1)
+        self.assertEqual(result['preview'][0]['class_name'], '9-A')
+        self.assertEqual([error[0] for error in result['errors']], [6])
+        self.assertFalse(User.objects.filter(username='ali').exists())
+        self.assertFalse(StudentImport.objects.exists())
+
+    def test_failed_import_resumes_from_checkpoint(self):
+        from journal import student_import as engine
+
+        rows = [[f'Ism{i}', 'Familiya', f'user{i}', '', 'p', self.class_obj.id] for i in range(5)]
+        real_build = engine.build_students
+        calls = []
+
+        def flaky_build(valid, pool=None):
+            calls.append([row_num for row_num, _ in valid])
+            if len(calls) == 2:
+                raise RuntimeError("disk full")
+            return real_build(valid, pool)
+
+        with mock.patch.object(engine, 'CHUNK_SIZE', 2), mock.patch.object(engine, 'build_students', flaky_build):
+            self._upload(rows)
+            student_import = StudentImport.objects.get()
+            self.assertEqual(student_import.status, 'failed')
+            self.assertEqual((student_import.last_row, student_import.created_count), (6, 2))
+            # The roster waits for a resume outside MEDIA_ROOT, under a random name
+            self.assertTrue(student_import.file.path.startswith(TEST_PRIVATE_MEDIA_ROOT))
+            self.assertNotIn('students', student_import.file.name)
+
+            self.client.post(reverse('resume_student_import', args=[student_import.id]))
+            self.work()
+
+        student_import.refresh_from_db()
+        self.assertEqual(student_import.status, 'done')
+        self.assertEqual(student_import.created_count, 5)
+        self.assertEqual(User.objects.filter(username__startswith='user').count(), 5)
+        # The committed first chunk was not hashed again
+        self.assertEqual(calls, [[5, 6], [7, 8], [7, 8], [9]])
+
+    def test_expired_failed_import_is_purged(self):
+        from io import StringIO
+        from django.core.files.base import ContentFile
+        from django.core.management import call_command
+
+        student_import = StudentImport.objects.create(uploaded_by=self.director, original_name='students.xlsx',
+                                                      status='failed', file=ContentFile(b'x', name='students.xlsx'))
+        path = student_import.file.path
+        call_command('purge_student_imports', stdout=StringIO())
+        student_import.refresh_from_db()
+        self.assertTrue(student_import.file)
+
+        StudentImport.objects.filter(pk=student_import.pk).update(
+            updated_at=timezone.now() - datetime.timedelta(hours=25))
+        call_command('purge_student_imports', stdout=StringIO())
+        student_import.refresh_from_db()
+        self.assertFalse(student_import.file)
+        self.assertFalse(os.path.exists(path))
+
+        self.client.post(reverse('resume_student_import', args=[student_import.id]))
+        student_import.refresh_from_db()
+        self.assertEqual(student_import.status, 'failed')
+
+    def test_import_left_running_by_a_dead_worker_resumes(self):
+        from django.core.files.base import ContentFile
+        from journal.student_import import purge_expired_imports
+
+        student_import = StudentImport.objects.create(uploaded_by=self.director, original_name='students.xlsx',
+                                                      status='running', last_row=6,
+                                                      file=ContentFile(b'x', name='students.xlsx'))
+        # Still checkpointing: not resumable yet
+        self.client.post(reverse('resume_student_import', args=[student_import.id]))
+        student_import.refresh_from_db()
+        self.assertEqual(student_import.status, 'running')
+        self.assertFalse(student_import.is_resumable)
+
+        StudentImport.objects.filter(pk=student_import.pk).update(
+            updated_at=timezone.now() - StudentImport.STALE_AFTER - datetime.timedelta(minutes=1))
+        student_import.refresh_from_db()
+        self.assertTrue(student_import.is_resumable)
+        # Inside the resume window the roster is kept
+        self.assertEqual(purge_expired_imports(), 0)
+        self.client.post(reverse('resume_student_import', args=[student_import.id]))
+        student_import.refresh_from_db()
+        self.assertEqual((student_import.status, student_import.last_row), ('pending', 6))
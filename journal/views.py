@@ -6,6 +6,8 @@ from accounts.models import User
 from core.models import Class, Subject, Schedule
 from accounts.models import User
 from .models import Grade, Attendance, GradeAudit
+from .grade_service import save_grades
+from .attendance_service import save_attendance, ATTENDANCE_STATUSES
 from django.utils import timezone
 
 @login_required
@@ -55,7 +57,7 @@ def gradebook_view(request):
         if request.POST.get('bulk_save'):
             # Bulk grade submission
             date = request.POST.get('date') or timezone.now().date()
-            saved_count = 0
+            entries = []
             
             for student in students:
                 grade_value = request.POST.get(f'grade_{student.id}')
@@ -72,63 +74,15 @@ def gradebook_view(request):
                         messages.warning(request, f"Student {student.first_name}'s grade '{grade_value}' is not a valid number.")
                         continue
 
-                    previous_value = None
-                    try:
-                        existing_grade = Grade.objects.get(student=student, subject=current_subject, date=date)
-                        previous_value = existing_grade.value
-                    except Grade.DoesNotExist:
-                        pass
-
-                    grade_obj, created = Grade.objects.update_or_create(
-                        student=student,
-                        subject=current_subject,
-                        date=date,
-                        defaults={'value': grade_int, 'comment': comment, 'teacher': request.user}
-                    )
-                    
-                    # Audit Trail
-                    if created:
-                        action = 'create'
-                    elif previous_value != grade_int:
-                        action = 'update'
-                    else:
-                        action = None # No change
-                    
-                    if action:
-                        GradeAudit.objects.create(
-                            grade=grade_obj,
-                            changed_by=request.user,
-                            previous_value=previous_value,
-                            new_value=grade_int,
-                            action=action
-                        )
-                    
-                    # Save competency metadata if selected
-                    competency = request.POST.get(f'competency_{student.id}')
-                    if competency:
-                        # Merge with existing metadata or create new
-                        meta = grade_obj.metadata or {}
-                        meta['competency'] = competency
-                        grade_obj.metadata = meta
-                        grade_obj.save()
-
-                    saved_count += 1
-                    
-                    # Create notification for low grades (3 and below)
-                    if grade_int <= 3:
-                        # Find parent
-                        parent = User.objects.filter(role='parent', children=student).first()
-                        if parent:
-                            from core.models import Notification
-                            message = f"{student.first_name} {current_subject.name} fanidan {grade_int} baho oldi"
-                            if comment:
-                                message += f". O'qituvchi izohi: {comment}"
-                            
-                            Notification.objects.create(
-                                user=parent,
-                                message=message
-                            )
+                    entries.append({
+                        'student': student,
+                        'value': grade_int,
+                        'comment': comment,
+                        'competency': request.POST.get(f'competency_{student.id}'),
+                    })
             
+            # Upsert, audit, points and notifications in a fixed number of queries
+            saved_count = len(save_grades(request.user, current_subject, date, entries))
             messages.success(request, f"{saved_count} ta baho saqlandi!")
             return redirect(request.get_full_path())
         else:
@@ -207,27 +161,15 @@ def attendance_view(request):
         if request.POST.get('bulk_save'):
             # Bulk attendance submission
             date = request.POST.get('date') or timezone.now().date()
-            saved_count = 0
+            marks = []
             
             for student in students:
                 status = request.POST.get(f'attendance_{student.id}')
-                if status:
-                    Attendance.objects.update_or_create(
-                        student=student,
-                        date=date,
-                        defaults={'status': status}
-                    )
-                    saved_count += 1
-                    
-                    # Create notification for absent students
-                    if status == 'absent':
-                        parent = User.objects.filter(role='parent', children=student).first()
-                        if parent:
-                            from core.models import Notification
-                            Notification.objects.create(
-                                user=parent,
-                                message=f"{student.first_name} {date} sanasida darsga kelmadi"
-                            )
+                if status in ATTENDANCE_STATUSES:
+                    marks.append((student, status))
+            
+            # One upsert for the class-day; absence alerts go to every parent
+            saved_count = save_attendance(date, marks)
             
             messages.success(request, f"{saved_count} ta davomat belgilandi!")
             return redirect(request.get_full_path())
@@ -0,0 +1,92 @@
+"""
+Quiz question import
+The sheet is validated column-wise with pandas, then all questions and
+answers are inserted with two bulk_create calls in one transaction.
+"""
+import pandas as pd
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Question, Answer
+
+# Expected columns: Question, Option A, Option B, Option C, Option D, Correct Answer (A/B/C/D)
+QUESTION_COLUMN = 'Question'
+CORRECT_COLUMN = 'Correct Answer'
+OPTION_COLUMNS = {'A': 'Option A', 'B': 'Option B', 'C': 'Option C', 'D': 'Option D'}
+
+ANSWER_MAX_LENGTH = Answer._meta.get_field('text').max_length
+
+
+def _text_column(df, column):
+    """Column as stripped strings, '' for missing cells or a missing column"""
+    if column not in df:
+        return pd.Series('', index=df.index)
+    return df[column].where(df[column].notna(), '').astype(str).str.strip()
+
+
+def validate_question_frame(df):
+    """
+    Validate every row at once.
+    Returns (questions, errors): questions is a DataFrame with the cleaned
+    'text', 'correct' and option columns of the valid rows, errors a list
+    of (row_num, message) using Excel row numbers.
+    """
+    if QUESTION_COLUMN not in df:
+        raise ValueError(f"'{QUESTION_COLUMN}' ustuni topilmadi")
+
+    df = df.dropna(how='all')
+    cleaned = pd.DataFrame({
+        'text': _text_column(df, QUESTION_COLUMN),
+        'correct': _text_column(df, CORRECT_COLUMN).str.upper(),
+    })
+    for key, column in OPTION_COLUMNS.items():
+        cleaned[key] = _text_column(df, column)
+
+    options = cleaned[list(OPTION_COLUMNS)]
+    option_count = (options != '').sum(axis=1)
+    correct_filled = pd.concat(
+        [(cleaned['correct'] == key) & (options[key] != '') for key in OPTION_COLUMNS], axis=1
+    ).any(axis=1)
+    too_long = (options.apply(lambda col: col.str.len()) > ANSWER_MAX_LENGTH).any(axis=1)
+
+    # First failing check wins for each row
+    checks = [
+        (cleaned['text'] == '', "Savol matni bo'sh"),
+        (option_count < 2, "Kamida 2 ta javob varianti kerak"),
+        (~cleaned['correct'].isin(list(OPTION_COLUMNS)), "To'g'ri javob A, B, C yoki D bo'lishi kerak"),
+        (~correct_filled, "To'g'ri javob varianti bo'sh"),
+        (too_long, f"Javob varianti {ANSWER_MAX_LENGTH} belgidan uzun"),
+    ]
+    message = pd.Series('', index=cleaned.index)
+    for failed, text in checks:
+        message = message.mask(failed & (message == ''), text)
+
+    invalid = message != ''
+    # DataFrame index 0 is the row under the header, i.e. Excel row 2
+    errors = [(int(index) + 2, text) for index, text in message[invalid].items()]
+    return cleaned[~invalid], errors
+
+
+def create_questions(quiz, questions):
+    """Insert validated questions after the quiz's current last question"""
+    with transaction.atomic():
+        last_order = quiz.questions.aggregate(last=Max('order'))['last'] or 0
+        created = Question.objects.bulk_create([
+            Question(quiz=quiz, text=text, order=last_order + offset)
+            for offset, text in enumerate(questions['text'], 1)
+        ])
+
+        answers = []
+        for question, correct, *options in zip(created, questions['correct'], *(questions[key] for key in OPTION_COLUMNS)):
+            for key, text in zip(OPTION_COLUMNS, options):
+                if text:
+                    answers.append(Answer(question=question, text=text, is_correct=(key == correct)))
+        Answer.objects.bulk_create(answers)
+    return len(created)
+
+
+def import_questions(quiz, excel_file):
+    """Read, validate and import a question sheet. Returns (created_count, errors)"""
+    questions, errors = validate_question_frame(pd.read_excel(excel_file))
+    created = create_questions(quiz, questions) if len(questions) else 0
+    return created, errors
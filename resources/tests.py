@@ -1,3 +1,55 @@
 from django.test import TestCase
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from io import BytesIO
+import pandas as pd
 
-# Create your tests here.
+from accounts.models import User
+from core.models import Subject
+from .models import Quiz, Question
+from .question_import import import_questions
+
+
+def question_sheet(rows):
+    buffer = BytesIO()
+    pd.DataFrame(rows, columns=['Question', 'Option A', 'Option B', 'Option C', 'Option D', 'Correct Answer']).to_excel(buffer, index=False)
+    buffer.seek(0)
+    return buffer
+
+
+class QuestionImportTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', password='password123', role='teacher')
+        self.quiz = Quiz.objects.create(title="Algebra", subject=Subject.objects.create(name="Math"), created_by=self.teacher)
+        Question.objects.create(quiz=self.quiz, text="Mavjud savol", order=3)
+
+    def test_import_orders_questions_and_reports_bad_rows(self):
+        self.client.login(username='teacher', password='password123')
+        upload = SimpleUploadedFile('savollar.xlsx', question_sheet([
+            ['2+2?', '3', '4', '5', None, 'b'],
+            [None, '1', '2', None, None, 'A'],
+            ['3+3?', '6', '7', None, None, 'C'],
+            ['5+5?', '10', '11', None, None, 'A'],
+        ]).getvalue())
+        response = self.client.post(reverse('quiz_edit', args=[self.quiz.id]), {'import_excel': '1', 'excel_file': upload})
+        self.assertRedirects(response, reverse('quiz_edit', args=[self.quiz.id]))
+
+        questions = list(self.quiz.questions.order_by('order'))
+        self.assertEqual([(q.text, q.order) for q in questions[1:]], [('2+2?', 4), ('5+5?', 5)])
+        self.assertEqual(list(questions[1].answers.filter(is_correct=True).values_list('text', flat=True)), ['4'])
+        self.assertEqual(questions[1].answers.count(), 3)
+
+        errors = [str(m) for m in response.wsgi_request._messages]
+        self.assertIn("Qator 3: Savol matni bo'sh", errors)
+        self.assertIn("Qator 4: To'g'ri javob varianti bo'sh", errors)
+
+    def test_import_query_count_is_constant(self):
+        rows = [[f"Savol {i}", 'a', 'b', 'c', 'd', 'A'] for i in range(500)]
+        with CaptureQueriesContext(connection) as ctx:
+            created, errors = import_questions(self.quiz, question_sheet(rows))
+        self.assertEqual((created, errors), (500, []))
+        # Two bulk inserts (SQLite splits them into batches), not a query per question/answer
+        self.assertLess(len(ctx), 30)
+        self.assertEqual(self.quiz.questions.count(), 501)
@@ -2,6 +2,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Resource, Quiz, Question, Answer, QuizResult
+from .question_import import import_questions
 from core.models import Subject, Class
 from django.db.models import Count, Q
 
@@ -236,8 +237,6 @@ def quiz_edit(request, quiz_id):
     return render(request, 'resources/quiz_edit.html', {'quiz': quiz, 'questions': questions})
 
 # Helpers
-import pandas as pd
-
 def import_questions_from_excel(request, quiz):
     excel_file = request.FILES.get('excel_file')
     if not excel_file:
@@ -245,36 +244,17 @@ def import_questions_from_excel(request, quiz):
         return
 
     try:
-        df = pd.read_excel(excel_file)
-        # Expected columns: Question, Option A, Option B, Option C, Option D, Correct Answer (A/B/C/D)
-        
-        count = 0
-        for index, row in df.iterrows():
-            question_text = row.get('Question')
-            if not question_text: continue
-            
-            question = Question.objects.create(quiz=quiz, text=question_text, order=quiz.questions.count()+1)
-            
-            options = {
-                'A': row.get('Option A'),
-                'B': row.get('Option B'),
-                'C': row.get('Option C'),
-                'D': row.get('Option D')
-            }
-            correct = str(row.get('Correct Answer')).strip().upper()
-            
-            for key, text in options.items():
-                if pd.notna(text):
-                    Answer.objects.create(
-                        question=question,
-                        text=text,
-                        is_correct=(key == correct)
-                    )
-            count += 1
-            
-        messages.success(request, f"{count} ta savol muvaffaqiyatli yuklandi!")
+        count, errors = import_questions(quiz, excel_file)
     except Exception as e:
         messages.error(request, f"Xatolik yuz berdi: {str(e)}")
+        return
+
+    if count:
+        messages.success(request, f"{count} ta savol muvaffaqiyatli yuklandi!")
+    if errors:
+        messages.warning(request, f"{len(errors)} ta qator yuklanmadi:")
+        for row_num, error in errors[:10]:  # Show first 10 errors
+            messages.error(request, f"Qator {row_num}: {error}")
 
 def add_manual_question(request, quiz):
     question_text = request.POST.get('question_text')